@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Brooks.settings')
+# Списки и выгрузка под ASGI обслуживаются асинхронными view
+os.environ.setdefault('DJANGO_ROOT_URLCONF', 'Brooks.urls_asgi')
 
 application = get_asgi_application()
@@ -51,6 +51,7 @@ TEMPLATES = [
     },
 ]
 MIDDLEWARE = [
+    'utilities.metrics.QueryMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -60,9 +61,10 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'Brooks.urls'
+ROOT_URLCONF = os.getenv("DJANGO_ROOT_URLCONF", 'Brooks.urls')
 
 WSGI_APPLICATION = 'Brooks.wsgi.application'
+ASGI_APPLICATION = 'Brooks.asgi.application'
 
 DATABASE_ENGINE = os.getenv("DATABASE_ENGINE", "sqlite")
 
@@ -85,6 +87,46 @@ else:
         }
     }
 
+REDIS_URL = os.getenv("REDIS_URL")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": REDIS_URL,
+            "OPTIONS": {
+                "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            },
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Кеш token -> user для users.authentication.CachedTokenAuthentication.
+# MODE: "cache" - общий кеш Django (Redis), "off" - без кеша: кеш в памяти процесса
+# не узнал бы об удалении токена в другом воркере
+TOKEN_AUTH_CACHE = {
+    "MODE": os.getenv("TOKEN_AUTH_CACHE_MODE", "cache" if REDIS_URL else "off"),
+    "CACHE_ALIAS": "default",
+    "TIMEOUT": int(os.getenv("TOKEN_AUTH_CACHE_TIMEOUT", "300")),
+}
+
+# Celery: производные данные (статистика) пересчитываются фоновыми задачами.
+# Без брокера задачи выполняются сразу в процессе (eager) - для локального запуска и тестов
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", REDIS_URL or "memory://")
+CELERY_TASK_ALWAYS_EAGER = os.getenv("CELERY_TASK_ALWAYS_EAGER", str(CELERY_BROKER_URL == "memory://")) == "True"
+CELERY_TASK_EAGER_PROPAGATES = True
+CELERY_TASK_IGNORE_RESULT = True
+
+# Задержка (сек) перед пересчетом статистики ТС: изменения за это время объединяются в одну задачу
+FORGE_STATISTICS_DEBOUNCE = int(os.getenv("FORGE_STATISTICS_DEBOUNCE", "5"))
+# Сколько метка запланированного пересчета живет сверх задержки, если воркер недоступен
+FORGE_STATISTICS_PENDING_TIMEOUT = int(os.getenv("FORGE_STATISTICS_PENDING_TIMEOUT", "300"))
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -111,12 +153,54 @@ REST_FRAMEWORK = {
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
     ],
 
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+
+    'DEFAULT_PAGINATION_CLASS': 'forge.pagination.KeysetPagination',
+    'PAGE_SIZE': int(os.getenv("API_PAGE_SIZE", "50")),
 }
 
+# Максимальный размер страницы, который клиент может запросить через ?page_size=
+MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", "500"))
+
+# Время жизни кеша итогов ТС в /fuel-statistics/ (секунды, 0 - без кеша)
+FUEL_STATISTICS_SUMMARY_CACHE_TIMEOUT = int(os.getenv("FUEL_STATISTICS_SUMMARY_CACHE_TIMEOUT", "0"))
+
+# Размер пачки строк при потоковой выгрузке заправок
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "2000"))
+
+# Максимальное количество заправок в одном запросе /refuelings/bulk/
+REFUELING_BULK_MAX_SIZE = int(os.getenv("REFUELING_BULK_MAX_SIZE", "1000"))
+
+# Список заправок из .values() без сериализатора (forge.rows), 0 - обычная сериализация
+REFUELING_LIST_VALUES = os.getenv("REFUELING_LIST_VALUES", "1") == "1"
+
+# Максимальное количество цен в одном запросе /fuel-prices/bulk/
+FUEL_PRICE_BULK_MAX_SIZE = int(os.getenv("FUEL_PRICE_BULK_MAX_SIZE", "50000"))
+# Время жизни кеша цены на дату (секунды, 0 - без кеша)
+FUEL_PRICE_CACHE_TIMEOUT = int(os.getenv("FUEL_PRICE_CACHE_TIMEOUT", "3600"))
+
+# Размер пачки заправок при удалении ТС и пользователей (forge.deletion)
+FORGE_DELETE_BATCH_SIZE = int(os.getenv("FORGE_DELETE_BATCH_SIZE", "1000"))
+
+# Дельта-синхронизация /sync/: запас на транзакции, закоммиченные после выдачи метки (секунды),
+# и срок хранения следов удаленных записей (дни)
+SYNC_WATERMARK_LAG = int(os.getenv("SYNC_WATERMARK_LAG", "30"))
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.getenv("SYNC_TOMBSTONE_RETENTION_DAYS", "90"))
+# Строк (всех моделей вместе) на странице /sync/
+SYNC_PAGE_SIZE = int(os.getenv("SYNC_PAGE_SIZE", "1000"))
+
+# Метрики запросов (число и время SQL, время без SQL, полное время) по view на /metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True") == "True"
+METRICS_PATH = "/metrics"
+# Токен для Prometheus (Authorization: Bearer ...); без него /metrics доступен только сотрудникам
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+# Поиск повторяющихся запросов (N+1) - только для разработки
+METRICS_DUPLICATE_QUERIES = os.getenv("METRICS_DUPLICATE_QUERIES", str(DEBUG)) == "True"
+METRICS_DUPLICATE_QUERY_THRESHOLD = int(os.getenv("METRICS_DUPLICATE_QUERY_THRESHOLD", "5"))
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Brooks API',
     'DESCRIPTION': 'API documentation',
@@ -2,21 +2,26 @@ from django.contrib import admin
 from django.urls import path
 from rest_framework.routers import DefaultRouter
 import users.views
+import utilities.metrics
 from drf_spectacular.views import (
     SpectacularAPIView,
     SpectacularSwaggerView,
 )
 
 import forge.views.vehicle
+import forge.views.forge
+import forge.views.sync
 from forge.views.refueling import Refueling
 from forge.views.gasStation import GasStation
 from forge.views.fuelStatistics import FuelStatistics
+from forge.views.fuelPrice import FuelPrice
 
 router = DefaultRouter()
 router.register('vehicle', forge.views.vehicle.Vehicle, basename='vehicle')
 router.register('refuelings', Refueling, basename='refueling')
 router.register('gasStation', GasStation)
 router.register('fuel-statistics', FuelStatistics)
+router.register('fuel-prices', FuelPrice)
 
 
 urlpatterns = [
@@ -29,6 +34,11 @@ urlpatterns = [
     path('user/register/', users.views.RegisterUser.as_view(), name='user_register'),
     path('user/login/', users.views.LoginUser.as_view(), name='user_login'),
 
+    path('refuelings/export/', forge.views.forge.forge, name='refueling_export'),
+    path('sync/', forge.views.sync.sync, name='sync'),
+
+    path('metrics', utilities.metrics.metrics, name='metrics'),
+
 ]
 
 urlpatterns += router.urls
\ No newline at end of file
@@ -0,0 +1,20 @@
+"""Маршруты ASGI-профиля: чтение списков и выгрузка обслуживаются асинхронными view,
+все остальное - обычными маршрутами из Brooks.urls.
+"""
+from django.urls import path
+
+import forge.views.forge
+from forge.views.asyncRead import async_api_view
+from forge.views.fuelStatistics import FuelStatistics
+from forge.views.refueling import Refueling
+from forge.views.vehicle import Vehicle
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('vehicle/', Vehicle.as_async_list_view(basename='vehicle')),
+    path('refuelings/', Refueling.as_async_list_view(basename='refueling')),
+    path('fuel-statistics/', FuelStatistics.as_async_list_view(basename='fuelstatistics')),
+    path('refuelings/export/', async_api_view(forge.views.forge.forge.cls, forge.views.forge.aforge)),
+]
+
+urlpatterns += sync_urlpatterns
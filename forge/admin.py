@@ -1,31 +1,37 @@
 from django.contrib import admin
 from django.core.checks import register
+from import_export.admin import ImportExportModelAdmin
 
 # Register your models here.
-from forge import models
+from forge import deletion, models, resources
 
 
 @admin.register(models.GasStation)
-class GasStation(admin.ModelAdmin):
-    pass
+class GasStation(ImportExportModelAdmin):
+    resource_classes = [resources.GasStation]
 
 
 @admin.register(models.Vehicle)
-class Vehicle(admin.ModelAdmin):
+class Vehicle(ImportExportModelAdmin):
+    resource_classes = [resources.Vehicle]
     list_display = ('name', 'user', 'brand', 'model', 'year', 'license_plate',)
 
+    def delete_queryset(self, request, queryset):
+        deletion.delete_vehicles(queryset)
+
 
 @admin.register(models.Refueling)
-class Refueling(admin.ModelAdmin):
-    list_display = ('date', 'vehicle', 'mileage', 'fuel_quantity',
+class Refueling(ImportExportModelAdmin):
+    resource_classes = [resources.Refueling]
+    list_display = ('date', 'vehicle', 'mileage', 'odometer', 'fuel_quantity',
                     'price_per_liter', 'total_cost',)
     search_fields = ('comment', 'gas_station__name', 'gas_station')
     date_hierarchy = 'date'
 
 
 @admin.register(models.FuelPrice)
-class FuelPrice(admin.ModelAdmin):
-    pass
+class FuelPrice(ImportExportModelAdmin):
+    resource_classes = [resources.FuelPrice]
 
 
 @admin.register(models.FuelStatistics)
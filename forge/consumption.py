@@ -0,0 +1,98 @@
+"""Расход топлива между полными баками.
+
+Расход частичной заправки по ее литрам и пробегу не имеет смысла: реальный
+расход - это все топливо, залитое после предыдущего полного бака до
+следующего полного бака включительно, на пробег между ними. Накопленное
+топливо считается оконной функцией (один проход по истории ТС в порядке
+(date, pk)), пробег - разностью сохраненных одометров. Результат хранится на
+закрывающей полной заправке: full_tank_consumption и full_tank_distance.
+"""
+from decimal import Decimal
+
+from django.db.models import F, Q, Sum, Window
+from django.utils import timezone
+
+from forge import models
+
+FIELDS = ['full_tank_consumption', 'full_tank_distance']
+MAX_CONSUMPTION = Decimal('9999.99')
+
+
+def _rows(refuelings):
+    return refuelings.order_by().annotate(
+        cumulative_fuel=Window(
+            Sum('fuel_quantity'),
+            partition_by=[F('vehicle_id')],
+            order_by=[F('date').asc(), F('pk').asc()],
+        ),
+    ).order_by('vehicle_id', 'date', 'pk').values_list(
+        'pk', 'vehicle_id', 'date', 'odometer', 'is_full_tank', 'cumulative_fuel', *FIELDS
+    )
+
+
+def _fold(rows, anchored=False):
+    """Расход на полных заправках; anchored - первая строка ТС служит только началом отрезка.
+
+    Возвращает измененные заправки (pk, дата, расход, пробег).
+    """
+    changed = []
+    previous = {}
+    first = set()
+    for pk, vehicle_id, date, odometer, is_full_tank, cumulative_fuel, old_consumption, old_distance in rows:
+        if anchored and vehicle_id not in first:
+            first.add(vehicle_id)
+            previous[vehicle_id] = (odometer, cumulative_fuel)
+            continue
+
+        consumption = distance = None
+        if is_full_tank:
+            anchor = previous.get(vehicle_id)
+            if anchor is not None and odometer > anchor[0]:
+                distance = odometer - anchor[0]
+                consumption = min((cumulative_fuel - anchor[1]) * 100 / distance, MAX_CONSUMPTION).quantize(
+                    Decimal('0.01')
+                )
+            previous[vehicle_id] = (odometer, cumulative_fuel)
+
+        if (consumption, distance) != (old_consumption, old_distance):
+            changed.append((pk, date, consumption, distance))
+    return changed
+
+
+def _save(changed, batch_size=1000):
+    # updated_at меняется вместе с отдаваемыми полями - иначе ETag списка заправок устареет
+    now = timezone.now()
+    models.Refueling.objects.bulk_update(
+        [
+            models.Refueling(pk=pk, full_tank_consumption=consumption, full_tank_distance=distance, updated_at=now)
+            for pk, _, consumption, distance in changed
+        ],
+        [*FIELDS, 'updated_at'],
+        batch_size=batch_size,
+    )
+
+
+def rebuild(vehicle_ids):
+    """Полный пересчет для переданных ТС одним запросом, возвращает число измененных заправок"""
+    changed = _fold(_rows(models.Refueling.objects.filter(vehicle_id__in=vehicle_ids)).iterator(chunk_size=5000))
+    _save(changed)
+    return len(changed)
+
+
+def update_vehicle(vehicle_id, since):
+    """Пересчет после изменения заправок ТС начиная с даты since.
+
+    Отрезки до последнего полного бака раньше since не меняются, поэтому
+    проход начинается с него. Возвращает даты измененных заправок - их
+    периоды статистики тоже нужно пересчитать.
+    """
+    refuelings = models.Refueling.objects.filter(vehicle_id=vehicle_id)
+    anchor = refuelings.filter(is_full_tank=True, date__lt=since).order_by('-date', '-pk').values(
+        'date', 'pk'
+    ).first()
+    if anchor is not None:
+        refuelings = refuelings.filter(Q(date__gt=anchor['date']) | Q(date=anchor['date'], pk__gte=anchor['pk']))
+
+    changed = _fold(_rows(refuelings), anchored=anchor is not None)
+    _save(changed)
+    return {date for _, date, _, _ in changed}
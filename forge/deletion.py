@@ -0,0 +1,61 @@
+"""Удаление ТС и пользователей вместе с историей заправок.
+
+Каскадное удаление через Collector вызывает post_delete на каждую заправку:
+сдвиг одометров, пробег ТС, задача статистики и след для синхронизации - на
+ТС, которое удаляется целиком. Здесь статистика удаляется одним запросом,
+заправки - пачками по FORGE_DELETE_BATCH_SIZE в отдельных транзакциях (вне
+внешней транзакции блокировки держатся недолго), а обработчики заправок
+пропускаются (models.deleting_history). Клиенты синхронизации получают след
+ТС и удаляют его заправки сами.
+
+Каскад от пользователя или ТС, начатый в обход этих функций (админка
+пользователей), тоже пропускает обработчики заправок, но удаляет все одной
+транзакцией.
+"""
+from django.conf import settings
+from django.db import transaction
+
+from forge import models, rollups
+
+
+def delete_history(vehicle_ids, batch_size=None):
+    """Удаляет статистику и заправки ТС (сами ТС остаются), возвращает число заправок"""
+    batch_size = batch_size or settings.FORGE_DELETE_BATCH_SIZE
+    owners = {}
+    for vehicle_id, user_id in models.Vehicle.objects.filter(pk__in=vehicle_ids).values_list('pk', 'user_id'):
+        owners.setdefault(user_id, []).append(vehicle_id)
+
+    models.FuelStatistics.objects.filter(vehicle_id__in=vehicle_ids).delete()
+
+    deleted = 0
+    token = models.deleting_history.set(True)
+    try:
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    models.Refueling.objects.filter(vehicle_id__in=vehicle_ids).order_by().values_list(
+                        'pk', flat=True
+                    )[:batch_size]
+                )
+                if not batch:
+                    break
+                count, _ = models.Refueling.objects.filter(pk__in=batch).delete()
+                deleted += count
+    finally:
+        models.deleting_history.reset(token)
+
+    for user_id, user_vehicle_ids in owners.items():
+        rollups.invalidate_vehicle_summary(user_id, user_vehicle_ids)
+    return deleted
+
+
+def delete_vehicles(vehicles, batch_size=None):
+    """Удаляет ТС из queryset: сначала история пачками, затем сами ТС"""
+    delete_history(list(vehicles.values_list('pk', flat=True)), batch_size)
+    return vehicles.delete()
+
+
+def delete_users(users, batch_size=None):
+    """Удаляет пользователей из queryset вместе с их ТС и заправками"""
+    delete_vehicles(models.Vehicle.objects.filter(user__in=users), batch_size)
+    return users.delete()
@@ -10,15 +10,46 @@ class Vehicle(django_filters.FilterSet):
         fields = '__all__'
 
 
+class CharInFilter(django_filters.BaseInFilter, django_filters.CharFilter):
+    """Список значений через запятую: ?fuel_type=АИ-92,АИ-95"""
+
+
 class Refueling(django_filters.FilterSet):
-    mileage = django_filters.NumberFilter(field_name='mileage', lookup_expr='icontains')
-    odometer = django_filters.NumberFilter(field_name='odometer', lookup_expr='icontains')
-    fuel_quantity = django_filters.NumberFilter(field_name='fuel_quantity', lookup_expr='icontains')
-    quarter = django_filters.NumberFilter(field_name='quarter', lookup_expr='icontains')
+    # Точные и диапазонные сравнения, которые могут использовать индексы
+    mileage = django_filters.NumberFilter(field_name='mileage')
+    mileage_min = django_filters.NumberFilter(field_name='mileage', lookup_expr='gte')
+    mileage_max = django_filters.NumberFilter(field_name='mileage', lookup_expr='lte')
+    odometer = django_filters.NumberFilter(field_name='odometer')
+    odometer_min = django_filters.NumberFilter(field_name='odometer', lookup_expr='gte')
+    odometer_max = django_filters.NumberFilter(field_name='odometer', lookup_expr='lte')
+    fuel_quantity = django_filters.NumberFilter(field_name='fuel_quantity')
+    fuel_quantity_min = django_filters.NumberFilter(field_name='fuel_quantity', lookup_expr='gte')
+    fuel_quantity_max = django_filters.NumberFilter(field_name='fuel_quantity', lookup_expr='lte')
+    date_from = django_filters.DateFilter(field_name='date', lookup_expr='gte')
+    date_to = django_filters.DateFilter(field_name='date', lookup_expr='lte')
+    fuel_type = CharInFilter(field_name='fuel_type', lookup_expr='in')
+    year = django_filters.NumberFilter(field_name='year')
+    quarter = django_filters.NumberFilter(field_name='quarter')
+    # Вычисляемые столбцы БД под публичными именами свойств модели
+    fuel_consumption_min = django_filters.NumberFilter(field_name='fuel_consumption_value', lookup_expr='gte')
+    fuel_consumption_max = django_filters.NumberFilter(field_name='fuel_consumption_value', lookup_expr='lte')
+    effective_cost_min = django_filters.NumberFilter(field_name='effective_cost_value', lookup_expr='gte')
+    effective_cost_max = django_filters.NumberFilter(field_name='effective_cost_value', lookup_expr='lte')
+    # ?ordering=-fuel_consumption - "худший расход" одним запросом по индексу
+    ordering = django_filters.OrderingFilter(fields=(
+        ('date', 'date'),
+        ('mileage', 'mileage'),
+        ('odometer', 'odometer'),
+        ('fuel_quantity', 'fuel_quantity'),
+        # total_cost необязателен: стоимость сортируется по effective_cost, который есть всегда
+        ('fuel_consumption_value', 'fuel_consumption'),
+        ('effective_cost_value', 'effective_cost'),
+    ))
 
     class Meta:
         model = models.Refueling
         fields = '__all__'
+        exclude = ['fuel_consumption_value', 'effective_cost_value']
 
 
 class FuelStatistics(django_filters.FilterSet):
@@ -32,6 +63,16 @@ class FuelStatistics(django_filters.FilterSet):
         fields = ['vehicle', 'period_type']
 
 
+class FuelPrice(django_filters.FilterSet):
+    date_from = django_filters.DateFilter(field_name='date', lookup_expr='gte')
+    date_to = django_filters.DateFilter(field_name='date', lookup_expr='lte')
+    fuel_type = CharInFilter(field_name='fuel_type', lookup_expr='in')
+
+    class Meta:
+        model = models.FuelPrice
+        fields = ['date', 'fuel_type', 'gas_station']
+
+
 class GasStation(django_filters.FilterSet):
     class Meta:
         model = models.GasStation
@@ -0,0 +1,20 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from forge import deletion
+
+
+class Command(BaseCommand):
+    help = 'Удаляет пользователей вместе с ТС и заправками пачками, без построчной обработки заправок'
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='+')
+        parser.add_argument('--batch-size', type=int, default=None, help='Заправок в одной транзакции')
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.filter(username__in=options['usernames'])
+        missing = set(options['usernames']) - set(users.values_list('username', flat=True))
+        if missing:
+            raise CommandError(f'Пользователи не найдены: {", ".join(sorted(missing))}')
+        deleted, _ = deletion.delete_users(users, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Удалено объектов: {deleted}'))
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from forge import seed
+
+
+class Command(BaseCommand):
+    help = 'Генерирует пользователей, ТС и заправки для бенчмарков и нагрузочных тестов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--vehicles-per-user', type=int, default=2)
+        parser.add_argument('--refuelings', type=int, default=1000, help='Всего заправок (10³-10⁶)')
+        parser.add_argument('--prefix', default='bench', help='Префикс имен пользователей')
+        parser.add_argument('--password', default='benchmark')
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        with transaction.atomic():
+            users = seed.generate(
+                users=options['users'],
+                vehicles_per_user=options['vehicles_per_user'],
+                refuelings=options['refuelings'],
+                prefix=options['prefix'],
+                password=options['password'],
+                batch_size=options['batch_size'],
+                seed=options['seed'],
+            )
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Пользователей: {len(users)}, заправок: {options["refuelings"]} за {elapsed:.1f} с'
+        ))
+        self.stdout.write(f'Токен {users[0].username}: {users[0].auth_token.key}')
@@ -0,0 +1,235 @@
+import csv
+import datetime
+import time
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.exceptions import ValidationError as SerializerValidationError
+
+from forge import models, rollups, serializers
+
+TRUE_VALUES = {'1', 'true', 'yes', 'да', '+'}
+DATE_FORMATS = ('%Y-%m-%d', '%d.%m.%Y', '%d/%m/%Y')
+# Связи проверяются словарями команды, а не запросом на строку
+UNCHECKED_FIELDS = ['vehicle', 'user', 'gas_station']
+
+
+def read_csv(path, delimiter):
+    with open(path, newline='', encoding='utf-8-sig') as file:
+        yield from csv.DictReader(file, delimiter=delimiter)
+
+
+def read_xlsx(path):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise CommandError('Для импорта xlsx нужен пакет openpyxl')
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(column).strip() if column is not None else '' for column in next(rows, ())]
+        for values in rows:
+            yield dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+def parse_date(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(str(value).strip(), date_format).date()
+        except ValueError:
+            pass
+    raise ValueError(f'неверная дата {value!r}')
+
+
+def parse_decimal(value, default=None):
+    if value in (None, ''):
+        if default is None:
+            raise ValueError('пустое число')
+        return default
+    try:
+        return Decimal(str(value).strip().replace(',', '.').replace(' ', ''))
+    except InvalidOperation:
+        raise ValueError(f'неверное число {value!r}')
+
+
+def parse_mileage(value):
+    """Пробег - целое число с теми же ограничениями, что и в API"""
+    mileage = parse_decimal(value)
+    if mileage != mileage.to_integral_value():
+        raise ValueError(f'пробег должен быть целым числом, а не {value!r}')
+    try:
+        serializers.validate_mileage(int(mileage))
+    except SerializerValidationError as error:
+        raise ValueError(error.detail['mileage'])
+    return int(mileage)
+
+
+def describe(error):
+    """Ошибки полей модели одной строкой"""
+    return '; '.join(f"{field}: {' '.join(messages)}" for field, messages in error.message_dict.items())
+
+
+class Command(BaseCommand):
+    help = ('Потоковый импорт заправок из csv/xlsx (топливные карты). Колонки: date, vehicle '
+            '(id, название или госномер), mileage, fuel_quantity, price_per_liter и необязательные '
+            'gas_station, gas_station_number, company, fuel_type, is_full_tank, discount, '
+            'service_operation, comment')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--user', required=True, help='Имя пользователя - владельца ТС')
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--delimiter', default=',')
+        parser.add_argument('--max-errors', type=int, default=20, help='Сколько ошибок строк выводить')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f'Файл {path} не найден')
+        try:
+            self.user = get_user_model().objects.get(username=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"Пользователь {options['user']} не найден")
+
+        rows = read_xlsx(path) if path.suffix.lower() == '.xlsx' else read_csv(path, options['delimiter'])
+        self.vehicles = self.load_vehicles()
+        self.stations = self.load_stations()
+        self.affected = set()
+        self.errors = 0
+
+        started = time.monotonic()
+        imported = 0
+        chunk = []
+        try:
+            for line, row in enumerate(rows, start=2):
+                refueling = self.build(line, row, options['max_errors'])
+                if refueling is not None:
+                    chunk.append(refueling)
+                if len(chunk) >= options['chunk_size']:
+                    imported += self.write(chunk)
+                    chunk = []
+                    self.report(imported, started)
+            if chunk:
+                imported += self.write(chunk)
+        finally:
+            self.stdout.write('Пересчет одометров и статистики...')
+            self.refresh_derived()
+
+        self.report(imported, started)
+        self.stdout.write(self.style.SUCCESS(f'Импортировано: {imported}, ошибок: {self.errors}'))
+
+    def load_vehicles(self):
+        """Все ТС пользователя по id, названию и госномеру - без запроса на каждую строку"""
+        lookup = {}
+        for pk, name, license_plate in models.Vehicle.objects.filter(user=self.user).values_list(
+                'pk', 'name', 'license_plate'):
+            lookup.setdefault(name.strip().lower(), pk)
+            if license_plate:
+                lookup.setdefault(license_plate.strip().lower(), pk)
+            lookup[str(pk)] = pk
+        return lookup
+
+    def load_stations(self):
+        return {
+            (company.strip().lower(), name.strip().lower(), number.strip().lower()): pk
+            for pk, company, name, number in models.GasStation.objects.values_list('pk', 'company', 'name', 'number')
+        }
+
+    def build(self, line, row, max_errors):
+        try:
+            vehicle_id = self.vehicles.get(str(row.get('vehicle') or '').strip().lower())
+            if vehicle_id is None:
+                raise ValueError(f"ТС {row.get('vehicle')!r} не найдено")
+            refueling = models.Refueling(
+                vehicle_id=vehicle_id,
+                user=self.user,
+                date=parse_date(row.get('date')),
+                mileage=parse_mileage(row.get('mileage')),
+                fuel_quantity=parse_decimal(row.get('fuel_quantity')),
+                price_per_liter=parse_decimal(row.get('price_per_liter')),
+                service_operation=parse_decimal(row.get('service_operation'), default=Decimal('0')),
+                discount=parse_decimal(row.get('discount'), default=Decimal('0')),
+                fuel_type=(row.get('fuel_type') or None),
+                is_full_tank=str(row.get('is_full_tank') or '').strip().lower() in TRUE_VALUES,
+                comment=row.get('comment') or '',
+            )
+            refueling.calculate_total_cost()
+            if refueling.total_cost is not None:
+                # Как при сохранении в БД: стоимость хранится с копейками
+                refueling.total_cost = refueling.total_cost.quantize(Decimal('0.01'))
+            refueling.fill_period()
+            # Отрицательные значения, неизвестный тип топлива и переполнение разрядов
+            # иначе дойдут до bulk_create и оборвут импорт ошибкой БД
+            try:
+                refueling.clean_fields(exclude=UNCHECKED_FIELDS)
+            except ValidationError as error:
+                raise ValueError(describe(error))
+        except (TypeError, ValueError) as error:
+            self.errors += 1
+            if self.errors <= max_errors:
+                self.stderr.write(f'Строка {line}: {error}')
+            return None
+
+        # АЗС сопоставляется по ключу, новые создаются пачкой в write()
+        refueling.station_key = self.station_key(row)
+        return refueling
+
+    @staticmethod
+    def station_key(row):
+        name = str(row.get('gas_station') or '').strip()
+        if not name:
+            return None
+        return (
+            str(row.get('company') or '').strip(),
+            name,
+            str(row.get('gas_station_number') or '').strip(),
+        )
+
+    def write(self, chunk):
+        """Одна транзакция и несколько bulk-запросов на пачку строк"""
+        with transaction.atomic():
+            missing = {}
+            for refueling in chunk:
+                key = refueling.station_key
+                if key and tuple(part.lower() for part in key) not in self.stations:
+                    missing[tuple(part.lower() for part in key)] = key
+            if missing:
+                created = models.GasStation.objects.bulk_create([
+                    models.GasStation(company=company, name=name, number=number)
+                    for company, name, number in missing.values()
+                ])
+                for key, station in zip(missing, created):
+                    self.stations[key] = station.pk
+
+            for refueling in chunk:
+                if refueling.station_key:
+                    refueling.gas_station_id = self.stations[tuple(part.lower() for part in refueling.station_key)]
+                self.affected.add(refueling.vehicle_id)
+
+            models.Refueling.objects.bulk_create(chunk)
+        return len(chunk)
+
+    def refresh_derived(self):
+        """Строки могли прийти в любом порядке, поэтому одометры и статистика пересчитываются целиком"""
+        vehicles = models.Vehicle.objects.filter(pk__in=self.affected)
+        for vehicle in vehicles:
+            vehicle.recalculate_odometers()
+        models.Vehicle.recalculate_current_odometers(vehicles)
+        rollups.rebuild_statistics(self.affected)
+        rollups.invalidate_vehicle_summary(self.user.pk, self.affected)
+
+    def report(self, imported, started):
+        elapsed = time.monotonic() - started
+        rate = imported / elapsed if elapsed else 0
+        self.stdout.write(f'{imported} строк за {elapsed:.1f} с ({rate:.0f} строк/с)')
@@ -0,0 +1,73 @@
+import asyncio
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PATHS = ['/vehicle/', '/refuelings/', '/fuel-statistics/']
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный тест GET-эндпоинтов. Для сравнения профилей запускается по очереди '
+            'против WSGI (gunicorn) и ASGI (granian) сервиса с одинаковыми параметрами')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', required=True, help='Адрес сервиса, например http://web:8000')
+        parser.add_argument('--token', required=True, help='Токен пользователя с данными')
+        parser.add_argument('--path', action='append', help=f'Пути для теста (по умолчанию {DEFAULT_PATHS})')
+        parser.add_argument('--concurrency', type=int, default=50, help='Одновременных клиентов')
+        parser.add_argument('--requests', type=int, default=1000, help='Запросов на каждый путь')
+        parser.add_argument('--timeout', type=float, default=30)
+
+    def handle(self, *args, **options):
+        try:
+            import httpx
+        except ImportError:
+            raise CommandError('Для нагрузочного теста нужен пакет httpx')
+
+        self.stdout.write(f'{options["url"]}: {options["concurrency"]} клиентов, {options["requests"]} запросов')
+        self.stdout.write(f'{"путь":<24}{"rps":>8}{"p50, мс":>10}{"p95, мс":>10}{"p99, мс":>10}{"ошибок":>8}')
+        for path in options['path'] or DEFAULT_PATHS:
+            latencies, errors, elapsed = asyncio.run(self.run(httpx, path, options))
+            if not latencies:
+                self.stdout.write(f'{path:<24}{"-":>8}{"-":>10}{"-":>10}{"-":>10}{errors:>8}')
+                continue
+            percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+            self.stdout.write(
+                f'{path:<24}{len(latencies) / elapsed:>8.0f}{percentiles[49]:>10.1f}'
+                f'{percentiles[94]:>10.1f}{percentiles[98]:>10.1f}{errors:>8}'
+            )
+
+    @staticmethod
+    async def run(httpx, path, options):
+        """Клиенты выбирают запросы из общего счетчика, время каждого ответа в мс"""
+        remaining = options['requests']
+        latencies = []
+        errors = 0
+
+        async def client_loop(client):
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    await response.aread()
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                if response.status_code != 200:
+                    errors += 1
+                    continue
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        async with httpx.AsyncClient(
+            base_url=options['url'],
+            headers={'Authorization': f'Token {options["token"]}'},
+            timeout=options['timeout'],
+            limits=httpx.Limits(max_connections=options['concurrency']),
+        ) as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(client_loop(client) for _ in range(options['concurrency'])))
+            elapsed = time.perf_counter() - started
+        return latencies, errors, elapsed
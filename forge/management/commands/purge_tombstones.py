@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from forge import sync
+
+
+class Command(BaseCommand):
+    help = 'Удаляет следы удаленных записей старше SYNC_TOMBSTONE_RETENTION_DAYS'
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(f'Удалено следов: {sync.purge_tombstones()}'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from forge import rollups
+
+
+class Command(BaseCommand):
+    help = 'Полностью перестраивает статистику расхода (месяц/квартал/год)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vehicle', type=int, nargs='*', help='id транспортных средств (по умолчанию все)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Количество ТС в одном сгруппированном запросе')
+
+    def handle(self, *args, **options):
+        created = rollups.rebuild_statistics(options['vehicle'] or None, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Записей статистики: {created}'))
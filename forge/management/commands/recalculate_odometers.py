@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from forge import models
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сохраненные одометры заправок и текущий пробег ТС'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vehicle', type=int, nargs='*', help='id транспортных средств (по умолчанию все)')
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        vehicles = models.Vehicle.objects.order_by('pk')
+        if options['vehicle']:
+            vehicles = vehicles.filter(pk__in=options['vehicle'])
+
+        total = 0
+        for vehicle in vehicles.iterator():
+            total += vehicle.recalculate_odometers(batch_size=options['batch_size'])
+
+        models.Vehicle.recalculate_current_odometers(vehicles)
+
+        self.stdout.write(self.style.SUCCESS(f'Исправлено одометров: {total}'))
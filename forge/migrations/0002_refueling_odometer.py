@@ -0,0 +1,40 @@
+# Generated by Django 5.2.9 on 2026-10-18 14:24
+
+from django.db import migrations, models
+
+
+def backfill_odometer(apps, schema_editor):
+    Refueling = apps.get_model('forge', 'Refueling')
+
+    # Один проход оконной функции по всем ТС: нарастающий пробег внутри ТС в порядке (date, pk)
+    rows = Refueling.objects.order_by().annotate(
+        running=models.Window(
+            models.Sum('mileage'),
+            partition_by=[models.F('vehicle_id')],
+            order_by=[models.F('date').asc(), models.F('pk').asc()],
+        )
+    ).values_list('pk', 'vehicle__initial_odometer', 'running')
+
+    changed = []
+    for pk, initial_odometer, running in rows.iterator(chunk_size=1000):
+        changed.append(Refueling(pk=pk, odometer=initial_odometer + running))
+        if len(changed) >= 1000:
+            Refueling.objects.bulk_update(changed, ['odometer'])
+            changed = []
+    Refueling.objects.bulk_update(changed, ['odometer'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forge', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='refueling',
+            name='odometer',
+            field=models.IntegerField(default=0, editable=False, help_text='Начальный пробег ТС + пробеги всех заправок до этой включительно', verbose_name='Одометр'),
+        ),
+        migrations.RunPython(backfill_odometer, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def repair_current_odometer(apps, schema_editor):
+    Vehicle = apps.get_model('forge', 'Vehicle')
+    Refueling = apps.get_model('forge', 'Refueling')
+
+    mileage = Refueling.objects.filter(vehicle=OuterRef('pk')).order_by().values('vehicle').annotate(
+        total=Sum('mileage')
+    ).values('total')
+    Vehicle.objects.update(current_odometer=F('initial_odometer') + Coalesce(Subquery(mileage), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forge', '0002_refueling_odometer'),
+    ]
+
+    operations = [
+        migrations.RunPython(repair_current_odometer, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.9 on 2026-10-18 14:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forge', '0003_repair_current_odometer'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='refueling',
+            name='forge_refue_vehicle_e14ac8_idx',
+        ),
+        migrations.AddIndex(
+            model_name='refueling',
+            index=models.Index(fields=['user', '-date', '-created_at', '-id'], name='refueling_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='refueling',
+            index=models.Index(fields=['vehicle', 'date', 'id'], name='refueling_vehicle_date_idx'),
+        ),
+    ]
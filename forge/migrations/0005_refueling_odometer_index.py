@@ -0,0 +1,19 @@
+# Generated by Django 5.2.9 on 2026-10-18 14:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forge', '0004_refueling_composite_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='refueling',
+            index=models.Index(fields=['vehicle', 'odometer'], name='refueling_vehicle_odometer_idx'),
+        ),
+    ]
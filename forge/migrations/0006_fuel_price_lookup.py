@@ -0,0 +1,21 @@
+# Generated by Django 5.2.9 on 2026-10-18 14:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forge', '0005_refueling_odometer_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fuelprice',
+            index=models.Index(fields=['gas_station', 'fuel_type', '-date'], name='fuelprice_station_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='fuelprice',
+            constraint=models.UniqueConstraint(condition=models.Q(('gas_station__isnull', True)), fields=('date', 'fuel_type'), name='fuelprice_general_unique'),
+        ),
+    ]
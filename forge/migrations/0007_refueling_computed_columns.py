@@ -0,0 +1,36 @@
+# Generated by Django 5.2.9 on 2026-10-18 15:05
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forge', '0006_fuel_price_lookup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='refueling',
+            name='effective_cost_value',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(models.Q(('total_cost__isnull', True), ('total_cost', 0), _connector='OR'), then=models.Value(Decimal('0'))), default=django.db.models.expressions.CombinedExpression(models.F('total_cost'), '-', django.db.models.functions.comparison.Coalesce(models.F('discount'), models.Value(Decimal('0'))))), output_field=models.DecimalField(decimal_places=2, max_digits=9), verbose_name='Стоимость с учетом скидки (₽)'),
+        ),
+        migrations.AddField(
+            model_name='refueling',
+            name='fuel_consumption_value',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(mileage__gt=0, then=models.ExpressionWrapper(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('fuel_quantity'), '*', models.Value(Decimal('100'))), '/', django.db.models.functions.comparison.Cast('mileage', models.FloatField())), output_field=models.DecimalField(decimal_places=4, max_digits=12))), default=models.Value(Decimal('0'))), output_field=models.DecimalField(decimal_places=4, max_digits=12), verbose_name='Расход (л/100 км)'),
+        ),
+        migrations.AddIndex(
+            model_name='refueling',
+            index=models.Index(fields=['user', '-fuel_consumption_value', '-id'], name='refueling_user_consumption_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='refueling',
+            index=models.Index(fields=['user', '-effective_cost_value', '-id'], name='refueling_user_cost_idx'),
+        ),
+    ]
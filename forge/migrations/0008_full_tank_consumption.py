@@ -0,0 +1,49 @@
+# Generated by Django 5.2.9 on 2026-10-18 15:08
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def backfill_full_tank_consumption(apps, schema_editor):
+    # Средний расход в FuelStatistics после миграции обновляет rebuild_fuel_statistics
+    Refueling = apps.get_model('forge', 'Refueling')
+
+    for vehicle_id in Refueling.objects.order_by().values_list('vehicle_id', flat=True).distinct().iterator():
+        changed = []
+        fuel = Decimal('0')
+        anchor = None
+        rows = Refueling.objects.filter(vehicle_id=vehicle_id).order_by('date', 'pk').values_list(
+            'pk', 'odometer', 'fuel_quantity', 'is_full_tank'
+        )
+        for pk, odometer, fuel_quantity, is_full_tank in rows.iterator():
+            fuel += fuel_quantity
+            if not is_full_tank:
+                continue
+            if anchor is not None and odometer > anchor[0]:
+                distance = odometer - anchor[0]
+                consumption = min((fuel - anchor[1]) * 100 / distance, Decimal('9999.99')).quantize(Decimal('0.01'))
+                changed.append(Refueling(pk=pk, full_tank_consumption=consumption, full_tank_distance=distance))
+            anchor = (odometer, fuel)
+        Refueling.objects.bulk_update(changed, ['full_tank_consumption', 'full_tank_distance'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forge', '0007_refueling_computed_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='refueling',
+            name='full_tank_consumption',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=6, null=True, verbose_name='Расход между полными баками (л/100 км)'),
+        ),
+        migrations.AddField(
+            model_name='refueling',
+            name='full_tank_distance',
+            field=models.IntegerField(blank=True, editable=False, null=True, verbose_name='Пробег между полными баками (км)'),
+        ),
+        migrations.RunPython(backfill_full_tank_consumption, migrations.RunPython.noop),
+    ]
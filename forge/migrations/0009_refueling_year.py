@@ -0,0 +1,31 @@
+# Generated by Django 5.2.9 on 2026-10-18 15:12
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import ExtractMonth, ExtractQuarter, ExtractYear
+
+
+def backfill_period(apps, schema_editor):
+    Refueling = apps.get_model('forge', 'Refueling')
+    Refueling.objects.update(year=ExtractYear('date'), month=ExtractMonth('date'), quarter=ExtractQuarter('date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forge', '0008_full_tank_consumption'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='refueling',
+            name='year',
+            field=models.IntegerField(blank=True, null=True, verbose_name='Год'),
+        ),
+        migrations.AddIndex(
+            model_name='refueling',
+            index=models.Index(fields=['vehicle', 'year', 'quarter', 'month'], name='refueling_vehicle_period_idx'),
+        ),
+        migrations.RunPython(backfill_period, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.9 on 2026-10-18 15:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forge', '0009_refueling_year'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicle',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата обновления'),
+        ),
+        migrations.AddIndex(
+            model_name='refueling',
+            index=models.Index(fields=['user', 'updated_at'], name='refueling_user_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-18 15:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forge', '0011_delta_sync'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='refueling',
+            name='refueling_vehicle_date_idx',
+        ),
+        migrations.AddIndex(
+            model_name='refueling',
+            index=models.Index(fields=['vehicle', 'date', 'id'], include=('odometer', 'mileage', 'fuel_quantity', 'price_per_liter', 'total_cost'), name='refueling_vehicle_date_idx'),
+        ),
+    ]
@@ -1,23 +1,64 @@
+import contextvars
+
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db.models.signals import post_save, post_delete
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete, pre_delete
 from django.dispatch import receiver
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, ExpressionWrapper, F, OuterRef, Q, QuerySet, Subquery, Sum, Value, When, Window
+from django.db.models.functions import Cast, Coalesce, Now
 from decimal import Decimal
 from .consts import *
 
 
+class TrackedFieldsMixin:
+    """Запоминает значения полей на момент загрузки из БД"""
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_tracked_fields()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self.remember_tracked_fields()
+
+    def remember_tracked_fields(self):
+        self._loaded_values = {
+            field: self.__dict__[field] for field in self.tracked_fields if field in self.__dict__
+        }
+
+    def get_loaded_values(self):
+        """Значения отслеживаемых полей, сохраненные в БД (None для новой записи)"""
+        if self._state.adding or self.pk is None:
+            return None
+        loaded = getattr(self, '_loaded_values', {})
+        if len(loaded) < len(self.tracked_fields):
+            loaded = type(self)._base_manager.filter(pk=self.pk).values(*self.tracked_fields).first()
+        return loaded
+
+
 class GasStation(models.Model):
     """Модель АЗС"""
     name = models.CharField(_('Название АЗС'), max_length=255)
     number = models.CharField(_('Номер АЗС'), max_length=50, blank=True)
     address = models.TextField(_('Адрес'), blank=True)
     company = models.CharField(_('Компания'), max_length=100, blank=True)
+    updated_at = models.DateTimeField(_('Дата обновления'), auto_now=True)
 
     class Meta:
         verbose_name = _('АЗС')
         verbose_name_plural = _('АЗС')
         ordering = ['company', 'name']
+        indexes = [
+            # Дельта-синхронизация: АЗС, измененные после метки
+            models.Index(fields=['updated_at'], name='gasstation_updated_idx'),
+        ]
 
     def __str__(self):
         if self.number:
@@ -25,7 +66,7 @@ class GasStation(models.Model):
         return f"{self.company} {self.name}"
 
 
-class Vehicle(models.Model):
+class Vehicle(TrackedFieldsMixin, models.Model):
     """Модель для транспортных средств"""
     name = models.CharField(_('Название'), max_length=100)
     brand = models.CharField(_('Марка'), max_length=50, null=True, blank=True)
@@ -38,6 +79,8 @@ class Vehicle(models.Model):
     initial_odometer = models.IntegerField(_('Начальный пробег'), default=0)
     current_odometer = models.IntegerField(_('Текущий пробег'), default=0)
     is_active = models.BooleanField(_('Активный'), default=True)
+    # Обновляется и массовыми UPDATE текущего пробега: по нему строится ETag списка ТС
+    updated_at = models.DateTimeField(_('Дата обновления'), auto_now=True)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -49,24 +92,126 @@ class Vehicle(models.Model):
         verbose_name = _('Транспортное средство')
         verbose_name_plural = _('Транспортные средства')
         ordering = ['name']
+        indexes = [
+            # ETag списка и дельта-синхронизация
+            models.Index(fields=['user', 'updated_at'], name='vehicle_user_updated_idx'),
+        ]
+
+    tracked_fields = ('initial_odometer',)
 
     def __str__(self):
         return self.name
 
+    def delete(self, *args, **kwargs):
+        """История удаляется пачками без построчного обновления производных данных (forge.deletion)"""
+        from forge import deletion
+
+        deletion.delete_history([self.pk])
+        return super().delete(*args, **kwargs)
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            # Текущий пробег дальше поддерживается приращениями от заправок
+            self.current_odometer = self.initial_odometer
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'updated_at'}
+            if 'initial_odometer' not in update_fields:
+                super().save(*args, **kwargs)
+                return
+
+        loaded = self.get_loaded_values()
+        super().save(*args, **kwargs)
+
+        # Сдвигаем сохраненные одометры вслед за начальным пробегом
+        if loaded and loaded['initial_odometer'] != self.initial_odometer:
+            delta = self.initial_odometer - loaded['initial_odometer']
+            self.refueling_set.update(odometer=F('odometer') + delta, updated_at=Now())
+            Vehicle.shift_current_odometer(self.pk, delta)
+            self.current_odometer += delta
+        self.remember_tracked_fields()
+
+    @staticmethod
+    def lock(vehicle_ids):
+        """Блокирует строки ТС до конца транзакции: записи заправок одного ТС идут по очереди.
+
+        Одометр читается и сдвигается отдельными запросами, без блокировки две
+        параллельные записи видят один и тот же предыдущий одометр. Порядок по pk
+        исключает взаимную блокировку при переносе заправки между ТС.
+        """
+        vehicle_ids = sorted({pk for pk in vehicle_ids if pk is not None})
+        # SQLite блокирует базу на запись целиком, FOR UPDATE там нет
+        if vehicle_ids and connection.features.has_select_for_update:
+            list(Vehicle.objects.select_for_update().filter(pk__in=vehicle_ids).order_by('pk').values_list(
+                'pk', flat=True
+            ))
+
+    @staticmethod
+    def shift_current_odometer(vehicle_id, delta):
+        """Атомарно изменяет текущий пробег ТС на delta без пересчета по всем заправкам"""
+        if delta:
+            Vehicle.objects.filter(pk=vehicle_id).update(
+                current_odometer=F('current_odometer') + delta, updated_at=Now()
+            )
+
+    @staticmethod
+    def recalculate_current_odometers(vehicles):
+        """Точный текущий пробег для всех ТС из queryset одним UPDATE"""
+        mileage = Refueling.objects.filter(vehicle=models.OuterRef('pk')).order_by().values('vehicle').annotate(
+            total=Sum('mileage')
+        ).values('total')
+        vehicles.update(
+            current_odometer=F('initial_odometer') + Coalesce(models.Subquery(mileage), 0), updated_at=Now()
+        )
+
     def update_current_odometer(self):
-        """Метод точного расчета: Начальный пробег + сумма всех пробегов заправок"""
+        """Метод точного расчета: Начальный пробег + сумма всех пробегов заправок.
+
+        Используется только для ремонта данных, при изменении заправок
+        текущий пробег поддерживается инкрементально.
+        """
         total_mileage = self.refueling_set.aggregate(total=models.Sum('mileage'))['total'] or 0
         self.current_odometer = self.initial_odometer + total_mileage
         self.save(update_fields=['current_odometer'])
 
-
-class Refueling(models.Model):
+    def recalculate_odometers(self, batch_size=2000):
+        """Полный пересчет одометров заправок одним проходом оконной функции.
+
+        Возвращает количество исправленных записей.
+        """
+        rows = self.refueling_set.order_by().annotate(
+            running=Window(Sum('mileage'), order_by=[F('date').asc(), F('pk').asc()])
+        ).values_list('pk', 'odometer', 'running')
+
+        changed = []
+        fixed = 0
+        now = timezone.now()
+        for pk, odometer, running in rows.iterator(chunk_size=batch_size):
+            expected = self.initial_odometer + running
+            if odometer != expected:
+                changed.append(Refueling(pk=pk, odometer=expected, updated_at=now))
+            if len(changed) >= batch_size:
+                Refueling.objects.bulk_update(changed, ['odometer', 'updated_at'])
+                fixed += len(changed)
+                changed = []
+        if changed:
+            Refueling.objects.bulk_update(changed, ['odometer', 'updated_at'])
+            fixed += len(changed)
+        return fixed
+
+
+class Refueling(TrackedFieldsMixin, models.Model):
     """Модель для дозаправок топлива"""
     date = models.DateField(_('Дата заправки'))
+    # Производные от date (fill_period): группировка по периодам без извлечения частей даты
+    year = models.IntegerField(_('Год'), null=True, blank=True)
     month = models.IntegerField(_('Месяц'), null=True, blank=True, choices=Month.choices)
     quarter = models.IntegerField(_('Квартал'), null=True, blank=True, choices=Quarter.choices)
 
     mileage = models.IntegerField(_('Пробег с прошлой заправки (км)'), validators=[MinValueValidator(0)])
+    odometer = models.IntegerField(_('Одометр'), default=0, editable=False,
+                                   help_text=_('Начальный пробег ТС + пробеги всех заправок до этой включительно'))
     fuel_quantity = models.DecimalField(_('Количество топлива (л)'), max_digits=6, decimal_places=2,
                                         validators=[MinValueValidator(0)])
     price_per_liter = models.DecimalField(_('Цена за литр (₽)'), max_digits=6, decimal_places=2,
@@ -89,6 +234,12 @@ class Refueling(models.Model):
                                    validators=[MinValueValidator(0)])
     comment = models.TextField(_('Комментарий'), blank=True)
 
+    # Заполняются на полной заправке, закрывающей отрезок от предыдущего полного бака (forge.consumption)
+    full_tank_consumption = models.DecimalField(_('Расход между полными баками (л/100 км)'), null=True, blank=True,
+                                                max_digits=6, decimal_places=2, editable=False)
+    full_tank_distance = models.IntegerField(_('Пробег между полными баками (км)'), null=True, blank=True,
+                                             editable=False)
+
     created_at = models.DateTimeField(_('Дата создания'), auto_now_add=True)
     updated_at = models.DateTimeField(_('Дата обновления'), auto_now=True)
 
@@ -99,16 +250,57 @@ class Refueling(models.Model):
         related_name='refuelings',
     )
 
+    # Те же значения, что у свойств effective_cost и fuel_consumption, но в БД:
+    # по ним можно сортировать, фильтровать и строить индексы
+    effective_cost_value = models.GeneratedField(
+        expression=Case(
+            When(Q(total_cost__isnull=True) | Q(total_cost=0), then=Value(Decimal('0'))),
+            default=F('total_cost') - Coalesce(F('discount'), Value(Decimal('0'))),
+        ),
+        output_field=models.DecimalField(max_digits=9, decimal_places=2),
+        db_persist=True,
+        verbose_name=_('Стоимость с учетом скидки (₽)'),
+    )
+    fuel_consumption_value = models.GeneratedField(
+        expression=Case(
+            # Пробег приводится к REAL: в SQLite целые значения делятся нацело
+            When(mileage__gt=0, then=ExpressionWrapper(
+                F('fuel_quantity') * Value(Decimal('100')) / Cast('mileage', models.FloatField()),
+                output_field=models.DecimalField(max_digits=12, decimal_places=4),
+            )),
+            default=Value(Decimal('0')),
+        ),
+        output_field=models.DecimalField(max_digits=12, decimal_places=4),
+        db_persist=True,
+        verbose_name=_('Расход (л/100 км)'),
+    )
+
     class Meta:
         verbose_name = _('Заправка')
         verbose_name_plural = _('Заправки')
         ordering = ['-date', '-created_at']
         indexes = [
             models.Index(fields=['date']),
-            models.Index(fields=['vehicle']),
             models.Index(fields=['fuel_type']),
+            # Список заправок пользователя в порядке Meta.ordering (+ id для keyset-пагинации)
+            models.Index(fields=['user', '-date', '-created_at', '-id'], name='refueling_user_date_idx'),
+            # Соседние заправки ТС по дате: одометр, проверка порядка дат, статистика.
+            # INCLUDE (Postgres) дает index-only scan, в SQLite не поддерживается и пропускается
+            models.Index(fields=['vehicle', 'date', 'id'], name='refueling_vehicle_date_idx',
+                         include=['odometer', 'mileage', 'fuel_quantity', 'price_per_liter', 'total_cost']),
+            # ETag списка (count и max(updated_at) только по индексу) и дельта-синхронизация
+            models.Index(fields=['user', 'updated_at'], name='refueling_user_updated_idx'),
+            # Статистика и отчеты по периодам ТС: GROUP BY (year, month) и фильтр по году/кварталу
+            models.Index(fields=['vehicle', 'year', 'quarter', 'month'], name='refueling_vehicle_period_idx'),
+            # Фильтр по диапазону сохраненного одометра
+            models.Index(fields=['vehicle', 'odometer'], name='refueling_vehicle_odometer_idx'),
+            # Сортировка заправок пользователя по расходу и стоимости (keyset: + id)
+            models.Index(fields=['user', '-fuel_consumption_value', '-id'], name='refueling_user_consumption_idx'),
+            models.Index(fields=['user', '-effective_cost_value', '-id'], name='refueling_user_cost_idx'),
         ]
 
+    tracked_fields = ('vehicle_id', 'date', 'mileage')
+
     def __str__(self):
         return f"{self.date}: {self.vehicle} - {self.fuel_quantity}л"
 
@@ -116,26 +308,89 @@ class Refueling(models.Model):
         if not self.user_id and self.vehicle_id:
             self.user = self.vehicle.user
 
+        self.calculate_total_cost()
+        self.fill_period()
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = update_fields = {*update_fields, 'updated_at'}
+            if 'date' in update_fields:
+                kwargs['update_fields'] = update_fields = {*update_fields, *self.period_fields}
+        if update_fields is not None and not {'vehicle', 'vehicle_id', 'date', 'mileage'} & set(update_fields):
+            self._previous_values = self.get_tracked_values()
+            super().save(*args, **kwargs)
+            return
+
+        with transaction.atomic():
+            loaded = self.get_loaded_values()
+            Vehicle.lock([self.vehicle_id, loaded and loaded['vehicle_id']])
+            moved = loaded is None or any(loaded[field] != getattr(self, field) for field in self.tracked_fields)
+            if moved:
+                # Заправка "вынимается" со старой позиции и вставляется в новую:
+                # одометры последующих заправок сдвигаются одним UPDATE
+                if loaded:
+                    self.shift_following(loaded['vehicle_id'], loaded['date'], -loaded['mileage'])
+                self.odometer = self.get_previous_odometer() + self.mileage
+                if update_fields is not None:
+                    kwargs['update_fields'] = {*update_fields, 'odometer'}
+            self._previous_values = loaded
+            super().save(*args, **kwargs)
+            if moved:
+                self.shift_following(self.vehicle_id, self.date, self.mileage)
+        self.remember_tracked_fields()
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            Vehicle.lock([self.vehicle_id])
+            # Пока ждали блокировку, заправку могли перенести: сдвиги считаются от сохраненных значений
+            loaded = type(self)._base_manager.filter(pk=self.pk).values(*self.tracked_fields).first()
+            if loaded and loaded['vehicle_id'] != self.vehicle_id:
+                Vehicle.lock([loaded['vehicle_id']])
+            for field, value in (loaded or {}).items():
+                setattr(self, field, value)
+            return super().delete(*args, **kwargs)
+
+    period_fields = ('year', 'month', 'quarter')
+
+    def fill_period(self):
+        """Год, месяц и квартал по дате; вызывается и перед bulk_create, где save() не работает"""
+        if self.date:
+            self.year = self.date.year
+            self.month = self.date.month
+            self.quarter = (self.date.month - 1) // 3 + 1
+
+    def calculate_total_cost(self):
         if self.fuel_quantity and self.price_per_liter:
             service_ops = Decimal(str(self.service_operation or 0))
             self.total_cost = (self.fuel_quantity * self.price_per_liter) + service_ops
-        super().save(*args, **kwargs)
 
-    @property
-    def odometer(self):
-        """Вычисляемый одометр на момент заправки"""
-        if not self.vehicle:
-            return 0
-
-        prev_refuel = Refueling.objects.filter(
-            vehicle=self.vehicle,
-            date__lt=self.date
-        ).order_by('-date').first()
-
-        if prev_refuel:
-            return prev_refuel.odometer + self.mileage
+    def get_tracked_values(self):
+        return {field: getattr(self, field) for field in self.tracked_fields}
+
+    def get_previous_odometer(self):
+        """Одометр предыдущей заправки ТС (или начальный пробег, если заправка первая)"""
+        if self.pk is None:
+            preceding = Q(date__lte=self.date)
         else:
-            return self.vehicle.initial_odometer + self.mileage
+            preceding = Q(date__lt=self.date) | Q(date=self.date, pk__lt=self.pk)
+
+        previous = Refueling.objects.filter(preceding, vehicle_id=OuterRef('pk')).exclude(
+            pk=self.pk
+        ).order_by('-date', '-pk').values('odometer')[:1]
+
+        # Начальный пробег берется из строки ТС (заблокированной в save), а не из закешированного self.vehicle
+        return Vehicle.objects.filter(pk=self.vehicle_id).values_list(
+            Coalesce(Subquery(previous), F('initial_odometer')), flat=True
+        ).get()
+
+    def shift_following(self, vehicle_id, date, delta):
+        """Сдвигает одометры заправок, идущих после позиции (date, pk) этой заправки"""
+        if not delta:
+            return
+        Refueling.objects.filter(
+            Q(date__gt=date) | Q(date=date, pk__gt=self.pk),
+            vehicle_id=vehicle_id,
+        ).exclude(pk=self.pk).update(odometer=F('odometer') + delta, updated_at=Now())
 
     @property
     def effective_cost(self):
@@ -152,11 +407,60 @@ class Refueling(models.Model):
         return 0
 
 
+def apply_refueling_changes(user_id, changes):
+    """Инкрементально обновляет производные данные по изменениям заправок.
+
+    changes - пары (старые, новые) значения tracked_fields заправки,
+    None вместо значений означает создание или удаление. Возвращает
+    изменения текущего пробега по ТС.
+    """
+    from forge import rollups, tasks
+
+    deltas = {}
+    touched = set()
+    for previous, current in changes:
+        for values, sign in ((previous, -1), (current, 1)):
+            if values:
+                deltas[values['vehicle_id']] = deltas.get(values['vehicle_id'], 0) + sign * values['mileage']
+                touched.add((values['vehicle_id'], values['date']))
+
+    for vehicle_id, delta in deltas.items():
+        Vehicle.shift_current_odometer(vehicle_id, delta)
+    tasks.schedule_statistics_refresh(touched)
+    rollups.invalidate_vehicle_summary(user_id, deltas)
+    return deltas
+
+
+# Заправки удаляются вместе с ТС (forge.deletion): одометры, пробег ТС и статистика не поддерживаются построчно
+deleting_history = contextvars.ContextVar('deleting_history', default=False)
+
+
+def is_parent_delete(origin):
+    """Удаление началось с ТС или пользователя: заправки уходят вместе с родителем"""
+    parents = (Vehicle, get_user_model())
+    if isinstance(origin, QuerySet):
+        return issubclass(origin.model, parents)
+    return isinstance(origin, parents)
+
+
 @receiver(post_save, sender=Refueling)
 @receiver(post_delete, sender=Refueling)
-def handle_refueling_change(sender, instance, **kwargs):
-    if instance.vehicle:
-        instance.vehicle.update_current_odometer()
+def handle_refueling_change(sender, instance, signal, origin=None, **kwargs):
+    if signal is post_delete and (deleting_history.get() or is_parent_delete(origin)):
+        return
+
+    current = instance.get_tracked_values()
+    if signal is post_delete:
+        # Удаление из queryset (админка) идет без Refueling.delete(): блокировка берется здесь
+        Vehicle.lock([instance.vehicle_id])
+        instance.shift_following(instance.vehicle_id, instance.date, -instance.mileage)
+        previous, current = current, None
+    else:
+        previous = instance._previous_values
+
+    deltas = apply_refueling_changes(instance.user_id, [(previous, current)])
+    if Refueling.vehicle.is_cached(instance) and instance.vehicle.pk in deltas:
+        instance.vehicle.current_odometer += deltas[instance.vehicle.pk]
 
 
 class FuelPrice(models.Model):
@@ -173,12 +477,30 @@ class FuelPrice(models.Model):
         verbose_name_plural = _('Цены на топливо')
         ordering = ['-date', 'fuel_type']
         unique_together = ['date', 'fuel_type', 'gas_station']
+        constraints = [
+            # NULL в unique_together не конфликтует: общая цена (без АЗС) - одна на дату и тип топлива
+            models.UniqueConstraint(fields=['date', 'fuel_type'], condition=Q(gas_station__isnull=True),
+                                    name='fuelprice_general_unique'),
+        ]
+        indexes = [
+            # Цена на дату: последняя запись АЗС и типа топлива не позже даты
+            models.Index(fields=['gas_station', 'fuel_type', '-date'], name='fuelprice_station_date_idx'),
+        ]
 
     def __str__(self):
         station = f" на {self.gas_station}" if self.gas_station else ""
         return f"{self.date}: {self.get_fuel_type_display()} - {self.price}₽{station}"
 
 
+@receiver(post_save, sender=FuelPrice)
+@receiver(post_delete, sender=FuelPrice)
+def handle_fuel_price_change(sender, instance, **kwargs):
+    """Правки цен поштучно (админка, импорт) сбрасывают кеш цен на дату"""
+    from forge import prices
+
+    prices.invalidate({(instance.gas_station_id, instance.fuel_type)})
+
+
 # Модель для статистики
 class FuelStatistics(models.Model):
     """Модель для хранения агрегированной статистики"""
@@ -201,3 +523,44 @@ class FuelStatistics(models.Model):
 
     def __str__(self):
         return f"{self.vehicle} - {self.period}: {self.avg_consumption}л/100км"
+
+
+class Tombstone(models.Model):
+    """След удаленной записи для дельта-синхронизации (forge.sync)"""
+    model = models.CharField(_('Модель'), max_length=20,
+                             choices=[('vehicle', 'ТС'), ('refueling', 'Заправка'), ('gasstation', 'АЗС')])
+    object_id = models.BigIntegerField(_('ID записи'))
+    # Пусто для общих записей (АЗС)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True,
+                             verbose_name=_('Пользователь'), related_name='+')
+    deleted_at = models.DateTimeField(_('Дата удаления'), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('Удаленная запись')
+        verbose_name_plural = _('Удаленные записи')
+        indexes = [
+            models.Index(fields=['user', 'deleted_at'], name='tombstone_user_deleted_idx'),
+            models.Index(fields=['deleted_at'], name='tombstone_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model} #{self.object_id}"
+
+
+@receiver(post_delete, sender=Refueling)
+@receiver(post_delete, sender=Vehicle)
+@receiver(post_delete, sender=GasStation)
+def record_tombstone(sender, instance, origin=None, **kwargs):
+    # При удалении пользователя синхронизировать уже нечего, заправки удаленного ТС клиент удаляет сам
+    if isinstance(origin, get_user_model()) or (isinstance(origin, QuerySet) and origin.model is get_user_model()):
+        return
+    if sender is Refueling and (deleting_history.get() or is_parent_delete(origin)):
+        return
+    Tombstone.objects.create(model=sender._meta.model_name, object_id=instance.pk,
+                             user_id=getattr(instance, 'user_id', None))
+
+
+@receiver(pre_delete, sender=GasStation)
+def handle_gas_station_delete(sender, instance, **kwargs):
+    """Заправки потеряют АЗС (SET_NULL без save): updated_at сдвигается для синхронизации и ETag"""
+    Refueling.objects.filter(gas_station=instance).update(updated_at=Now())
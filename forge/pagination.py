@@ -0,0 +1,218 @@
+import base64
+import datetime
+import json
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, Q
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+class KeysetPagination(CursorPagination):
+    """Keyset-пагинация по полному ключу сортировки.
+
+    Курсор хранит значения всех полей сортировки последней (или первой) строки
+    страницы, поэтому любая страница выбирается одним запросом по индексу
+    без OFFSET. Сортировка берется из view.ordering или Meta.ordering модели,
+    в конец всегда добавляется pk для однозначности. NULL в необязательных
+    полях считается больше любого значения (как по умолчанию в PostgreSQL),
+    порядок задается явно, чтобы на SQLite он был тем же.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = settings.MAX_PAGE_SIZE
+    invalid_cursor_message = _('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """То же для асинхронных view: страница читается асинхронным ORM"""
+        queryset = self.page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page([row async for row in queryset])
+
+    def page_queryset(self, queryset, request, view=None):
+        """Запрос страницы (на одну строку больше, чтобы узнать о следующей), без выполнения"""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.nullable = {term.lstrip('-') for term in self.ordering if self._nullable(queryset, term.lstrip('-'))}
+        self.cursor = self.decode_cursor(request)
+        if self.cursor:
+            self.cursor['key'] = self.parse_key(queryset, self.cursor['key'])
+
+        ordering = [self._invert(term) for term in self.ordering] if self.reverse else self.ordering
+        queryset = queryset.order_by(*(self._order_by(term) for term in ordering))
+        if self.cursor:
+            queryset = queryset.filter(self._after(ordering, self.cursor['key']))
+        return queryset[:self.page_size + 1]
+
+    @property
+    def reverse(self):
+        return bool(self.cursor and self.cursor['reverse'])
+
+    def set_page(self, rows):
+        reverse = self.reverse
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.page = rows
+        self.has_next = has_more if not reverse else True
+        self.has_previous = has_more if reverse else self.cursor is not None
+        return rows
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'ordering', None)
+        if not ordering and queryset.query.order_by and all(isinstance(term, str) for term in queryset.query.order_by):
+            ordering = queryset.query.order_by
+        ordering = ordering or queryset.model._meta.ordering
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        ordering = [self._column(queryset, term) for term in ordering]
+        if not any(term.lstrip('-') in ('pk', 'id') for term in ordering):
+            ordering.append('-pk' if ordering and ordering[-1].startswith('-') else 'pk')
+        return ordering
+
+    @staticmethod
+    def _column(queryset, term):
+        """Внешний ключ сортируется по своей колонке (vehicle_id): курсор сравнивает ее же,
+        а не поля Meta.ordering связанной модели"""
+        name = term.lstrip('-')
+        try:
+            field = queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return term
+        if not field.is_relation or not field.concrete or field.many_to_many:
+            return term
+        return term.replace(name, field.attname)
+
+    def get_ordering_columns(self, request, queryset, view):
+        """Колонки сортировки без pk: строки страницы должны их содержать для курсора"""
+        ordering = self.get_ordering(request, queryset, view)
+        return [term.lstrip('-') for term in ordering if term.lstrip('-') != 'pk']
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self._link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self._link(self.page[0], reverse=True)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            if len(cursor['key']) != len(self.ordering):
+                raise ValueError
+            return {'key': cursor['key'], 'reverse': bool(cursor.get('reverse'))}
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def parse_key(self, queryset, key):
+        """Значения курсора приводятся к типам полей сортировки: клиент может прислать что угодно"""
+        parsed = []
+        for term, value in zip(self.ordering, key):
+            if value is None and term.lstrip('-') in self.nullable:
+                parsed.append(None)
+                continue
+            if value is None or isinstance(value, (list, dict)):
+                raise NotFound(self.invalid_cursor_message)
+            try:
+                parsed.append(self._field(queryset, term.lstrip('-')).to_python(value))
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+        return parsed
+
+    @staticmethod
+    def _field(queryset, name):
+        opts = queryset.model._meta
+        if name == 'pk':
+            return opts.pk
+        try:
+            field = opts.get_field(name)
+        except FieldDoesNotExist:
+            return queryset.query.annotations[name].output_field
+        # GeneratedField хранит тип значения в output_field
+        return getattr(field, 'output_field', None) or field
+
+    @staticmethod
+    def _nullable(queryset, name):
+        try:
+            return queryset.model._meta.get_field(name).null
+        except FieldDoesNotExist:
+            # pk и аннотации
+            return False
+
+    def encode_cursor(self, cursor):
+        encoded = base64.urlsafe_b64encode(json.dumps(cursor, separators=(',', ':')).encode('ascii'))
+        url = remove_query_param(self.base_url, self.cursor_query_param)
+        return replace_query_param(url, self.cursor_query_param, encoded.decode('ascii'))
+
+    def _link(self, row, reverse):
+        key = [self._serialize(self._value(row, term.lstrip('-'))) for term in self.ordering]
+        return self.encode_cursor({'key': key, 'reverse': reverse})
+
+    @staticmethod
+    def _invert(term):
+        return term[1:] if term.startswith('-') else f'-{term}'
+
+    def _order_by(self, term):
+        name = term.lstrip('-')
+        if name not in self.nullable:
+            return term
+        # NULL - последним по возрастанию и первым по убыванию
+        return F(name).desc(nulls_first=True) if term.startswith('-') else F(name).asc(nulls_last=True)
+
+    def _after(self, ordering, key):
+        """(f1, f2, ...) строго после key с учетом направления каждого поля и NULL"""
+        condition = Q()
+        equal = Q()
+        for term, value in zip(ordering, key):
+            name = term.lstrip('-')
+            descending = term.startswith('-')
+            if value is None:
+                # После NULL по убыванию идут все значения, по возрастанию - ничего
+                after = Q(**{f'{name}__isnull': False}) if descending else None
+            else:
+                after = Q(**{f'{name}__{"lt" if descending else "gt"}': value})
+                if not descending and name in self.nullable:
+                    after |= Q(**{f'{name}__isnull': True})
+            if after is not None:
+                condition |= equal & after
+            equal &= Q(**{f'{name}__isnull': True}) if value is None else Q(**{name: value})
+        return condition
+
+    @staticmethod
+    def _value(row, name):
+        if isinstance(row, dict):
+            return row[name] if name != 'pk' else row.get('pk', row.get('id'))
+        if name != 'pk':
+            name = row._meta.get_field(name).attname
+        return getattr(row, name)
+
+    @staticmethod
+    def _serialize(value):
+        if isinstance(value, (datetime.date, datetime.datetime)):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return str(value)
+        return value
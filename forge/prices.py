@@ -0,0 +1,149 @@
+"""Цены на топливо: пакетная загрузка ежедневных фидов и цена на дату.
+
+Загрузка идет upsert-ом по уникальному ключу (дата, тип топлива, АЗС)
+пачками bulk_create, без чтения существующих строк. Цена на дату - последняя
+цена АЗС не позже даты (индекс fuelprice_station_date_idx), а если у АЗС цен
+нет - общая цена без АЗС. Результаты кешируются; кеш пары (АЗС, тип топлива)
+сбрасывается сменой поколения при загрузке или правке цен. Для пачки заправок
+цены на все даты берутся двумя запросами (prices_as_of) мимо кеша.
+"""
+import bisect
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+
+from forge import models
+
+MISSING = 'missing'
+
+
+def ingest(rows, batch_size=5000):
+    """Загружает строки {date, fuel_type, price, gas_station (id или None)}, возвращает число цен.
+
+    Повторы ключа внутри фида схлопываются (побеждает последняя строка).
+    """
+    latest = {}
+    for row in rows:
+        latest[(row['date'], row['fuel_type'], row.get('gas_station'))] = row['price']
+
+    station_prices = []
+    general_prices = []
+    for (date, fuel_type, gas_station_id), price in latest.items():
+        price = models.FuelPrice(date=date, fuel_type=fuel_type, gas_station_id=gas_station_id, price=price)
+        (station_prices if gas_station_id is not None else general_prices).append(price)
+
+    with transaction.atomic():
+        models.FuelPrice.objects.bulk_create(
+            station_prices,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['date', 'fuel_type', 'gas_station'],
+            update_fields=['price'],
+        )
+        # Общая цена (без АЗС) - одна на дату и тип топлива (fuelprice_general_unique), но NULL
+        # не конфликтует в unique_together: старые цены удаляются по датам каждого типа топлива.
+        # Удаление без Collector и post_delete на каждую строку: кеш сбрасывается один раз ниже
+        dates = {}
+        for price in general_prices:
+            dates.setdefault(price.fuel_type, []).append(price.date)
+        for fuel_type, fuel_dates in dates.items():
+            for offset in range(0, len(fuel_dates), batch_size):
+                queryset = models.FuelPrice.objects.filter(
+                    gas_station__isnull=True, fuel_type=fuel_type, date__in=fuel_dates[offset:offset + batch_size]
+                )
+                queryset._raw_delete(queryset.db)
+        models.FuelPrice.objects.bulk_create(general_prices, batch_size=batch_size)
+
+    invalidate({(gas_station_id, fuel_type) for _, fuel_type, gas_station_id in latest})
+    return len(latest)
+
+
+def _generation_key(gas_station_id, fuel_type):
+    return f'forge:fuel-price-generation:{gas_station_id}:{fuel_type}'
+
+
+def invalidate(pairs):
+    """Сбрасывает кеш цен на дату для пар (id АЗС или None, тип топлива)"""
+    cache.delete_many([_generation_key(gas_station_id, fuel_type) for gas_station_id, fuel_type in pairs])
+
+
+def _generations(gas_station_id, fuel_type):
+    """Поколения кеша АЗС и общих цен: цена АЗС может быть взята из общих"""
+    keys = [_generation_key(gas_station_id, fuel_type), _generation_key(None, fuel_type)]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, uuid.uuid4().hex, None)
+            generations[key] = cache.get(key)
+    return ':'.join(str(generations[key]) for key in keys)
+
+
+def _lookup(gas_station_id, fuel_type, date):
+    prices = models.FuelPrice.objects.filter(fuel_type=fuel_type, date__lte=date).order_by('-date').values_list(
+        'price', flat=True
+    )
+    if gas_station_id is not None:
+        price = prices.filter(gas_station_id=gas_station_id).first()
+        if price is not None:
+            return price
+    return prices.filter(gas_station__isnull=True).first()
+
+
+def price_as_of(gas_station_id, fuel_type, date):
+    """Цена топлива на дату для АЗС (или общая), None - если цен нет"""
+    timeout = settings.FUEL_PRICE_CACHE_TIMEOUT
+    if not timeout:
+        return _lookup(gas_station_id, fuel_type, date)
+
+    generations = _generations(gas_station_id, fuel_type)
+    key = f'forge:fuel-price:{gas_station_id}:{fuel_type}:{date.isoformat()}:{generations}'
+    price = cache.get(key)
+    if price is None:
+        price = _lookup(gas_station_id, fuel_type, date)
+        cache.set(key, MISSING if price is None else price, timeout)
+    return None if price == MISSING else price
+
+
+def prices_as_of(keys):
+    """Цены для набора ключей (id АЗС или None, тип топлива, дата): {ключ: цена или None}.
+
+    Правило то же, что у price_as_of. Читаются цены в диапазоне дат пачки и
+    последняя цена каждой пары до его начала, поиск по дате - в памяти.
+    """
+    keys = set(keys)
+    if not keys:
+        return {}
+    first = min(date for _, _, date in keys)
+    last = max(date for _, _, date in keys)
+    fuel_types = {fuel_type for _, fuel_type, _ in keys}
+    station_ids = {gas_station_id for gas_station_id, _, _ in keys if gas_station_id is not None}
+
+    scope = models.FuelPrice.objects.filter(
+        Q(gas_station__isnull=True) | Q(gas_station_id__in=station_ids), fuel_type__in=fuel_types
+    ).order_by()
+    before = scope.filter(date__lt=first).annotate(
+        rank=Window(RowNumber(), partition_by=[F('gas_station_id'), F('fuel_type')], order_by=F('date').desc())
+    ).filter(rank=1)
+    series = {}
+    for queryset in (before, scope.filter(date__range=(first, last))):
+        for gas_station_id, fuel_type, date, price in queryset.values_list('gas_station_id', 'fuel_type', 'date', 'price'):
+            series.setdefault((gas_station_id, fuel_type), []).append((date, price))
+    for rows in series.values():
+        rows.sort()
+    dates = {pair: [date for date, _ in rows] for pair, rows in series.items()}
+
+    def find(pair, date):
+        index = bisect.bisect_right(dates.get(pair, ()), date)
+        return series[pair][index - 1][1] if index else None
+
+    result = {}
+    for gas_station_id, fuel_type, date in keys:
+        price = find((gas_station_id, fuel_type), date) if gas_station_id is not None else None
+        if price is None:
+            price = find((None, fuel_type), date)
+        result[(gas_station_id, fuel_type, date)] = price
+    return result
@@ -0,0 +1,41 @@
+from import_export import fields, resources, widgets
+
+from forge import models
+
+
+class GasStation(resources.ModelResource):
+    class Meta:
+        model = models.GasStation
+        fields = ('id', 'name', 'number', 'address', 'company')
+
+
+class Vehicle(resources.ModelResource):
+    class Meta:
+        model = models.Vehicle
+        # current_odometer не импортируется: он поддерживается заправками
+        fields = ('id', 'name', 'brand', 'model', 'year', 'license_plate', 'initial_odometer', 'is_active', 'user')
+
+
+class Refueling(resources.ModelResource):
+    vehicle = fields.Field(attribute='vehicle', column_name='vehicle',
+                           widget=widgets.ForeignKeyWidget(models.Vehicle))
+    gas_station = fields.Field(attribute='gas_station', column_name='gas_station',
+                               widget=widgets.ForeignKeyWidget(models.GasStation))
+
+    class Meta:
+        model = models.Refueling
+        fields = (
+            'id', 'date', 'vehicle', 'mileage', 'fuel_quantity', 'price_per_liter', 'service_operation',
+            'discount', 'gas_station', 'fuel_type', 'is_full_tank', 'comment',
+        )
+        export_order = fields
+
+
+class FuelPrice(resources.ModelResource):
+    gas_station = fields.Field(attribute='gas_station', column_name='gas_station',
+                               widget=widgets.ForeignKeyWidget(models.GasStation))
+
+    class Meta:
+        model = models.FuelPrice
+        fields = ('id', 'date', 'fuel_type', 'price', 'gas_station')
+        import_id_fields = ('date', 'fuel_type', 'gas_station')
@@ -0,0 +1,201 @@
+"""Расчет агрегированной статистики FuelStatistics по заправкам.
+
+Заправки группируются одним запросом по сохраненным (ТС, год, месяц) -
+индекс refueling_vehicle_period_idx, кварталы и годы складываются из
+месячных строк. При изменении заправки пересчитываются
+только затронутые годы.
+
+Средний расход периода - расход между полными баками (forge.consumption),
+взвешенный по пробегу отрезков; без закрытых отрезков - литры на пробег.
+"""
+import datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import DecimalField, F, Q, Sum
+
+from forge import consumption, models
+
+PERIOD_TYPES = ('month', 'quarter', 'year')
+STATISTICS_FIELDS = ['total_distance', 'total_fuel', 'total_cost', 'avg_consumption', 'avg_price']
+
+MAX_AVERAGE = Decimal('9999.99')
+CENT = Decimal('0.01')
+
+
+def period_start(date, period_type):
+    """Первый день периода, содержащего date"""
+    if period_type == 'year':
+        return datetime.date(date.year, 1, 1)
+    if period_type == 'quarter':
+        return datetime.date(date.year, (date.month - 1) // 3 * 3 + 1, 1)
+    return datetime.date(date.year, date.month, 1)
+
+
+def _average(numerator, denominator, scale=1):
+    if not numerator or not denominator:
+        return Decimal('0')
+    value = Decimal(numerator) * scale / Decimal(denominator)
+    return min(value, MAX_AVERAGE).quantize(CENT)
+
+
+def _monthly(refuelings):
+    """Один GROUP BY (ТС, год, месяц) по переданным заправкам.
+
+    Квартал однозначно задан месяцем, но с ним группировка идет в порядке
+    индекса refueling_vehicle_period_idx, без сортировки.
+    """
+    return refuelings.order_by().values('vehicle_id', 'year', 'quarter', 'month').annotate(
+        distance=Sum('mileage'),
+        fuel=Sum('fuel_quantity'),
+        cost=Sum('total_cost'),
+        priced_fuel=Sum(F('fuel_quantity') * F('price_per_liter'),
+                        output_field=DecimalField(max_digits=14, decimal_places=4)),
+        closed_distance=Sum('full_tank_distance'),
+        weighted_consumption=Sum(F('full_tank_consumption') * F('full_tank_distance'),
+                                 output_field=DecimalField(max_digits=16, decimal_places=4)),
+    )
+
+
+TOTALS = ('distance', 'fuel', 'cost', 'priced_fuel', 'closed_distance', 'weighted_consumption')
+
+
+def _build(monthly_rows):
+    """Складывает месячные строки в статистику за месяц, квартал и год"""
+    totals = {}
+    for row in monthly_rows:
+        for period_type in PERIOD_TYPES:
+            month_start = datetime.date(row['year'], row['month'], 1)
+            key = (row['vehicle_id'], period_start(month_start, period_type), period_type)
+            total = totals.setdefault(key, dict.fromkeys(TOTALS, 0))
+            for name in total:
+                total[name] += row[name] or 0
+
+    return [
+        models.FuelStatistics(
+            vehicle_id=vehicle_id,
+            period=period,
+            period_type=period_type,
+            total_distance=total['distance'],
+            total_fuel=total['fuel'],
+            total_cost=total['cost'],
+            avg_consumption=(
+                _average(total['weighted_consumption'], total['closed_distance'])
+                if total['closed_distance']
+                else _average(total['fuel'], total['distance'], scale=100)
+            ),
+            avg_price=_average(total['priced_fuel'], total['fuel']),
+        )
+        for (vehicle_id, period, period_type), total in totals.items()
+    ]
+
+
+def rebuild_statistics(vehicle_ids=None, batch_size=500):
+    """Полная перестройка статистики (всех ТС или переданных), возвращает число строк"""
+    vehicles = models.Vehicle.objects.order_by('pk').values_list('pk', flat=True)
+    if vehicle_ids is not None:
+        vehicles = vehicles.filter(pk__in=vehicle_ids)
+    vehicles = list(vehicles)
+
+    created = 0
+    for offset in range(0, len(vehicles), batch_size):
+        batch = vehicles[offset:offset + batch_size]
+        consumption.rebuild(batch)
+        statistics = _build(_monthly(models.Refueling.objects.filter(vehicle_id__in=batch)))
+        with transaction.atomic():
+            models.FuelStatistics.objects.filter(vehicle_id__in=batch).delete()
+            models.FuelStatistics.objects.bulk_create(statistics, batch_size=1000)
+        created += len(statistics)
+    return created
+
+
+def update_statistics(touched):
+    """Пересчет статистики только за годы, затронутые изменением заправок.
+
+    touched - набор пар (vehicle_id, date) со старыми и новыми значениями заправок.
+    """
+    years = {(vehicle_id, date.year) for vehicle_id, date in touched}
+    if not years:
+        return
+
+    in_years = Q()
+    for vehicle_id, year in years:
+        in_years |= Q(vehicle_id=vehicle_id, year=year)
+
+    statistics = _build(_monthly(models.Refueling.objects.filter(in_years)))
+
+    stale = Q()
+    for vehicle_id, year in years:
+        stale |= Q(vehicle_id=vehicle_id, period__year=year)
+    keep = Q(pk__in=[])
+    for row in statistics:
+        keep |= Q(vehicle_id=row.vehicle_id, period=row.period, period_type=row.period_type)
+
+    with transaction.atomic():
+        models.FuelStatistics.objects.bulk_create(
+            statistics,
+            update_conflicts=True,
+            unique_fields=['vehicle', 'period', 'period_type'],
+            update_fields=STATISTICS_FIELDS,
+        )
+        # Периоды, в которых не осталось заправок
+        models.FuelStatistics.objects.filter(stale).exclude(keep).delete()
+
+
+def summary_cache_key(user_id, vehicle_id):
+    return f'forge:vehicle-summary:{user_id}:{vehicle_id}'
+
+
+def _summary(user, vehicle_id):
+    return models.Vehicle.objects.filter(pk=vehicle_id, user=user).order_by().annotate(
+        total_cost=Sum('refueling__total_cost'),
+        total_fuel=Sum('refueling__fuel_quantity'),
+    ).values('id', 'name', 'total_cost', 'total_fuel')
+
+
+def vehicle_summary(user, vehicle_id):
+    """Данные ТС и итоги по заправкам одним запросом с учетом владельца.
+
+    При FUEL_STATISTICS_SUMMARY_CACHE_TIMEOUT > 0 результат кешируется,
+    кеш сбрасывается при изменении заправок ТС.
+    """
+    timeout = settings.FUEL_STATISTICS_SUMMARY_CACHE_TIMEOUT
+    key = summary_cache_key(user.pk, vehicle_id)
+    if timeout:
+        summary = cache.get(key)
+        if summary is not None:
+            return summary
+
+    try:
+        summary = _summary(user, vehicle_id).first()
+    except (ValueError, TypeError):
+        return None
+
+    if summary is not None and timeout:
+        cache.set(key, summary, timeout)
+    return summary
+
+
+async def avehicle_summary(user, vehicle_id):
+    """Асинхронный вариант vehicle_summary"""
+    timeout = settings.FUEL_STATISTICS_SUMMARY_CACHE_TIMEOUT
+    key = summary_cache_key(user.pk, vehicle_id)
+    if timeout:
+        summary = await cache.aget(key)
+        if summary is not None:
+            return summary
+
+    try:
+        summary = await _summary(user, vehicle_id).afirst()
+    except (ValueError, TypeError):
+        return None
+
+    if summary is not None and timeout:
+        await cache.aset(key, summary, timeout)
+    return summary
+
+
+def invalidate_vehicle_summary(user_id, vehicle_ids):
+    cache.delete_many([summary_cache_key(user_id, vehicle_id) for vehicle_id in vehicle_ids])
@@ -0,0 +1,113 @@
+"""Быстрое чтение списков: строки ответа из .values() без экземпляров моделей и полей DRF.
+
+Сериализатор на каждую строку создает экземпляр модели и для каждого поля
+проходит get_attribute/to_representation с проверками настроек. Здесь по
+полям сериализатора (с учетом ?fields=/?omit=) один раз собираются
+преобразователи колонок .values(): Decimal - квантование и строка, даты -
+ISO, внешний ключ - id. Вычисляемые поля (SerializerMethodField) считаются
+теми же методами сериализатора над легким объектом строки с колонками из
+field_dependencies и свойствами модели. Поля, для которых преобразователя
+нет, идут через их to_representation, так что формат ответа совпадает с
+сериализатором.
+"""
+import decimal
+from types import SimpleNamespace
+
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+
+def _decimal(field):
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if field.decimal_places is None or field.normalize_output or field.localize or not coerce_to_string:
+        return field.to_representation
+    quantum = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        return f'{value.quantize(quantum, rounding=rounding, context=context):f}'
+    return convert
+
+
+def _datetime(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601:
+        return field.to_representation
+    timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if timezone is None:
+        return field.to_representation
+
+    def convert(value):
+        # Из БД при USE_TZ приходит aware-время: достаточно перевести в часовой пояс поля
+        value = value.astimezone(timezone) if value.tzinfo is not None else field.enforce_timezone(value)
+        value = value.isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return convert
+
+
+def _date(field):
+    output_format = getattr(field, 'format', api_settings.DATE_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601:
+        return field.to_representation
+    return lambda value: value.isoformat()
+
+
+def converter(field):
+    """Преобразователь значения колонки .values() для поля сериализатора, None - значение как есть"""
+    if isinstance(field, serializers.DecimalField):
+        return _decimal(field)
+    if isinstance(field, serializers.DateTimeField):
+        return _datetime(field)
+    if isinstance(field, serializers.DateField):
+        return _date(field)
+    # Значения из БД уже в нужном виде: to_representation их не меняет (None - без преобразования)
+    if isinstance(field, (serializers.PrimaryKeyRelatedField, serializers.ChoiceField)):
+        return None
+    if type(field) in (serializers.IntegerField, serializers.BooleanField, serializers.CharField):
+        return None
+    return field.to_representation
+
+
+class RowBuilder:
+    """Строки ответа по полям сериализатора из словарей .values(self.columns)"""
+
+    def __init__(self, serializer):
+        model = serializer.Meta.model
+        dependencies = getattr(serializer, 'field_dependencies', {})
+        columns = {'id'}
+        properties = {}
+        self.steps = []
+        for name, field in serializer.fields.items():
+            if isinstance(field, serializers.SerializerMethodField):
+                columns.update(dependencies[name])
+                attribute = getattr(model, name, None)
+                if isinstance(attribute, property):
+                    properties[name] = attribute
+                self.steps.append((name, None, getattr(serializer, field.method_name)))
+            else:
+                columns.add(field.source)
+                self.steps.append((name, field.source, converter(field)))
+        self.columns = sorted(columns)
+        self.computed = any(column is None for _, column, _ in self.steps)
+        # Методы сериализатора читают свойства модели: они переносятся на объект строки
+        self.row_class = type(f'{model.__name__}Row', (SimpleNamespace,), properties)
+
+    def build(self, rows):
+        steps, row_class, computed = self.steps, self.row_class, self.computed
+        result = []
+        for row in rows:
+            obj = row_class(**row) if computed else None
+            item = {}
+            for name, column, convert in steps:
+                if column is None:
+                    item[name] = convert(obj)
+                elif convert is None:
+                    item[name] = row[column]
+                else:
+                    value = row[column]
+                    item[name] = None if value is None else convert(value)
+            result.append(item)
+        return result
@@ -1,6 +1,7 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Max
 from rest_framework import serializers
-from forge import models
+from forge import models, prices, rollups
 
 
 class Vehicle(serializers.ModelSerializer):
@@ -31,8 +32,94 @@ class Vehicle(serializers.ModelSerializer):
         return data
 
 
-class Refueling(serializers.ModelSerializer):
-    odometer = serializers.SerializerMethodField(read_only=True)
+MISSING_PRICE = "Цена не указана и не найдена в ценах на топливо на дату заправки"
+
+
+def fill_price(data, gas_station_id):
+    """Если цена за литр не указана, берем цену АЗС (или общую) на дату заправки"""
+    if data.get('price_per_liter') is not None:
+        return
+    price = None
+    if data.get('fuel_type'):
+        price = prices.price_as_of(gas_station_id, data['fuel_type'], data['date'])
+    if price is None:
+        raise serializers.ValidationError({"price_per_liter": MISSING_PRICE})
+    data['price_per_liter'] = price
+
+
+def validate_mileage(mileage):
+    """Проверки пробега между заправками, общие для одиночного и пакетного создания"""
+    # Проверяем, что пробег не отрицательный
+    if mileage < 0:
+        raise serializers.ValidationError({
+            "mileage": "Пробег не может быть отрицательным"
+        })
+
+    # Проверка минимального пробега
+    if mileage == 0:
+        raise serializers.ValidationError({
+            "mileage": "Пробег должен быть больше 0"
+        })
+
+    if mileage > 5000:
+        raise serializers.ValidationError({
+            "mileage": "Пробег между заправками не может превышать 5000 км"
+        })
+
+
+class VehicleSummary(Vehicle):
+    """ТС с итогами по заправкам из аннотаций queryset (views.vehicle.Vehicle.with_summary)"""
+    refuel_count = serializers.IntegerField(read_only=True)
+    last_refuel_date = serializers.DateField(read_only=True)
+    total_fuel = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    total_cost = serializers.DecimalField(max_digits=14, decimal_places=2, read_only=True)
+    avg_price = serializers.SerializerMethodField()
+
+    def get_avg_price(self, vehicle):
+        # Средняя цена, взвешенная по литрам, как в FuelStatistics
+        if not vehicle.total_fuel:
+            return None
+        return str(rollups._average(vehicle.priced_fuel, vehicle.total_fuel))
+
+
+def requested_fields(request, available):
+    """Поля из ?fields= за вычетом ?omit= (только для GET), None - без ограничений.
+
+    Неизвестные имена пропускаются, id остается всегда.
+    """
+    if request is None or request.method != 'GET':
+        return None
+    fields = request.query_params.get('fields')
+    omit = request.query_params.get('omit')
+    if not fields and not omit:
+        return None
+    names = {name.strip() for name in fields.split(',')} if fields else set(available)
+    names -= {name.strip() for name in (omit or '').split(',')}
+    return [name for name in available if name in names or name == 'id']
+
+
+class SparseFieldsMixin:
+    """?fields=/?omit=: лишние поля убираются до сериализации, вычисляемые не считаются"""
+    # Поля модели, которые читают вычисляемые поля сериализатора
+    field_dependencies = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        kept = requested_fields(self.context.get('request'), list(self.fields))
+        self.is_sparse = kept is not None
+        if self.is_sparse:
+            for name in set(self.fields) - set(kept):
+                self.fields.pop(name)
+
+    def model_fields(self):
+        """Поля модели для .only(): источники оставшихся полей и зависимости вычисляемых"""
+        names = {'id'}
+        for name, field in self.fields.items():
+            names.update(self.field_dependencies.get(name, () if field.source == '*' else (field.source,)))
+        return sorted(names)
+
+
+class Refueling(SparseFieldsMixin, serializers.ModelSerializer):
     fuel_consumption = serializers.SerializerMethodField(read_only=True)
     effective_cost = serializers.SerializerMethodField(read_only=True)
     user = serializers.PrimaryKeyRelatedField(read_only=True)
@@ -42,20 +129,23 @@ class Refueling(serializers.ModelSerializer):
         super().__init__(*args, **kwargs)
 
         request = self.context.get('request')
-        if request and request.user and not request.user.is_anonymous:
+        if request and request.user and not request.user.is_anonymous and 'vehicle' in self.fields:
             self.fields['vehicle'].queryset = models.Vehicle.objects.filter(user=request.user)
 
     class Meta:
         model = models.Refueling
-        fields = '__all__'
+        # Значения отдаются через fuel_consumption и effective_cost
+        exclude = ['fuel_consumption_value', 'effective_cost_value']
         read_only_fields = [
-            'odometer', 'month', 'quarter', 'created_at', 'updated_at',
+            'odometer', 'year', 'month', 'quarter', 'created_at', 'updated_at',
             'total_cost', 'fuel_consumption', 'effective_cost', 'user'
         ]
+        extra_kwargs = {'price_per_liter': {'required': False}}
 
-    def get_odometer(self, obj):
-        """Вычисляемое поле одометра"""
-        return obj.odometer
+    field_dependencies = {
+        'fuel_consumption': ('mileage', 'fuel_quantity'),
+        'effective_cost': ('total_cost', 'discount'),
+    }
 
     def get_fuel_consumption(self, obj):
         """Расход топлива на 100 км"""
@@ -93,22 +183,11 @@ class Refueling(serializers.ModelSerializer):
                             "Сначала удалите или отредактируйте более поздние заправки."
                 })
 
-            # Проверяем, что пробег не отрицательный
-            if mileage < 0:
-                raise serializers.ValidationError({
-                    "mileage": "Пробег не может быть отрицательным"
-                })
-
-            # Проверка минимального пробега
-            if mileage == 0:
-                raise serializers.ValidationError({
-                    "mileage": "Пробег должен быть больше 0"
-                })
+            validate_mileage(mileage)
 
-            if mileage > 5000:
-                raise serializers.ValidationError({
-                    "mileage": "Пробег между заправками не может превышать 5000 км"
-                })
+        if self.instance is None and date:
+            gas_station = data.get('gas_station')
+            fill_price(data, gas_station.pk if gas_station else None)
 
         return data
 
@@ -141,12 +220,162 @@ class Refueling(serializers.ModelSerializer):
         return super().update(instance, validated_data)
 
 
+class RefuelingBulkList(serializers.ListSerializer):
+    """Пакетное создание заправок.
+
+    Владение ТС, существование АЗС, порядок дат и недостающие цены
+    проверяются несколькими запросами на всю пачку, строки вставляются одним
+    bulk_create, а одометры и статистика обновляются один раз на каждое
+    затронутое ТС. При записи ТС блокируются, а одометры и порядок дат
+    перечитываются: между проверкой и записью могли добавиться заправки.
+    """
+    date_error = ("Нельзя добавить заправку с датой раньше существующих будущих заправок. "
+                  "Сначала удалите или отредактируйте более поздние заправки.")
+
+    @staticmethod
+    def last_dates(vehicle_ids):
+        return dict(
+            models.Refueling.objects.filter(vehicle_id__in=vehicle_ids).order_by().values('vehicle_id').annotate(
+                last_date=Max('date')
+            ).values_list('vehicle_id', 'last_date')
+        )
+
+    def to_internal_value(self, data):
+        # Ошибки пачки возвращаются списком по строкам, как и ошибки отдельных строк
+        attrs = super().to_internal_value(data)
+        user = self.context['request'].user
+        vehicle_ids = {item['vehicle'] for item in attrs}
+        station_ids = {item['gas_station'] for item in attrs if item.get('gas_station')}
+
+        vehicles = set(models.Vehicle.objects.filter(user=user, pk__in=vehicle_ids).values_list('pk', flat=True))
+        stations = set(models.GasStation.objects.filter(pk__in=station_ids).values_list('pk', flat=True))
+        last_dates = self.last_dates(vehicles)
+        found_prices = prices.prices_as_of(
+            (item.get('gas_station'), item['fuel_type'], item['date'])
+            for item in attrs if item.get('price_per_liter') is None and item.get('fuel_type')
+        )
+
+        errors = []
+        for item in attrs:
+            error = {}
+            if item['vehicle'] not in vehicles:
+                error['vehicle'] = ["Это транспортное средство не принадлежит вам"]
+            elif item['vehicle'] in last_dates and item['date'] < last_dates[item['vehicle']]:
+                error['date'] = [self.date_error]
+            if item.get('gas_station') and item['gas_station'] not in stations:
+                error['gas_station'] = ["АЗС не найдена"]
+            if item.get('price_per_liter') is None:
+                price = found_prices.get((item.get('gas_station'), item.get('fuel_type'), item['date']))
+                if price is None:
+                    error['price_per_liter'] = [MISSING_PRICE]
+                item['price_per_liter'] = price
+            errors.append(error)
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return attrs
+
+    def create(self, validated_data):
+        user = self.context['request'].user
+        vehicle_ids = {item['vehicle'] for item in validated_data}
+
+        with transaction.atomic():
+            odometers = dict(
+                models.Vehicle.objects.select_for_update().filter(pk__in=vehicle_ids).order_by('pk').values_list(
+                    'pk', 'current_odometer'
+                )
+            )
+            last_dates = self.last_dates(vehicle_ids)
+            errors = [
+                {'date': [self.date_error]} if item['date'] < last_dates.get(item['vehicle'], item['date']) else {}
+                for item in validated_data
+            ]
+            if any(errors):
+                raise serializers.ValidationError(errors)
+
+            # Новые заправки идут после существующих, поэтому одометр - накопленная сумма,
+            # а порядок вставки (и pk) совпадает с порядком дат
+            refuelings = []
+            for item in sorted(validated_data, key=lambda item: item['date']):
+                vehicle_id = item.pop('vehicle')
+                station_id = item.pop('gas_station', None)
+                odometers[vehicle_id] += item['mileage']
+                refueling = models.Refueling(
+                    **item, vehicle_id=vehicle_id, gas_station_id=station_id, user=user,
+                    odometer=odometers[vehicle_id]
+                )
+                refueling.calculate_total_cost()
+                refueling.fill_period()
+                refuelings.append(refueling)
+
+            models.Refueling.objects.bulk_create(refuelings, batch_size=1000)
+            models.apply_refueling_changes(user.pk, [(None, refueling.get_tracked_values()) for refueling in refuelings])
+        return refuelings
+
+
+class RefuelingBulk(serializers.ModelSerializer):
+    """Строка пакета заправок: связи и недостающие цены проверяются для всей пачки сразу"""
+    vehicle = serializers.IntegerField()
+    gas_station = serializers.IntegerField(required=False, allow_null=True)
+
+    class Meta:
+        model = models.Refueling
+        fields = [
+            'date', 'mileage', 'fuel_quantity', 'price_per_liter', 'service_operation', 'discount',
+            'gas_station', 'vehicle', 'fuel_type', 'is_full_tank', 'comment',
+        ]
+        list_serializer_class = RefuelingBulkList
+        extra_kwargs = {'price_per_liter': {'required': False}}
+
+    def validate(self, data):
+        validate_mileage(data['mileage'])
+        return data
+
+
 class FuelStatistics(serializers.ModelSerializer):
     class Meta:
         model = models.FuelStatistics
         fields = '__all__'
 
 
+class FuelPrice(serializers.ModelSerializer):
+    class Meta:
+        model = models.FuelPrice
+        fields = '__all__'
+
+
+class FuelPriceBulkList(serializers.ListSerializer):
+    """Пакетная загрузка цен: АЗС проверяются одним запросом, запись - upsert пачками"""
+
+    def to_internal_value(self, data):
+        attrs = super().to_internal_value(data)
+        station_ids = {item['gas_station'] for item in attrs if item.get('gas_station') is not None}
+        stations = set(models.GasStation.objects.filter(pk__in=station_ids).values_list('pk', flat=True))
+
+        errors = [
+            {'gas_station': ["АЗС не найдена"]}
+            if item.get('gas_station') is not None and item['gas_station'] not in stations else {}
+            for item in attrs
+        ]
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return attrs
+
+    def create(self, validated_data):
+        return prices.ingest(validated_data)
+
+
+class FuelPriceBulk(serializers.ModelSerializer):
+    gas_station = serializers.IntegerField(required=False, allow_null=True)
+
+    class Meta:
+        model = models.FuelPrice
+        fields = ['date', 'fuel_type', 'price', 'gas_station']
+        list_serializer_class = FuelPriceBulkList
+        # Уникальность ключа обеспечивает upsert, а не проверка каждой строки запросом
+        validators = []
+
+
 class GasStation(serializers.ModelSerializer):
     class Meta:
         model = models.GasStation
@@ -0,0 +1,134 @@
+"""Дельта-синхронизация для мобильных клиентов.
+
+Клиент присылает метку (watermark), выданную сервером при прошлой
+синхронизации, и получает строки с updated_at не раньше метки и следы
+удаленных записей (Tombstone). Метка подписана: клиент не может прислать
+произвольное время.
+
+updated_at ставится до коммита транзакции, поэтому строка, закоммиченная
+после выдачи метки, может иметь более раннее время. Выборка начинается на
+SYNC_WATERMARK_LAG секунд раньше метки: несколько строк придут повторно,
+клиент применяет их как upsert. Следы хранятся SYNC_TOMBSTONE_RETENTION_DAYS
+дней; для более старой метки отдается полный снимок с reset=True.
+
+Ответ разбит на страницы по SYNC_PAGE_SIZE строк: ТС, затем АЗС, затем
+заправки по pk. Подписанный курсор next хранит время начала синхронизации,
+since и позицию; метка выдается только на последней странице и равна
+времени начала, поэтому изменения во время обхода придут в следующий раз.
+Следы удаленных записей отдаются на первой странице.
+"""
+import datetime
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from django.utils import timezone
+
+from forge import models
+
+SALT = 'forge.sync'
+CURSOR_SALT = 'forge.sync.cursor'
+MODELS = ('vehicles', 'gas_stations', 'refuelings')
+
+
+def issue_watermark(moment):
+    return signing.dumps(moment.timestamp(), salt=SALT)
+
+
+def parse_watermark(watermark):
+    """Время метки; signing.BadSignature для чужой или испорченной метки"""
+    return datetime.datetime.fromtimestamp(signing.loads(watermark, salt=SALT), tz=datetime.timezone.utc)
+
+
+def _moment(timestamp):
+    return datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc)
+
+
+def parse_cursor(cursor):
+    """Состояние обхода из курсора next; signing.BadSignature для чужого курсора"""
+    state = signing.loads(cursor, salt=CURSOR_SALT)
+    if not isinstance(state, dict) or {'started', 'since', 'model', 'after'} - set(state):
+        raise signing.BadSignature('Неполный курсор синхронизации')
+    return state
+
+
+def changes(user, since=None, now=None, tombstones=True):
+    """Изменения пользователя после since (None - полный снимок).
+
+    Возвращает метку для следующей синхронизации, признак полного снимка,
+    querysets измененных строк и id удаленных записей по моделям (без
+    tombstones - пустые списки).
+    """
+    now = now or timezone.now()
+    reset = since is None or since < now - datetime.timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    rows = {
+        'vehicles': models.Vehicle.objects.filter(user=user),
+        'refuelings': models.Refueling.objects.filter(user=user),
+        'gas_stations': models.GasStation.objects.all(),
+    }
+    deleted = {'vehicle': [], 'refueling': [], 'gasstation': []}
+
+    if not reset:
+        start = since - datetime.timedelta(seconds=settings.SYNC_WATERMARK_LAG)
+        rows = {name: queryset.filter(updated_at__gte=start) for name, queryset in rows.items()}
+
+    if not reset and tombstones:
+        # Свои следы и общие (АЗС, без пользователя)
+        found = models.Tombstone.objects.filter(
+            Q(user=user) | Q(user__isnull=True), deleted_at__gte=start
+        ).order_by().values_list('model', 'object_id')
+        for model, object_id in found:
+            deleted[model].append(object_id)
+
+    return {
+        'watermark': issue_watermark(now),
+        'reset': reset,
+        'rows': {name: queryset.order_by('pk') for name, queryset in rows.items()},
+        'deleted': {
+            'vehicles': deleted['vehicle'],
+            'refuelings': deleted['refueling'],
+            'gas_stations': deleted['gasstation'],
+        },
+    }
+
+
+def page(user, since=None, cursor=None, page_size=None):
+    """Страница синхронизации: since для первой страницы или состояние из parse_cursor.
+
+    Возвращает то же, что changes, но строки - списки не длиннее page_size,
+    next - курсор следующей страницы (None на последней), watermark - только
+    на последней странице.
+    """
+    page_size = page_size or settings.SYNC_PAGE_SIZE
+    if cursor is None:
+        cursor = {'started': timezone.now().timestamp(), 'since': since and since.timestamp(), 'model': 0, 'after': 0}
+    first = cursor['model'] == 0 and cursor['after'] == 0
+    result = changes(
+        user, cursor['since'] and _moment(cursor['since']), now=_moment(cursor['started']), tombstones=first
+    )
+
+    rows = {name: [] for name in MODELS}
+    model, after, remaining = cursor['model'], cursor['after'], page_size
+    while model < len(MODELS) and remaining:
+        name = MODELS[model]
+        rows[name] = list(result['rows'][name].filter(pk__gt=after)[:remaining])
+        if len(rows[name]) < remaining:
+            model, after = model + 1, 0
+        else:
+            after = rows[name][-1].pk
+        remaining -= len(rows[name])
+
+    done = model >= len(MODELS)
+    return {
+        **result,
+        'watermark': result['watermark'] if done else None,
+        'rows': rows,
+        'next': None if done else signing.dumps({**cursor, 'model': model, 'after': after}, salt=CURSOR_SALT),
+    }
+
+
+def purge_tombstones():
+    """Удаляет следы старше срока хранения, возвращает их число"""
+    threshold = timezone.now() - datetime.timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    deleted, _ = models.Tombstone.objects.filter(deleted_at__lt=threshold).delete()
+    return deleted
@@ -0,0 +1,39 @@
+import datetime
+
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from forge import consumption, rollups
+
+
+def pending_key(vehicle_id, year):
+    return f'forge:statistics-pending:{vehicle_id}:{year}'
+
+
+@shared_task(ignore_result=True)
+def refresh_statistics(vehicle_id, year):
+    """Пересчет расхода и статистики ТС за год; изменения после снятия метки запланируют новый пересчет"""
+    cache.delete(pending_key(vehicle_id, year))
+    since = datetime.date(year, 1, 1)
+    # Отрезок между полными баками может закончиться в следующих годах - их статистика тоже меняется
+    changed = consumption.update_vehicle(vehicle_id, since)
+    rollups.update_statistics({(vehicle_id, since)} | {(vehicle_id, date) for date in changed})
+
+
+def _schedule(vehicle_id, year):
+    # Пока метка висит, пересчет уже запланирован - изменения сливаются в одну задачу
+    delay = settings.FORGE_STATISTICS_DEBOUNCE
+    if cache.add(pending_key(vehicle_id, year), True, timeout=delay + settings.FORGE_STATISTICS_PENDING_TIMEOUT):
+        refresh_statistics.apply_async((vehicle_id, year), countdown=delay)
+
+
+def schedule_statistics_refresh(touched):
+    """Откладывает пересчет статистики за годы, затронутые парами (vehicle_id, date).
+
+    Задачи ставятся после коммита транзакции и объединяются по (ТС, год)
+    на время FORGE_STATISTICS_DEBOUNCE секунд.
+    """
+    for vehicle_id, year in {(vehicle_id, date.year) for vehicle_id, date in touched}:
+        transaction.on_commit(lambda vehicle_id=vehicle_id, year=year: _schedule(vehicle_id, year))
@@ -0,0 +1,74 @@
+"""Асинхронные обработчики чтения для ASGI-профиля (Brooks/urls_asgi.py).
+
+Аутентификация, права и фильтры DRF выполняются одним переходом в синхронный
+поток, строки читаются асинхронным ORM, а сериализация уже загруженных строк
+запросов не делает. Остальные методы обрабатывает обычный синхронный ViewSet.
+"""
+from asgiref.sync import sync_to_async
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+
+async def dispatch(view, request, handler, *args, **kwargs):
+    """Аналог APIView.dispatch для асинхронного обработчика handler(view)"""
+    view.args, view.kwargs = args, kwargs
+    view.request = view.initialize_request(request, *args, **kwargs)
+    view.headers = view.default_response_headers
+    try:
+        response = await handler(view)
+    except Exception as exc:
+        response = view.handle_exception(exc)
+    response = view.finalize_response(view.request, response, *args, **kwargs)
+
+    if not isinstance(response, Response):
+        return response
+    if isinstance(response.accepted_renderer, JSONRenderer):
+        return response.render()
+    # Browsable API при отрисовке строит формы с запросами к БД
+    return await sync_to_async(response.render)()
+
+
+def async_api_view(view_class, handler, **initkwargs):
+    """Асинхронная view: проверки view_class, затем await handler(request)"""
+    async def run(view):
+        await sync_to_async(view.initial)(view.request, *view.args, **view.kwargs)
+        return await handler(view.request)
+
+    async def view(request, *args, **kwargs):
+        return await dispatch(view_class(**initkwargs), request, run, *args, **kwargs)
+
+    return csrf_exempt(view)
+
+
+class AsyncListMixin:
+    """Асинхронный GET списка для ModelViewSet"""
+
+    def prepare_list(self):
+        self.initial(self.request, *self.args, **self.kwargs)
+        return self.filter_queryset(self.get_queryset())
+
+    async def alist(self, queryset):
+        if self.paginator is not None:
+            page = await self.paginator.apaginate_queryset(queryset, self.request, view=self)
+            if page is not None:
+                return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer([row async for row in queryset], many=True).data)
+
+    @classmethod
+    def as_async_list_view(cls, basename):
+        actions = {'get': 'list', 'post': 'create'}
+        initkwargs = {'basename': basename, 'detail': False, 'suffix': 'List'}
+        sync_view = cls.as_view(actions, **initkwargs)
+
+        async def run(view):
+            return await view.alist(await sync_to_async(view.prepare_list)())
+
+        async def view(request, *args, **kwargs):
+            if request.method != 'GET':
+                return await sync_to_async(sync_view)(request, *args, **kwargs)
+            instance = cls(**initkwargs)
+            instance.action_map = actions
+            return await dispatch(instance, request, run, *args, **kwargs)
+
+        return csrf_exempt(view)
@@ -0,0 +1,71 @@
+"""Условный GET списков: ETag и Last-Modified по строкам пользователя.
+
+Метка списка - число строк пользователя и max(updated_at), это один
+агрегат по индексу. Любое изменение отдаваемых данных либо меняет число
+строк, либо обновляет updated_at (в том числе массовые UPDATE одометров),
+поэтому при совпадении метки ответ 304 отдается без выборки страницы и
+сериализатора.
+
+304 выдается только по If-None-Match: удаление строки не сдвигает
+max(updated_at), и If-Modified-Since его бы не заметил. Last-Modified
+отдается справочно.
+"""
+import hashlib
+from calendar import timegm
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+
+class ConditionalListMixin:
+    """ETag/Last-Modified для list (и alist ASGI-профиля)"""
+
+    def get_marker_querysets(self):
+        """Все строки пользователя без фильтров: фильтры и страница входят в ETag через URL.
+
+        Если в ответ попадают данные других таблиц, их строки добавляются отдельным queryset.
+        """
+        return [self.get_queryset().order_by()]
+
+    def get_validators(self, markers):
+        request = self.request
+        parts = [request.user.pk, request.get_full_path(), request.META.get('HTTP_ACCEPT', '')]
+        for marker in markers:
+            parts += [marker['count'], marker['last_modified'].isoformat() if marker['last_modified'] else '']
+        key = ':'.join(str(part) for part in parts)
+        last_modified = max((marker['last_modified'] for marker in markers if marker['last_modified']), default=None)
+        etag = f'"{hashlib.md5(key.encode()).hexdigest()}"'
+        return etag, timegm(last_modified.utctimetuple()) if last_modified else None
+
+    @staticmethod
+    def set_validators(response, etag, last_modified):
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            # Ответ зависит от пользователя: общие кеши хранить его не должны
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        markers = [
+            queryset.aggregate(count=Count('pk'), last_modified=Max('updated_at'))
+            for queryset in self.get_marker_querysets()
+        ]
+        etag, last_modified = self.get_validators(markers)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+        return self.set_validators(response, etag, last_modified)
+
+    async def alist(self, queryset):
+        markers = [
+            await queryset.aaggregate(count=Count('pk'), last_modified=Max('updated_at'))
+            for queryset in self.get_marker_querysets()
+        ]
+        etag, last_modified = self.get_validators(markers)
+        response = get_conditional_response(self.request, etag=etag)
+        if response is None:
+            response = await super().alist(queryset)
+        return self.set_validators(response, etag, last_modified)
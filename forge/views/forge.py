@@ -1,28 +1,100 @@
-from django.http import JsonResponse
-from django.views.decorators.csrf import csrf_exempt
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework.authentication import SessionAuthentication
+from users.authentication import CachedTokenAuthentication
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.permissions import IsAuthenticated
 from forge import models
 
+EXPORT_FIELDS = (
+    'id', 'date', 'month', 'quarter', 'mileage', 'odometer', 'fuel_quantity', 'price_per_liter',
+    'total_cost', 'is_full_tank', 'discount', 'comment', 'fuel_type', 'vehicle',
+)
 
-@csrf_exempt
+
+def _lines(rows, separator):
+    """Склеивает строки выгрузки в блоки, чтобы не отдавать по одной строке за итерацию"""
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    block = []
+    for row in rows:
+        block.append(encoder.encode(dict(zip(EXPORT_FIELDS, row))))
+        if len(block) >= settings.EXPORT_CHUNK_SIZE:
+            yield separator.join(block)
+            block = []
+    if block:
+        yield separator.join(block)
+
+
+async def _alines(rows, separator):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    block = []
+    async for row in rows:
+        block.append(encoder.encode(row))
+        if len(block) >= settings.EXPORT_CHUNK_SIZE:
+            yield separator.join(block)
+            block = []
+    if block:
+        yield separator.join(block)
+
+
+def _ndjson(rows):
+    for block in _lines(rows, '\n'):
+        yield block + '\n'
+
+
+def _json_array(rows):
+    yield '{"results": ['
+    first = True
+    for block in _lines(rows, ','):
+        yield block if first else ',' + block
+        first = False
+    yield ']}'
+
+
+async def _andjson(rows):
+    async for block in _alines(rows, '\n'):
+        yield block + '\n'
+
+
+async def _ajson_array(rows):
+    yield '{"results": ['
+    first = True
+    async for block in _alines(rows, ','):
+        yield block if first else ',' + block
+        first = False
+    yield ']}'
+
+
+def _export_rows(user):
+    return models.Refueling.objects.filter(user=user).order_by('date', 'pk')
+
+
+@api_view(['GET'])
+@authentication_classes([CachedTokenAuthentication, SessionAuthentication])
+@permission_classes([IsAuthenticated])
 def forge(request):
-    if request.method == 'GET':
-        qs = models.Refueling.objects.all()
-
-        results = []
-        for refueling in qs:
-            results.append({
-                'id': refueling.id,
-                'date': refueling.date,
-                'month': refueling.month,
-                'quarter': refueling.quarter,
-                'mileage': refueling.mileage,
-                'odometer': refueling.odometer,
-                'fuel_quantity': refueling.fuel_quantity,
-                'price_per_liter': refueling.price_per_liter,
-                'total_cost': refueling.total_cost,
-                'is_full_tank': refueling.is_full_tank,
-                'discount': refueling.discount,
-                'comment': refueling.comment,
-                'fuel_type': refueling.fuel_type,
-            })
-        return JsonResponse({'results': results})
+    """Потоковая выгрузка всех заправок пользователя.
+
+    ?output=ndjson - по объекту JSON на строку, иначе {"results": [...]}.
+    Строки читаются из БД через iterator(), поэтому память не зависит от объема истории.
+    """
+    rows = _export_rows(request.user).values_list(*EXPORT_FIELDS).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+
+    if request.query_params.get('output') == 'ndjson':
+        return StreamingHttpResponse(_ndjson(rows), content_type='application/x-ndjson')
+    return StreamingHttpResponse(_json_array(rows), content_type='application/json')
+
+
+async def aforge(request):
+    """Асинхронная выгрузка для ASGI: строки читаются через aiterator().
+
+    Синхронный итератор ASGI-обработчик Django сначала целиком собирает в память,
+    асинхронный отдается клиенту по мере чтения.
+    """
+    # values(): aiterator() у values_list() выполняет запрос прямо в event loop
+    rows = _export_rows(request.user).values(*EXPORT_FIELDS).aiterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+
+    if request.query_params.get('output') == 'ndjson':
+        return StreamingHttpResponse(_andjson(rows), content_type='application/x-ndjson')
+    return StreamingHttpResponse(_ajson_array(rows), content_type='application/json')
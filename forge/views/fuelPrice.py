@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import serializers as drf_serializers, status
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.viewsets import ReadOnlyModelViewSet
+
+from users.authentication import CachedTokenAuthentication
+from .. import filters, models, prices, serializers
+
+
+class FuelPriceAsOf(drf_serializers.Serializer):
+    fuel_type = drf_serializers.ChoiceField(choices=models.FuelType.choices)
+    date = drf_serializers.DateField(required=False)
+    gas_station = drf_serializers.IntegerField(required=False, allow_null=True)
+
+
+class FuelPrice(ReadOnlyModelViewSet):
+    authentication_classes = (CachedTokenAuthentication, SessionAuthentication)
+    permission_classes = (IsAuthenticated,)
+    queryset = models.FuelPrice.objects.all()
+    serializer_class = serializers.FuelPrice
+    filterset_class = filters.FuelPrice
+
+    @action(detail=False, methods=['post'], serializer_class=serializers.FuelPriceBulk,
+            permission_classes=[IsAdminUser])
+    def bulk(self, request):
+        """Загрузка фида цен списком объектов: существующие цены на ту же дату обновляются"""
+        serializer = self.get_serializer(
+            data=request.data, many=True, allow_empty=False, max_length=settings.FUEL_PRICE_BULK_MAX_SIZE
+        )
+        serializer.is_valid(raise_exception=True)
+        return Response({'count': serializer.save()}, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'], url_path='as-of', filterset_class=None, pagination_class=None)
+    def as_of(self, request):
+        """Цена на дату: ?fuel_type=&gas_station=&date= (по умолчанию сегодня)"""
+        params = FuelPriceAsOf(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        gas_station = params.validated_data.get('gas_station')
+        date = params.validated_data.get('date') or timezone.localdate()
+        price = prices.price_as_of(gas_station, params.validated_data['fuel_type'], date)
+        return Response({
+            'gas_station': gas_station,
+            'fuel_type': params.validated_data['fuel_type'],
+            'date': date,
+            'price': price,
+        })
@@ -1,55 +1,63 @@
 from rest_framework import viewsets
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication, SessionAuthentication
+from rest_framework.authentication import SessionAuthentication
+from users.authentication import CachedTokenAuthentication
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Sum
-from .. import models, serializers, filters
+from .. import models, serializers, filters, rollups
+from .asyncRead import AsyncListMixin
 
 
-class FuelStatistics(viewsets.ModelViewSet):
-    authentication_classes = (TokenAuthentication, SessionAuthentication)
+class FuelStatistics(AsyncListMixin, viewsets.ModelViewSet):
+    authentication_classes = (CachedTokenAuthentication, SessionAuthentication)
     permission_classes = (IsAuthenticated,)
     queryset = models.FuelStatistics.objects.all()
     serializer_class = serializers.FuelStatistics
     filterset_class = filters.FuelStatistics
 
+    def get_queryset(self):
+        return models.FuelStatistics.objects.filter(vehicle__user=self.request.user)
+
     def list(self, request):
         vehicle_id = request.query_params.get('vehicle')
-        vehicle_name = None
-        total_refueling_cost = 0
-        total_refueling_fuel = 0
-        if vehicle_id:
-            try:
-                vehicle = models.Vehicle.objects.get(id=vehicle_id)
-                vehicle_name = vehicle.name
-
-                refueling_stats = models.Refueling.objects.filter(
-                    vehicle_id=vehicle_id
-                ).aggregate(
-                    total_cost=Sum('total_cost'),
-                    total_fuel=Sum('fuel_quantity')
-                )
-
-                total_refueling_cost = refueling_stats['total_cost'] or 0
-                total_refueling_fuel = refueling_stats['total_fuel'] or 0
-            except (models.Vehicle.DoesNotExist, ValueError):
-                vehicle_name = None
-                total_refueling_cost = 0
-                total_refueling_fuel = 0
+        # Данные ТС и итоги по заправкам одним запросом, только для своего ТС
+        summary = rollups.vehicle_summary(request.user, vehicle_id) if vehicle_id else None
 
         # Применяем фильтры и получаем данные из FuelStatistics
         queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(queryset, many=True)
-        data = serializer.data
-
-        # Создаем ответ
-        response_data = {
-            'results': data
-        }
-        if vehicle_name:
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            response_data = self.get_paginated_response(self.get_serializer(page, many=True).data).data
+        else:
+            response_data = {
+                'results': self.get_serializer(queryset, many=True).data
+            }
+
+        self.add_summary(response_data, vehicle_id, summary)
+        return Response(response_data)
+
+    async def alist(self, queryset):
+        vehicle_id = self.request.query_params.get('vehicle')
+        summary = await rollups.avehicle_summary(self.request.user, vehicle_id) if vehicle_id else None
+
+        page = await self.paginator.apaginate_queryset(queryset, self.request, view=self)
+        if page is not None:
+            response_data = self.get_paginated_response(self.get_serializer(page, many=True).data).data
+        else:
+            response_data = {
+                'results': self.get_serializer([row async for row in queryset], many=True).data
+            }
+
+        self.add_summary(response_data, vehicle_id, summary)
+        return Response(response_data)
+
+    @staticmethod
+    def add_summary(response_data, vehicle_id, summary):
+        if summary:
+            total_refueling_cost = summary['total_cost'] or 0
+            total_refueling_fuel = summary['total_fuel'] or 0
             response_data['vehicle_info'] = {
                 'id': vehicle_id,
-                'name': vehicle_name
+                'name': summary['name']
             }
             response_data['refueling_totals'] = {
                 'total_cost': float(total_refueling_cost),
@@ -57,5 +65,3 @@ class FuelStatistics(viewsets.ModelViewSet):
                 'average_price_per_liter': float(
                     total_refueling_cost / total_refueling_fuel) if total_refueling_fuel > 0 else 0
             }
-
-        return Response(response_data)
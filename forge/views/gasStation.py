@@ -1,12 +1,13 @@
 from forge import models, serializers
 from rest_framework.viewsets import ModelViewSet
 from forge import filters
-from rest_framework.authentication import TokenAuthentication, SessionAuthentication
+from rest_framework.authentication import SessionAuthentication
+from users.authentication import CachedTokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 
 
 class GasStation(ModelViewSet):
-    authentication_classes = (TokenAuthentication, SessionAuthentication)
+    authentication_classes = (CachedTokenAuthentication, SessionAuthentication)
     permission_classes = (IsAuthenticated,)
     queryset = models.GasStation.objects.all()
     serializer_class = serializers.GasStation
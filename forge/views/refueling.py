@@ -1,15 +1,46 @@
+from django.conf import settings
 from forge import models, serializers
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 from forge import filters
-from rest_framework.authentication import TokenAuthentication, SessionAuthentication
+from rest_framework.authentication import SessionAuthentication
+from users.authentication import CachedTokenAuthentication
 from rest_framework.permissions import IsAuthenticated
+from .asyncRead import AsyncListMixin
+from .conditional import ConditionalListMixin
+from .valuesList import ValuesListMixin
 
 
-class Refueling(ModelViewSet):
-    authentication_classes = (TokenAuthentication, SessionAuthentication)
+class Refueling(ConditionalListMixin, ValuesListMixin, AsyncListMixin, ModelViewSet):
+    authentication_classes = (CachedTokenAuthentication, SessionAuthentication)
     permission_classes = (IsAuthenticated,)
     serializer_class = serializers.Refueling
     filterset_class = filters.Refueling
+    values_list_setting = 'REFUELING_LIST_VALUES'
 
     def get_queryset(self):
         return models.Refueling.objects.filter(user=self.request.user)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        # Список по умолчанию читает только нужные колонки через .values() (ValuesListMixin)
+        if self.request.method != 'GET' or (self.action == 'list' and self.values_list_enabled()):
+            return queryset
+        serializer = self.get_serializer()
+        if not serializer.is_sparse:
+            return queryset
+        columns = self.ordering_columns(queryset) if self.action == 'list' else []
+        return queryset.only(*serializer.model_fields(), *columns)
+
+    @action(detail=False, methods=['post'], serializer_class=serializers.RefuelingBulk)
+    def bulk(self, request):
+        """Пакетное создание заправок: принимает список объектов"""
+        serializer = self.get_serializer(
+            data=request.data, many=True, allow_empty=False, max_length=settings.REFUELING_BULK_MAX_SIZE
+        )
+        serializer.is_valid(raise_exception=True)
+        refuelings = serializer.save()
+        data = serializers.Refueling(refuelings, many=True, context=self.get_serializer_context()).data
+        return Response(data, status=status.HTTP_201_CREATED)
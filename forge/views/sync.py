@@ -0,0 +1,51 @@
+from django.core import signing
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from users.authentication import CachedTokenAuthentication
+import forge.sync
+from forge import serializers
+
+SERIALIZERS = {
+    'vehicles': serializers.Vehicle,
+    'refuelings': serializers.Refueling,
+    'gas_stations': serializers.GasStation,
+}
+
+
+@api_view(['GET'])
+@authentication_classes([CachedTokenAuthentication, SessionAuthentication])
+@permission_classes([IsAuthenticated])
+def sync(request):
+    """Дельта-синхронизация: ?since=<watermark из прошлого ответа>.
+
+    Без since (или при reset=true в ответе) - полный снимок, локальные
+    данные клиента нужно заменить. Иначе строки применяются как upsert,
+    а id из deleted удаляются. Пока в ответе есть next, следующая страница
+    запрашивается по ?cursor=<next>; watermark приходит на последней.
+    """
+    since = request.query_params.get('since')
+    cursor = request.query_params.get('cursor')
+    try:
+        cursor = forge.sync.parse_cursor(cursor) if cursor else None
+    except signing.BadSignature:
+        raise ValidationError({'cursor': ['Недействительный курсор синхронизации']})
+    try:
+        since = forge.sync.parse_watermark(since) if since and cursor is None else None
+    except signing.BadSignature:
+        raise ValidationError({'since': ['Недействительная метка синхронизации']})
+
+    page = forge.sync.page(request.user, since, cursor)
+    context = {'request': request}
+    return Response({
+        'watermark': page['watermark'],
+        'next': page['next'],
+        'reset': page['reset'],
+        **{
+            name: SERIALIZERS[name](rows, many=True, context=context).data
+            for name, rows in page['rows'].items()
+        },
+        'deleted': page['deleted'],
+    })
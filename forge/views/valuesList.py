@@ -0,0 +1,47 @@
+"""GET списка через forge.rows: страница читается .values() и собирается без сериализатора.
+
+Формат ответа совпадает с serializer_class, поэтому путь включается для
+list (и alist ASGI-профиля) целиком; настройка из values_list_setting
+возвращает обычную сериализацию без изменения кода.
+"""
+from django.conf import settings
+from rest_framework.response import Response
+
+from forge import rows
+
+
+class ValuesListMixin:
+    """list/alist из словарей .values(): ставится после ConditionalListMixin"""
+    values_list_setting = None
+
+    def values_list_enabled(self):
+        return self.values_list_setting is None or getattr(settings, self.values_list_setting)
+
+    def ordering_columns(self, queryset):
+        """Колонки сортировки, которые нужны пагинации для курсора"""
+        if self.paginator is None:
+            return []
+        return self.paginator.get_ordering_columns(self.request, queryset, self)
+
+    def values_queryset(self, queryset):
+        builder = rows.RowBuilder(self.get_serializer())
+        return builder, queryset.values(*sorted({*builder.columns, *self.ordering_columns(queryset)}))
+
+    def list(self, request, *args, **kwargs):
+        if not self.values_list_enabled():
+            return super().list(request, *args, **kwargs)
+        builder, queryset = self.values_queryset(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(builder.build(page))
+        return Response(builder.build(queryset))
+
+    async def alist(self, queryset):
+        if not self.values_list_enabled():
+            return await super().alist(queryset)
+        builder, queryset = self.values_queryset(queryset)
+        if self.paginator is not None:
+            page = await self.paginator.apaginate_queryset(queryset, self.request, view=self)
+            if page is not None:
+                return self.get_paginated_response(builder.build(page))
+        return Response(builder.build([row async for row in queryset]))
@@ -1,15 +1,46 @@
+from django.db.models import Count, DecimalField, F, Max, Sum
 from forge import models, serializers
 from rest_framework.viewsets import ModelViewSet
 from forge import filters
-from rest_framework.authentication import TokenAuthentication, SessionAuthentication
+from rest_framework.authentication import SessionAuthentication
+from users.authentication import CachedTokenAuthentication
 from rest_framework.permissions import IsAuthenticated
+from .asyncRead import AsyncListMixin
+from .conditional import ConditionalListMixin
 
 
-class Vehicle(ModelViewSet):
-    authentication_classes = (TokenAuthentication, SessionAuthentication)
+class Vehicle(ConditionalListMixin, AsyncListMixin, ModelViewSet):
+    authentication_classes = (CachedTokenAuthentication, SessionAuthentication)
     permission_classes = (IsAuthenticated,)
     serializer_class = serializers.Vehicle
     filterset_class = filters.Vehicle
 
+    @property
+    def with_summary(self):
+        """?summary=1 - итоги по заправкам в том же запросе, что и страница ТС"""
+        return self.action == 'list' and self.request.query_params.get('summary') in ('1', 'true')
+
     def get_queryset(self):
-        return models.Vehicle.objects.filter(user=self.request.user)
+        vehicles = models.Vehicle.objects.filter(user=self.request.user)
+        if self.with_summary:
+            vehicles = vehicles.annotate(
+                refuel_count=Count('refueling'),
+                last_refuel_date=Max('refueling__date'),
+                total_fuel=Sum('refueling__fuel_quantity'),
+                total_cost=Sum('refueling__total_cost'),
+                priced_fuel=Sum(F('refueling__fuel_quantity') * F('refueling__price_per_liter'),
+                                output_field=DecimalField(max_digits=16, decimal_places=4)),
+            )
+        return vehicles
+
+    def get_serializer_class(self):
+        if self.with_summary:
+            return serializers.VehicleSummary
+        return super().get_serializer_class()
+
+    def get_marker_querysets(self):
+        vehicles = models.Vehicle.objects.filter(user=self.request.user).order_by()
+        if not self.with_summary:
+            return [vehicles]
+        # Итоги меняются и при правке заправки, не сдвигающей пробег ТС
+        return [vehicles, models.Refueling.objects.filter(user=self.request.user).order_by()]
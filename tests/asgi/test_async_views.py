@@ -0,0 +1,112 @@
+import datetime
+import json
+from decimal import Decimal
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+import forge.models
+
+pytestmark = pytest.mark.django_db
+
+ASGI_URLCONF = "Brooks.urls_asgi"
+
+
+@pytest.fixture
+def token(user):
+    return Token.objects.create(user=user)
+
+
+@pytest.fixture
+def vehicle(user):
+    vehicle = forge.models.Vehicle.objects.create(name="Toyota Camry", initial_odometer=1000, user=user)
+    for day in range(7):
+        forge.models.Refueling.objects.create(
+            vehicle=vehicle,
+            date=datetime.date(2024, 1, 1) + datetime.timedelta(days=day * 20),
+            mileage=100 + day,
+            fuel_quantity=Decimal("10.00"),
+            price_per_liter=Decimal("50.00"),
+        )
+    forge.models.FuelStatistics.objects.create(
+        vehicle=vehicle, period=datetime.date(2024, 1, 1), period_type="year",
+        total_distance=100, total_fuel=Decimal("10.00"), total_cost=Decimal("500.00"),
+    )
+    return vehicle
+
+
+def sync_get(token, path, params=None):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+    return client.get(path, params or {})
+
+
+@async_to_sync
+async def async_get(token, path, params=None):
+    response = await AsyncClient().get(path, params or {}, headers={"authorization": f"Token {token.key}"})
+    if response.streaming:
+        response.content_bytes = b"".join([chunk async for chunk in response.streaming_content])
+    return response
+
+
+@pytest.mark.parametrize("path, params", [
+    ("/vehicle/", {}),
+    ("/vehicle/", {"summary": "1"}),
+    ("/refuelings/", {"page_size": 3}),
+    ("/refuelings/", {"fuel_type": "АИ-95", "date_from": "2024-02-01"}),
+    ("/fuel-statistics/", {"vehicle": "placeholder", "period_type": "year"}),
+])
+def test_async_list_matches_sync(settings, token, vehicle, path, params):
+    params = {key: vehicle.id if value == "placeholder" else value for key, value in params.items()}
+    expected = sync_get(token, path, params)
+    settings.ROOT_URLCONF = ASGI_URLCONF
+
+    response = async_get(token, path, params)
+
+    assert response.status_code == 200
+    assert response.json() == json.loads(expected.content)
+
+
+def test_async_refueling_list_follows_cursor(settings, token, vehicle):
+    settings.ROOT_URLCONF = ASGI_URLCONF
+
+    first = async_get(token, "/refuelings/", {"page_size": 4}).json()
+    second = async_get(token, first["next"].split("testserver")[1]).json()
+
+    ids = [row["id"] for row in first["results"] + second["results"]]
+    assert len(ids) == 7
+    assert second["next"] is None
+
+
+def test_async_list_requires_authentication(settings, vehicle):
+    settings.ROOT_URLCONF = ASGI_URLCONF
+
+    response = async_to_sync(AsyncClient().get)("/refuelings/")
+
+    assert response.status_code == 401
+
+
+def test_async_list_route_creates_with_sync_view(settings, token, vehicle):
+    settings.ROOT_URLCONF = ASGI_URLCONF
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+    response = client.post("/vehicle/", {"name": "Ford Focus", "initial_odometer": 500}, format="json")
+
+    assert response.status_code == 201
+    assert forge.models.Vehicle.objects.get(pk=response.data["id"]).current_odometer == 500
+
+
+def test_async_export_streams_rows(settings, token, vehicle):
+    expected = b"".join(sync_get(token, "/refuelings/export/", {"output": "ndjson"}).streaming_content)
+    settings.ROOT_URLCONF = ASGI_URLCONF
+
+    response = async_get(token, "/refuelings/export/", {"output": "ndjson"})
+
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/x-ndjson"
+    assert response.content_bytes == expected
+    assert len(expected.splitlines()) == 7
@@ -0,0 +1,179 @@
+"""Бюджеты запросов и времени ответа для основных эндпоинтов на растущей истории.
+
+Объем задается BENCHMARK_REFUELINGS (по умолчанию 10³, для полного прогона 10⁶),
+время ответа - медиана нескольких запросов. Бюджеты запросов проверяются
+всегда, а бюджеты времени и ускорение forge.rows - только с
+BENCHMARK_ENFORCE_LATENCY=1: на общих CI-раннерах время нестабильно.
+BENCHMARK_LATENCY_FACTOR масштабирует бюджеты времени для медленных машин.
+Чтение списка заправок через forge.rows сравнивается с сериализатором в
+строках в секунду на всей истории (чтение из БД входит в оба замера).
+"""
+import datetime
+import os
+import statistics
+import time
+
+import pytest
+from django.db import transaction
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+import forge.models
+import forge.serializers
+from forge import rows, seed
+
+pytestmark = pytest.mark.django_db
+
+REFUELINGS = int(float(os.getenv("BENCHMARK_REFUELINGS", "1e3")))
+USERS = int(os.getenv("BENCHMARK_USERS", "10"))
+VEHICLES_PER_USER = 2
+LATENCY_FACTOR = float(os.getenv("BENCHMARK_LATENCY_FACTOR", "1"))
+ENFORCE_LATENCY = os.getenv("BENCHMARK_ENFORCE_LATENCY") == "1"
+RUNS = 5
+# Во сколько раз чтение через forge.rows должно быть быстрее сериализатора
+ROWS_SPEEDUP = float(os.getenv("BENCHMARK_ROWS_SPEEDUP", "1.3"))
+
+# Бюджеты не зависят от объема истории: рост числа запросов - регрессия
+QUERY_BUDGETS = {
+    "refueling_list": 2,
+    "refueling_list_not_modified": 1,
+    "refueling_create": 9,
+    "fuel_statistics": 2,
+    "login": 2,
+}
+LATENCY_BUDGETS_MS = {
+    "refueling_list": 150,
+    "refueling_list_not_modified": 50,
+    "refueling_create": 150,
+    "fuel_statistics": 150,
+    "login": 1500,
+}
+
+
+@pytest.fixture(scope="module")
+def dataset(django_db_setup, django_db_blocker):
+    """Данные создаются один раз на модуль и откатываются после него"""
+    with django_db_blocker.unblock():
+        with transaction.atomic():
+            users = seed.generate(users=USERS, vehicles_per_user=VEHICLES_PER_USER, refuelings=REFUELINGS)
+            user = users[0]
+            yield user, forge.models.Vehicle.objects.filter(user=user).first(), user.auth_token.key
+            transaction.set_rollback(True)
+
+
+@pytest.fixture
+def api_client(dataset):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {dataset[2]}")
+    # Прогрев: кеш токенов и соединение с БД
+    client.get(reverse("vehicle-list"))
+    return client
+
+
+def measure(name, request, django_assert_max_num_queries):
+    """Проверяет бюджет запросов первого вызова и (с ENFORCE_LATENCY) медиану времени RUNS вызовов"""
+    with django_assert_max_num_queries(QUERY_BUDGETS[name]):
+        response = request()
+    assert response.status_code in (200, 201, 304), response.content
+
+    timings = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        request()
+        timings.append((time.perf_counter() - started) * 1000)
+    median = statistics.median(timings)
+    print(f"{name}: {median:.1f} мс (история {REFUELINGS})")
+    if ENFORCE_LATENCY:
+        assert median <= LATENCY_BUDGETS_MS[name] * LATENCY_FACTOR
+    return response
+
+
+def test_refueling_list_budget(api_client, django_assert_max_num_queries):
+    response = measure("refueling_list", lambda: api_client.get(reverse("refueling-list")),
+                       django_assert_max_num_queries)
+
+    assert len(response.data["results"]) > 0
+
+
+def test_refueling_list_not_modified_budget(api_client, django_assert_max_num_queries):
+    url = reverse("refueling-list")
+    etag = api_client.get(url)["ETag"]
+
+    response = measure("refueling_list_not_modified", lambda: api_client.get(url, HTTP_IF_NONE_MATCH=etag),
+                       django_assert_max_num_queries)
+
+    assert response.status_code == 304
+
+
+def rows_per_second(build, count):
+    timings = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        assert len(build()) == count
+        timings.append(time.perf_counter() - started)
+    return count / statistics.median(timings)
+
+
+def test_refueling_rows_throughput(dataset):
+    queryset = forge.models.Refueling.objects.order_by("-date", "-pk")
+    count = queryset.count()
+    builder = rows.RowBuilder(forge.serializers.Refueling())
+
+    serializer_rate = rows_per_second(lambda: forge.serializers.Refueling(queryset, many=True).data, count)
+    values_rate = rows_per_second(lambda: builder.build(queryset.values(*builder.columns)), count)
+
+    print(f"refueling_rows: сериализатор {serializer_rate:.0f} строк/с, "
+          f"forge.rows {values_rate:.0f} строк/с (x{values_rate / serializer_rate:.1f}, история {count})")
+    if ENFORCE_LATENCY:
+        assert values_rate >= serializer_rate * ROWS_SPEEDUP
+
+
+def test_refueling_create_budget(api_client, dataset, django_assert_max_num_queries):
+    _, vehicle, _ = dataset
+    dates = iter(datetime.date(2100, 1, 1) + datetime.timedelta(days=day) for day in range(RUNS + 1))
+
+    def create():
+        return api_client.post(reverse("refueling-list"), {
+            "vehicle": vehicle.id,
+            "date": next(dates).isoformat(),
+            "mileage": 400,
+            "fuel_quantity": "40.00",
+            "price_per_liter": "55.00",
+        }, format="json")
+
+    measure("refueling_create", create, django_assert_max_num_queries)
+
+
+def test_fuel_statistics_budget(api_client, dataset, django_assert_max_num_queries):
+    _, vehicle, _ = dataset
+    response = measure(
+        "fuel_statistics",
+        lambda: api_client.get(reverse("fuelstatistics-list"), {"vehicle": vehicle.id}),
+        django_assert_max_num_queries,
+    )
+
+    assert response.data["refueling_totals"]["total_fuel_liters"] > 0
+
+
+def test_login_budget(dataset, django_assert_max_num_queries):
+    user, _, _ = dataset
+    client = APIClient()
+
+    measure(
+        "login",
+        lambda: client.post(reverse("user_login"), {"username": user.username, "password": "benchmark"}),
+        django_assert_max_num_queries,
+    )
+
+
+def test_generated_data_is_consistent(dataset):
+    _, vehicle, _ = dataset
+    vehicle.refresh_from_db()
+    odometers = list(forge.models.Refueling.objects.filter(vehicle=vehicle).order_by("date", "pk").values_list(
+        "odometer", "mileage"
+    ))
+
+    assert odometers[0][0] == vehicle.initial_odometer + odometers[0][1]
+    assert all(previous[0] + current[1] == current[0] for previous, current in zip(odometers, odometers[1:]))
+    assert vehicle.current_odometer == odometers[-1][0]
+    assert forge.models.FuelStatistics.objects.filter(vehicle=vehicle, period_type="year").exists()
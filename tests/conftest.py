@@ -0,0 +1,30 @@
+import pytest
+from rest_framework.test import APIClient
+
+import forge.models
+from users import authentication
+
+
+@pytest.fixture
+def user(django_user_model):
+    return django_user_model.objects.create_user(username="testuser", password="pass11111111")
+
+
+@pytest.fixture
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+@pytest.fixture
+def vehicle(user):
+    return forge.models.Vehicle.objects.create(name="Toyota Camry", initial_odometer=1000, user=user)
+
+
+@pytest.fixture(autouse=True)
+def token_cache(monkeypatch):
+    """Кеш токенов в памяти на время теста: без Redis он в настройках выключен"""
+    cache = authentication.LocalTokenCache(max_size=100, timeout=60)
+    monkeypatch.setattr(authentication, "token_cache", cache)
+    return cache
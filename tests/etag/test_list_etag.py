@@ -0,0 +1,101 @@
+import datetime
+from decimal import Decimal
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+import forge.models
+import forge.serializers
+
+pytestmark = pytest.mark.django_db
+
+
+def create_refueling(vehicle, day):
+    return forge.models.Refueling.objects.create(
+        vehicle=vehicle,
+        date=datetime.date(2024, 1, 1) + datetime.timedelta(days=day),
+        mileage=100,
+        fuel_quantity=Decimal("40.00"),
+        price_per_liter=Decimal("50.00"),
+    )
+
+
+@pytest.mark.parametrize("url_name", ["refueling-list", "vehicle-list"])
+def test_unchanged_list_returns_not_modified_with_one_query(
+    api_client, vehicle, url_name, django_assert_num_queries, monkeypatch
+):
+    create_refueling(vehicle, 0)
+    url = reverse(url_name)
+    first = api_client.get(url)
+    assert first.status_code == 200
+    assert first["Last-Modified"]
+    assert "private" in first["Cache-Control"]
+
+    monkeypatch.setattr(forge.serializers.Refueling, "to_representation", None)
+    monkeypatch.setattr(forge.serializers.Vehicle, "to_representation", None)
+    # Только агрегат метки: без выборки страницы и сериализатора
+    with django_assert_num_queries(1):
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+
+    assert response.status_code == 304
+    assert response["ETag"] == first["ETag"]
+    assert not response.content
+
+
+def test_refueling_changes_invalidate_etag(api_client, vehicle):
+    first = create_refueling(vehicle, 0)
+    second = create_refueling(vehicle, 10)
+    url = reverse("refueling-list")
+    etags = [api_client.get(url)["ETag"]]
+
+    create_refueling(vehicle, 20)
+    etags.append(api_client.get(url)["ETag"])
+    second.delete()
+    etags.append(api_client.get(url)["ETag"])
+    first.comment = "правка"
+    first.save(update_fields=["comment"])
+    etags.append(api_client.get(url)["ETag"])
+
+    assert len(set(etags)) == 4
+    assert api_client.get(url, HTTP_IF_NONE_MATCH=etags[0]).status_code == 200
+
+
+def test_vehicle_etag_follows_current_odometer(api_client, vehicle):
+    url = reverse("vehicle-list")
+    etag = api_client.get(url)["ETag"]
+
+    # current_odometer сдвигается массовым UPDATE, он же обновляет updated_at
+    create_refueling(vehicle, 0)
+
+    response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.data["results"][0]["current_odometer"] == 1100
+
+
+def test_etag_depends_on_query_and_user(api_client, vehicle, django_user_model):
+    create_refueling(vehicle, 0)
+    url = reverse("refueling-list")
+    etag = api_client.get(url)["ETag"]
+
+    assert api_client.get(url, {"page_size": 1})["ETag"] != etag
+
+    other = APIClient()
+    other.force_authenticate(user=django_user_model.objects.create_user(username="other", password="pass11111111"))
+    assert other.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+def test_async_list_returns_not_modified(settings, user, vehicle):
+    create_refueling(vehicle, 0)
+    token = Token.objects.create(user=user)
+    settings.ROOT_URLCONF = "Brooks.urls_asgi"
+    headers = {"authorization": f"Token {token.key}"}
+
+    first = async_to_sync(AsyncClient().get)("/refuelings/", headers=headers)
+    response = async_to_sync(AsyncClient().get)("/refuelings/", headers={**headers, "if-none-match": first["ETag"]})
+
+    assert first.status_code == 200
+    assert response.status_code == 304
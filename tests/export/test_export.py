@@ -0,0 +1,59 @@
+import datetime
+import json
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+
+import forge.models
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def refuelings(vehicle, django_user_model):
+    other_user = django_user_model.objects.create_user(username="otheruser", password="pass11111111")
+    other_vehicle = forge.models.Vehicle.objects.create(name="Other car", user=other_user)
+    for owner_vehicle in (vehicle, other_vehicle):
+        for day in range(5):
+            forge.models.Refueling.objects.create(
+                vehicle=owner_vehicle,
+                date=datetime.date(2024, 1, 1) + datetime.timedelta(days=day),
+                mileage=100,
+                fuel_quantity=Decimal("40.00"),
+                price_per_liter=Decimal("50.00"),
+            )
+
+
+def read(response):
+    assert response.status_code == 200
+    assert response.streaming
+    return b"".join(response.streaming_content).decode()
+
+
+def test_export_streams_json_array_of_own_refuelings(api_client, refuelings, vehicle, settings):
+    settings.EXPORT_CHUNK_SIZE = 2
+
+    data = json.loads(read(api_client.get(reverse("refueling_export"))))
+
+    assert [row["odometer"] for row in data["results"]] == [1100, 1200, 1300, 1400, 1500]
+    assert {row["vehicle"] for row in data["results"]} == {vehicle.id}
+    assert data["results"][0]["fuel_quantity"] == "40.00"
+    assert data["results"][0]["date"] == "2024-01-01"
+
+
+def test_export_streams_ndjson(api_client, refuelings):
+    response = api_client.get(reverse("refueling_export"), {"output": "ndjson"})
+
+    lines = read(response).splitlines()
+    assert response["Content-Type"] == "application/x-ndjson"
+    assert len(lines) == 5
+    assert json.loads(lines[-1])["odometer"] == 1500
+
+
+def test_export_of_empty_history_is_valid_json(api_client):
+    assert json.loads(read(api_client.get(reverse("refueling_export")))) == {"results": []}
+
+
+def test_export_requires_authentication(client):
+    assert client.get(reverse("refueling_export")).status_code == 401
@@ -0,0 +1,139 @@
+import csv
+import datetime
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from openpyxl import Workbook
+
+import forge.models
+from forge import resources
+
+pytestmark = pytest.mark.django_db
+
+COLUMNS = ["date", "vehicle", "mileage", "fuel_quantity", "price_per_liter", "gas_station", "company", "is_full_tank"]
+
+
+@pytest.fixture
+def user(django_user_model):
+    return django_user_model.objects.create_user(username="fleet", password="pass11111111")
+
+
+@pytest.fixture
+def vehicle(user):
+    return forge.models.Vehicle.objects.create(name="Газель", license_plate="А123ВС77", initial_odometer=1000,
+                                               user=user)
+
+
+def statement_rows(days):
+    # Выписка по карте идет от новых заправок к старым
+    start = datetime.date(2024, 1, 1)
+    return [
+        [(start + datetime.timedelta(days=day)).strftime("%d.%m.%Y"), "а123вс77", "100", "40,5", "50.00",
+         f"АЗС {day % 3}", "Лукойл", "да"]
+        for day in reversed(range(days))
+    ]
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(COLUMNS)
+        writer.writerows(rows)
+    return path
+
+
+def test_import_refuelings_from_csv(tmp_path, user, vehicle, django_assert_max_num_queries):
+    path = write_csv(tmp_path / "statement.csv", statement_rows(60))
+    stdout = StringIO()
+
+    with django_assert_max_num_queries(40):
+        call_command("import_refuelings", str(path), user="fleet", chunk_size=25, stdout=stdout)
+
+    vehicle.refresh_from_db()
+    odometers = forge.models.Refueling.objects.filter(vehicle=vehicle).order_by("date", "pk").values_list(
+        "odometer", flat=True
+    )
+    assert list(odometers) == [1000 + 100 * i for i in range(1, 61)]
+    assert vehicle.current_odometer == 7000
+    assert forge.models.GasStation.objects.count() == 3
+    refueling = forge.models.Refueling.objects.first()
+    assert refueling.fuel_quantity == Decimal("40.5")
+    assert refueling.total_cost == Decimal("2025.00")
+    assert refueling.is_full_tank is True
+    assert refueling.user == user
+    assert forge.models.FuelStatistics.objects.get(vehicle=vehicle, period_type="year").total_distance == 6000
+    assert "строк/с" in stdout.getvalue()
+
+
+def test_import_refuelings_skips_invalid_rows(tmp_path, user, vehicle):
+    rows = statement_rows(2) + [["31.02.2024", "а123вс77", "100", "40", "50", "", "", ""],
+                                ["01.03.2024", "Чужая машина", "100", "40", "50", "", "", ""]]
+    path = write_csv(tmp_path / "statement.csv", rows)
+    stderr = StringIO()
+
+    call_command("import_refuelings", str(path), user="fleet", stdout=StringIO(), stderr=stderr)
+
+    assert forge.models.Refueling.objects.count() == 2
+    assert "Строка 4" in stderr.getvalue()
+    assert "Строка 5" in stderr.getvalue()
+
+
+def test_import_refuelings_validates_fields_per_row(tmp_path, user, vehicle):
+    rows = statement_rows(1) + [
+        ["02.01.2024", "а123вс77", "100", "-40", "50", "", "", ""],
+        ["03.01.2024", "а123вс77", "100", "40", "12345678", "", "", ""],
+        ["04.01.2024", "а123вс77", "100.5", "40", "50", "", "", ""],
+        ["05.01.2024", "а123вс77", "6000", "40", "50", "", "", ""],
+    ]
+    path = write_csv(tmp_path / "statement.csv", rows)
+    stderr = StringIO()
+
+    call_command("import_refuelings", str(path), user="fleet", stdout=StringIO(), stderr=stderr)
+
+    assert forge.models.Refueling.objects.count() == 1
+    errors = stderr.getvalue()
+    assert "Строка 3: fuel_quantity" in errors
+    assert "Строка 4: price_per_liter" in errors
+    assert "Строка 5: пробег должен быть целым" in errors
+    assert "Строка 6: Пробег между заправками не может превышать 5000 км" in errors
+
+
+def test_import_refuelings_rejects_unknown_fuel_type(tmp_path, user, vehicle):
+    path = tmp_path / "statement.csv"
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(["date", "vehicle", "mileage", "fuel_quantity", "price_per_liter", "fuel_type"])
+        writer.writerow(["01.01.2024", "а123вс77", "100", "40", "50", "керосин"])
+        writer.writerow(["02.01.2024", "а123вс77", "100", "40", "50", "x" * 30])
+    stderr = StringIO()
+
+    call_command("import_refuelings", str(path), user="fleet", stdout=StringIO(), stderr=stderr)
+
+    assert forge.models.Refueling.objects.count() == 0
+    assert "Строка 2: fuel_type" in stderr.getvalue()
+    assert "Строка 3: fuel_type" in stderr.getvalue()
+
+
+def test_import_refuelings_from_xlsx(tmp_path, user, vehicle):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(COLUMNS)
+    sheet.append([datetime.date(2024, 1, 1), "Газель", 250, 30, 55, None, None, None])
+    path = tmp_path / "statement.xlsx"
+    workbook.save(path)
+
+    call_command("import_refuelings", str(path), user="fleet", stdout=StringIO())
+
+    assert forge.models.Refueling.objects.get().odometer == 1250
+
+
+def test_refueling_resource_exports_rows(user, vehicle):
+    forge.models.Refueling.objects.create(vehicle=vehicle, date=datetime.date(2024, 1, 1), mileage=100,
+                                          fuel_quantity=Decimal("40.00"), price_per_liter=Decimal("50.00"))
+
+    dataset = resources.Refueling().export()
+
+    assert dataset.headers[:3] == ["id", "date", "vehicle"]
+    assert dataset.dict[0]["vehicle"] == vehicle.id
@@ -0,0 +1,141 @@
+"""EXPLAIN-проверки того, что горячие запросы к заправкам используют составные индексы.
+
+Объем данных задается переменной окружения EXPLAIN_SEED_ROWS
+(например, 1000000 для проверки на полном объеме).
+"""
+import datetime
+import os
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+
+import forge.models
+import forge.rollups
+
+pytestmark = pytest.mark.django_db
+
+SEED_ROWS = int(os.getenv("EXPLAIN_SEED_ROWS", "10000"))
+USERS = 20
+VEHICLES_PER_USER = 5
+
+
+@pytest.fixture
+def seeded(django_user_model):
+    users = django_user_model.objects.bulk_create(
+        [django_user_model(username=f"user{number}") for number in range(USERS)]
+    )
+    vehicles = forge.models.Vehicle.objects.bulk_create([
+        forge.models.Vehicle(name=f"car {number}", user=user)
+        for user in users
+        for number in range(VEHICLES_PER_USER)
+    ])
+    start = datetime.date(2015, 1, 1)
+    batch = []
+    for number in range(SEED_ROWS):
+        vehicle = vehicles[number % len(vehicles)]
+        refueling = forge.models.Refueling(
+            vehicle_id=vehicle.pk,
+            user_id=vehicle.user_id,
+            date=start + datetime.timedelta(days=number // len(vehicles)),
+            mileage=100,
+            odometer=100 * (number // len(vehicles) + 1),
+            fuel_quantity=Decimal("40.00"),
+            price_per_liter=Decimal("50.00"),
+        )
+        refueling.fill_period()
+        batch.append(refueling)
+        if len(batch) == 10000:
+            forge.models.Refueling.objects.bulk_create(batch)
+            batch = []
+    forge.models.Refueling.objects.bulk_create(batch)
+
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE" if connection.vendor == "sqlite" else "ANALYZE forge_refueling")
+    return users[0], vehicles[0]
+
+
+def plan(queryset):
+    return queryset.explain()
+
+
+def test_refueling_list_uses_user_date_index(seeded):
+    user, _ = seeded
+
+    result = plan(forge.models.Refueling.objects.filter(user=user).order_by("-date", "-created_at", "-pk")[:51])
+
+    assert "refueling_user_date_idx" in result
+    assert "TEMP B-TREE" not in result and "Sort" not in result
+
+
+def test_future_refuelings_check_uses_vehicle_date_index(seeded):
+    _, vehicle = seeded
+
+    # Так выглядит .exists() из serializers.Refueling.validate
+    result = plan(forge.models.Refueling.objects.filter(
+        vehicle=vehicle, date__gt=datetime.date(2016, 1, 1)
+    ).order_by().values("pk")[:1])
+
+    assert "refueling_vehicle_date_idx" in result
+
+
+def test_previous_odometer_lookup_uses_vehicle_date_index(seeded):
+    _, vehicle = seeded
+
+    queryset = forge.models.Refueling.objects.filter(
+        vehicle_id=vehicle.pk, date__lte=datetime.date(2016, 1, 1)
+    ).order_by("-date", "-pk").values_list("odometer", flat=True)[:1]
+    result = plan(queryset)
+
+    assert "refueling_vehicle_date_idx" in result
+    assert "TEMP B-TREE" not in result and "Sort" not in result
+
+
+@pytest.fixture
+def seeded_prices():
+    from forge import prices
+
+    stations = forge.models.GasStation.objects.bulk_create(
+        [forge.models.GasStation(company="Лукойл", name=f"АЗС {number}") for number in range(50)]
+    )
+    start = datetime.date(2023, 1, 1)
+    prices.ingest(
+        {"date": start + datetime.timedelta(days=day), "fuel_type": fuel_type, "price": Decimal("50.00"),
+         "gas_station": station.pk}
+        for station in stations
+        for day in range(100)
+        for fuel_type in ("АИ-92", "АИ-95", "ДТ")
+    )
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE" if connection.vendor == "sqlite" else "ANALYZE forge_fuelprice")
+    return stations[0]
+
+
+def test_price_as_of_lookup_uses_station_date_index(seeded_prices):
+    # Так выглядит запрос prices._lookup
+    result = plan(forge.models.FuelPrice.objects.filter(
+        fuel_type="АИ-95", date__lte=datetime.date(2023, 3, 1), gas_station=seeded_prices,
+    ).order_by("-date").values_list("price", flat=True)[:1])
+
+    assert "fuelprice_station_date_idx" in result
+    assert "TEMP B-TREE" not in result and "Sort" not in result
+
+
+def test_top_consumption_uses_generated_column_index(seeded):
+    user, _ = seeded
+
+    # ?ordering=-fuel_consumption: первая страница keyset-пагинации
+    result = plan(forge.models.Refueling.objects.filter(user=user).order_by("-fuel_consumption_value", "-pk")[:20])
+
+    assert "refueling_user_consumption_idx" in result
+    assert "TEMP B-TREE" not in result and "Sort" not in result
+
+
+def test_yearly_statistics_group_by_uses_period_index(seeded):
+    _, vehicle = seeded
+
+    # Запрос пересчета статистики ТС за год (rollups.update_statistics)
+    result = plan(forge.rollups._monthly(forge.models.Refueling.objects.filter(vehicle_id=vehicle.pk, year=2016)))
+
+    assert "refueling_vehicle_period_idx" in result
+    assert "TEMP B-TREE" not in result and "Sort" not in result
@@ -0,0 +1,106 @@
+import logging
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+import forge.models
+from utilities import metrics
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    for histogram in metrics.HISTOGRAMS:
+        histogram.clear()
+
+
+def staff_client():
+    staff = get_user_model().objects.create_user(username="ops", password="pass11111111", is_staff=True)
+    client = APIClient()
+    client.force_login(staff)
+    return client
+
+
+def sample(text, name):
+    for line in text.splitlines():
+        if line.startswith(name + " "):
+            return float(line.split()[-1])
+    raise AssertionError(f"{name} not found")
+
+
+def test_metrics_record_queries_and_latency_per_view(api_client, user):
+    forge.models.Vehicle.objects.create(name="Toyota Camry", user=user)
+
+    with CaptureQueriesContext(connection) as queries:
+        api_client.get(reverse("vehicle-list"))
+    query_count = len(queries)
+    api_client.get(reverse("vehicle-list"))
+    response = staff_client().get(reverse("metrics"))
+
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+    text = response.content.decode()
+    labels = '{view="vehicle-list",method="GET"}'
+    assert sample(text, f"brooks_request_duration_seconds_count{labels}") == 2
+    assert sample(text, f"brooks_db_queries_sum{labels}") == 2 * query_count
+    assert sample(text, f"brooks_db_duration_seconds_sum{labels}") > 0
+    assert sample(text, f"brooks_view_non_db_duration_seconds_count{labels}") == 2
+    assert 'brooks_db_queries_bucket{view="vehicle-list",method="GET",le="+Inf"} 2' in text
+    # Сам /metrics не учитывается
+    assert 'view="metrics"' not in text
+
+
+def test_duplicate_queries_are_reported_in_development(settings, caplog):
+    settings.METRICS_DUPLICATE_QUERIES = True
+    settings.METRICS_DUPLICATE_QUERY_THRESHOLD = 3
+
+    def view(request):
+        for _ in range(4):
+            get_user_model().objects.filter(pk=1).first()
+        return HttpResponse()
+
+    with caplog.at_level(logging.WARNING, logger="utilities.metrics"):
+        response = metrics.QueryMetricsMiddleware(view)(RequestFactory().get("/"))
+
+    assert response["X-Duplicate-Queries"] == "4"
+    assert "4 раз" in caplog.text
+
+
+def test_duplicate_queries_are_not_tracked_in_production(settings):
+    settings.METRICS_DUPLICATE_QUERIES = False
+
+    def view(request):
+        for _ in range(10):
+            get_user_model().objects.filter(pk=1).first()
+        return HttpResponse()
+
+    response = metrics.QueryMetricsMiddleware(view)(RequestFactory().get("/"))
+
+    assert "X-Duplicate-Queries" not in response
+    assert metrics.DB_QUERIES.series[("<unresolved>", "GET")][1] == 10
+
+
+def test_metrics_can_be_disabled(settings):
+    settings.METRICS_ENABLED = False
+
+    assert staff_client().get(reverse("metrics")).status_code == 404
+
+
+def test_metrics_require_staff_or_token(settings, api_client):
+    settings.METRICS_TOKEN = "scrape-secret"
+    url = reverse("metrics")
+
+    assert APIClient().get(url).status_code == 403
+    assert api_client.get(url).status_code == 403
+    assert APIClient().get(url, HTTP_AUTHORIZATION="Bearer wrong").status_code == 403
+    assert APIClient().get(url, HTTP_AUTHORIZATION="Bearer scrape-secret").status_code == 200
+
+    settings.METRICS_TOKEN = ""
+    assert APIClient().get(url, HTTP_AUTHORIZATION="Bearer ").status_code == 403
@@ -0,0 +1,137 @@
+import base64
+import datetime
+import json
+from decimal import Decimal
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+from django.urls import reverse
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+import forge.models
+from forge.pagination import KeysetPagination
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def refuelings(vehicle):
+    start = datetime.date(2024, 1, 1)
+    # По две заправки в день, чтобы порядок внутри даты решали created_at и id
+    return [
+        forge.models.Refueling.objects.create(
+            vehicle=vehicle,
+            date=start + datetime.timedelta(days=day // 2),
+            mileage=100,
+            fuel_quantity=Decimal("40.00"),
+            price_per_liter=Decimal("50.00"),
+        )
+        for day in range(25)
+    ]
+
+
+def collect(api_client, url, params=None):
+    ids = []
+    response = api_client.get(url, params)
+    while True:
+        assert response.status_code == 200
+        ids.extend(row["id"] for row in response.data["results"])
+        if not response.data["next"]:
+            return ids, response
+        response = api_client.get(response.data["next"])
+
+
+def test_refuelings_are_paginated_in_meta_ordering(api_client, refuelings):
+    ids, _ = collect(api_client, reverse("refueling-list"), {"page_size": 4})
+
+    expected = forge.models.Refueling.objects.order_by("-date", "-created_at", "-pk").values_list("pk", flat=True)
+    assert ids == list(expected)
+
+
+def test_previous_link_returns_previous_page(api_client, refuelings):
+    url = reverse("refueling-list")
+    first = api_client.get(url, {"page_size": 5})
+    second = api_client.get(first.data["next"])
+
+    previous = api_client.get(second.data["previous"])
+
+    assert first.data["previous"] is None
+    assert [row["id"] for row in previous.data["results"]] == [row["id"] for row in first.data["results"]]
+
+
+def test_page_size_is_capped(api_client, refuelings, monkeypatch):
+    monkeypatch.setattr(KeysetPagination, "max_page_size", 10)
+
+    response = api_client.get(reverse("refueling-list"), {"page_size": 10_000})
+
+    assert len(response.data["results"]) == 10
+    assert response.data["next"] is not None
+
+
+def test_page_query_count_does_not_depend_on_page_number(api_client, refuelings, django_assert_max_num_queries):
+    url = reverse("refueling-list")
+    response = api_client.get(url, {"page_size": 2})
+    for _ in range(5):
+        response = api_client.get(response.data["next"])
+
+    # Метка ETag и сама страница
+    with django_assert_max_num_queries(2):
+        api_client.get(response.data["next"])
+
+
+def test_invalid_cursor_returns_not_found(api_client, refuelings):
+    response = api_client.get(reverse("refueling-list"), {"cursor": "garbage"})
+
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize("key", [["notadate", "x", 1], [[1], {"a": 1}, None], [None, None, None]])
+def test_crafted_cursor_values_return_not_found(api_client, refuelings, key):
+    cursor = base64.urlsafe_b64encode(json.dumps({"key": key}).encode()).decode()
+
+    response = api_client.get(reverse("refueling-list"), {"cursor": cursor})
+
+    assert response.status_code == 404
+
+
+def test_foreign_key_ordering_walks_every_row(api_client, user):
+    # Имена ТС идут в обратном порядке к id: сортировка по связанной модели разошлась бы с курсором
+    vehicles = [
+        forge.models.Vehicle.objects.create(name=name, initial_odometer=0, user=user)
+        for name in ("Volvo", "Skoda", "Lada", "Kia")
+    ]
+    for vehicle in vehicles:
+        for month in (1, 2, 3):
+            forge.models.FuelStatistics.objects.create(
+                vehicle=vehicle, period=datetime.date(2024, month, 1), period_type="month",
+            )
+
+    ids, _ = collect(api_client, reverse("fuelstatistics-list"), {"page_size": 2})
+
+    expected = forge.models.FuelStatistics.objects.order_by("-period", "vehicle_id", "pk").values_list("pk", flat=True)
+    assert ids == list(expected)
+
+
+@pytest.mark.parametrize("ordering", ["discount", "-discount"])
+def test_nullable_ordering_walks_every_row(refuelings, ordering):
+    for number, refueling in enumerate(refuelings):
+        refueling.discount = None if number % 3 == 0 else Decimal(number % 4)
+        refueling.save(update_fields=["discount"])
+    queryset = forge.models.Refueling.objects.order_by(ordering)
+
+    ids, params = [], {"page_size": 4}
+    while True:
+        paginator = KeysetPagination()
+        # Курсор со значением NULL, в том числе на второй странице
+        ids.extend(row.pk for row in paginator.paginate_queryset(queryset, Request(APIRequestFactory().get("/", params))))
+        link = paginator.get_next_link()
+        if link is None:
+            break
+        params = {name: values[0] for name, values in parse_qs(urlsplit(link).query).items()}
+
+    # NULL больше любого значения
+    rows = forge.models.Refueling.objects.values_list("discount", "pk")
+    expected = [pk for _, pk in sorted(rows, key=lambda row: (row[0] is None, row[0] or 0, row[1]),
+                                       reverse=ordering.startswith("-"))]
+    assert ids == expected
@@ -0,0 +1,214 @@
+import datetime
+from decimal import Decimal
+
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+import forge.models
+from forge import prices
+
+pytestmark = pytest.mark.django_db
+
+DAY = datetime.date(2024, 3, 1)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+@pytest.fixture
+def admin_client(django_user_model):
+    admin = django_user_model.objects.create_user(username="admin", password="pass11111111", is_staff=True)
+    client = APIClient()
+    client.force_authenticate(user=admin)
+    return client
+
+
+@pytest.fixture
+def stations():
+    return forge.models.GasStation.objects.bulk_create(
+        [forge.models.GasStation(company="Лукойл", name=f"АЗС {number}", number=str(number)) for number in range(3)]
+    )
+
+
+def row(date, price, station=None, fuel_type="АИ-95"):
+    return {"date": date, "fuel_type": fuel_type, "price": Decimal(price), "gas_station": station}
+
+
+def test_ingest_upserts_on_unique_key(stations, django_assert_max_num_queries):
+    feed = [row(DAY + datetime.timedelta(days=day), "50.00", station.pk) for day in range(100) for station in stations]
+
+    # Три пачки INSERT ... ON CONFLICT и точка сохранения транзакции
+    with django_assert_max_num_queries(5):
+        assert prices.ingest(feed, batch_size=100) == 300
+    prices.ingest([row(DAY, "55.50", stations[0].pk), row(DAY, "56.00", stations[0].pk)])
+
+    assert forge.models.FuelPrice.objects.count() == 300
+    assert forge.models.FuelPrice.objects.get(date=DAY, gas_station=stations[0]).price == Decimal("56.00")
+
+
+def test_ingest_replaces_general_prices(stations):
+    prices.ingest([row(DAY, "50.00"), row(DAY, "60.00", fuel_type="ДТ")])
+    prices.ingest([row(DAY, "51.00")])
+
+    general = forge.models.FuelPrice.objects.filter(gas_station__isnull=True)
+    assert sorted(general.values_list("fuel_type", "price")) == [("АИ-95", Decimal("51.00")), ("ДТ", Decimal("60.00"))]
+
+
+def test_ingest_replaces_large_general_feed(django_assert_max_num_queries):
+    feed = [
+        row(DAY + datetime.timedelta(days=day), "50.00", fuel_type=fuel_type)
+        for day in range(400) for fuel_type in ("АИ-92", "АИ-95", "ДТ")
+    ]
+    prices.ingest(feed)
+
+    # Повторная загрузка не упирается в глубину выражения SQLite и не плодит дубли;
+    # старые цены удаляются одним DELETE на тип топлива, без выборки строк
+    with django_assert_max_num_queries(10):
+        assert prices.ingest([{**price, "price": Decimal("51.00")} for price in feed]) == 1200
+
+    general = forge.models.FuelPrice.objects.filter(gas_station__isnull=True)
+    assert general.count() == 1200
+    assert set(general.values_list("price", flat=True)) == {Decimal("51.00")}
+
+
+def test_price_as_of_uses_latest_station_price_then_general(stations):
+    prices.ingest([
+        row(DAY, "50.00", stations[0].pk),
+        row(DAY + datetime.timedelta(days=5), "52.00", stations[0].pk),
+        row(DAY, "49.00"),
+    ])
+
+    assert prices.price_as_of(stations[0].pk, "АИ-95", DAY + datetime.timedelta(days=4)) == Decimal("50.00")
+    assert prices.price_as_of(stations[0].pk, "АИ-95", DAY + datetime.timedelta(days=30)) == Decimal("52.00")
+    assert prices.price_as_of(stations[1].pk, "АИ-95", DAY) == Decimal("49.00")
+    assert prices.price_as_of(None, "АИ-95", DAY) == Decimal("49.00")
+    assert prices.price_as_of(stations[0].pk, "АИ-95", DAY - datetime.timedelta(days=1)) is None
+    assert prices.price_as_of(stations[0].pk, "ДТ", DAY) is None
+
+
+def test_price_as_of_is_cached_and_invalidated_by_ingest(stations, django_assert_num_queries):
+    prices.ingest([row(DAY, "50.00", stations[0].pk)])
+    prices.price_as_of(stations[0].pk, "АИ-95", DAY)
+
+    with django_assert_num_queries(0):
+        assert prices.price_as_of(stations[0].pk, "АИ-95", DAY) == Decimal("50.00")
+
+    prices.ingest([row(DAY, "53.00")])
+    prices.ingest([row(DAY, "51.00", stations[0].pk)])
+    assert prices.price_as_of(stations[0].pk, "АИ-95", DAY) == Decimal("51.00")
+
+    forge.models.FuelPrice.objects.filter(gas_station=stations[0]).get().delete()
+    assert prices.price_as_of(stations[0].pk, "АИ-95", DAY) == Decimal("53.00")
+
+
+def test_bulk_price_api_requires_staff(api_client, admin_client, stations):
+    payload = [
+        {"date": "2024-03-01", "fuel_type": "АИ-95", "price": "50.00", "gas_station": stations[0].pk},
+        {"date": "2024-03-01", "fuel_type": "ДТ", "price": "62.00"},
+    ]
+
+    assert api_client.post(reverse("fuelprice-bulk"), payload, format="json").status_code == 403
+    response = admin_client.post(reverse("fuelprice-bulk"), payload, format="json")
+
+    assert response.status_code == 201
+    assert response.data == {"count": 2}
+    assert forge.models.FuelPrice.objects.count() == 2
+
+
+def test_bulk_price_api_reports_unknown_station(admin_client, stations):
+    payload = [
+        {"date": "2024-03-01", "fuel_type": "АИ-95", "price": "50.00", "gas_station": stations[0].pk},
+        {"date": "2024-03-01", "fuel_type": "АИ-95", "price": "50.00", "gas_station": 999999},
+    ]
+
+    response = admin_client.post(reverse("fuelprice-bulk"), payload, format="json")
+
+    assert response.status_code == 400
+    assert response.data[0] == {}
+    assert "gas_station" in response.data[1]
+    assert not forge.models.FuelPrice.objects.exists()
+
+
+def test_price_as_of_api(api_client, stations):
+    prices.ingest([row(DAY, "50.00", stations[0].pk)])
+
+    response = api_client.get(reverse("fuelprice-as-of"), {
+        "fuel_type": "АИ-95", "gas_station": stations[0].pk, "date": "2024-03-10",
+    })
+
+    assert response.status_code == 200
+    assert response.data["price"] == Decimal("50.00")
+
+
+def test_refueling_price_is_prefilled_from_station_price(api_client, user, stations):
+    vehicle = forge.models.Vehicle.objects.create(name="Toyota Camry", user=user)
+    prices.ingest([row(DAY, "50.00", stations[0].pk)])
+    payload = {"vehicle": vehicle.id, "date": "2024-03-02", "mileage": 300, "fuel_quantity": "40.00",
+               "fuel_type": "АИ-95", "gas_station": stations[0].pk}
+
+    response = api_client.post(reverse("refueling-list"), payload, format="json")
+
+    assert response.status_code == 201, response.data
+    assert response.data["price_per_liter"] == "50.00"
+    assert response.data["total_cost"] == "2000.00"
+
+
+def test_refueling_without_price_and_known_price_is_rejected(api_client, user, stations):
+    vehicle = forge.models.Vehicle.objects.create(name="Toyota Camry", user=user)
+    payload = {"vehicle": vehicle.id, "date": "2024-03-02", "mileage": 300, "fuel_quantity": "40.00",
+               "fuel_type": "АИ-95"}
+
+    response = api_client.post(reverse("refueling-list"), payload, format="json")
+
+    assert response.status_code == 400
+    assert "price_per_liter" in response.data
+
+
+def test_bulk_refuelings_prefill_price(api_client, user, stations):
+    vehicle = forge.models.Vehicle.objects.create(name="Toyota Camry", user=user)
+    prices.ingest([row(DAY, "50.00")])
+    payload = [{"vehicle": vehicle.id, "date": "2024-03-02", "mileage": 300, "fuel_quantity": "10.00",
+                "fuel_type": "АИ-95"}]
+
+    response = api_client.post(reverse("refueling-bulk"), payload, format="json")
+
+    assert response.status_code == 201, response.data
+    assert forge.models.Refueling.objects.get().price_per_liter == Decimal("50.00")
+
+
+def test_bulk_refuelings_resolve_prices_for_whole_batch(api_client, user, stations, django_assert_max_num_queries):
+    vehicle = forge.models.Vehicle.objects.create(name="Toyota Camry", user=user)
+    prices.ingest([row(DAY, "50.00"), row(DAY + datetime.timedelta(days=10), "52.00"),
+                   row(DAY + datetime.timedelta(days=5), "55.00", stations[0].pk)])
+    payload = [
+        {"vehicle": vehicle.id, "date": (DAY + datetime.timedelta(days=day)).isoformat(), "mileage": 300,
+         "fuel_quantity": "10.00", "fuel_type": "АИ-95", "gas_station": stations[0].pk if day % 2 else None}
+        for day in range(1, 100)
+    ]
+
+    # Цены на все даты - два запроса, а не запрос на строку
+    with django_assert_max_num_queries(14):
+        response = api_client.post(reverse("refueling-bulk"), payload, format="json")
+
+    assert response.status_code == 201, response.data
+    by_date = dict(forge.models.Refueling.objects.values_list("date", "price_per_liter"))
+    assert by_date[DAY + datetime.timedelta(days=2)] == Decimal("50.00")
+    assert by_date[DAY + datetime.timedelta(days=3)] == Decimal("50.00")
+    assert by_date[DAY + datetime.timedelta(days=7)] == Decimal("55.00")
+    assert by_date[DAY + datetime.timedelta(days=12)] == Decimal("52.00")
+
+
+def test_prices_as_of_matches_price_as_of(stations, settings):
+    settings.FUEL_PRICE_CACHE_TIMEOUT = 0
+    prices.ingest([row(DAY, "50.00"), row(DAY + datetime.timedelta(days=3), "51.00", stations[1].pk),
+                   row(DAY + datetime.timedelta(days=6), "53.00")])
+    keys = [
+        (station, "АИ-95", DAY + datetime.timedelta(days=day))
+        for station in (None, stations[0].pk, stations[1].pk) for day in range(-1, 9)
+    ]
+
+    assert prices.prices_as_of(keys) == {key: prices.price_as_of(*key) for key in keys}
@@ -1,10 +1,14 @@
 from decimal import Decimal
-from datetime import timedelta
+from datetime import date, timedelta
+from io import StringIO
 
 import pytest
 from django.apps import apps
 from django.contrib.auth.models import Permission
 from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework.test import APIClient
@@ -127,6 +131,187 @@ def test_refueling_odometer_adds_previous_refuelings(vehicle, user):
     assert second.odometer == 1300
 
 
+def _create_refueling(vehicle, date, mileage):
+    Refueling = apps.get_model("forge", "Refueling")
+    return Refueling.objects.create(
+        vehicle=vehicle,
+        date=date,
+        mileage=mileage,
+        fuel_quantity=Decimal("40.00"),
+        price_per_liter=Decimal("50.00"),
+    )
+
+
+def _odometers(vehicle):
+    Refueling = apps.get_model("forge", "Refueling")
+    return list(Refueling.objects.filter(vehicle=vehicle).order_by("date", "pk").values_list("odometer", flat=True))
+
+
+def test_refueling_odometer_inserted_out_of_order_shifts_later_refuelings(vehicle):
+    today = timezone.now().date()
+    _create_refueling(vehicle, today, 100)
+    _create_refueling(vehicle, today + timedelta(days=2), 300)
+
+    middle = _create_refueling(vehicle, today + timedelta(days=1), 200)
+
+    assert middle.odometer == 1300
+    assert _odometers(vehicle) == [1100, 1300, 1600]
+
+
+def test_refueling_odometer_follows_edited_date_and_mileage(vehicle):
+    today = timezone.now().date()
+    first = _create_refueling(vehicle, today, 100)
+    _create_refueling(vehicle, today + timedelta(days=1), 200)
+    _create_refueling(vehicle, today + timedelta(days=2), 300)
+
+    first.date = today + timedelta(days=3)
+    first.mileage = 50
+    first.save()
+
+    assert first.odometer == 1550
+    assert _odometers(vehicle) == [1200, 1500, 1550]
+
+
+def test_refueling_save_fills_period_from_date(vehicle):
+    refueling = _create_refueling(vehicle, date(2024, 3, 31), 100)
+    assert (refueling.year, refueling.month, refueling.quarter) == (2024, 3, 1)
+
+    refueling.date = date(2025, 4, 1)
+    refueling.save(update_fields=["date"])
+
+    refueling.refresh_from_db()
+    assert (refueling.year, refueling.month, refueling.quarter) == (2025, 4, 2)
+
+
+def test_refueling_odometer_after_delete(vehicle):
+    today = timezone.now().date()
+    _create_refueling(vehicle, today, 100)
+    middle = _create_refueling(vehicle, today + timedelta(days=1), 200)
+    _create_refueling(vehicle, today + timedelta(days=2), 300)
+
+    middle.delete()
+
+    assert _odometers(vehicle) == [1100, 1400]
+
+
+def test_refueling_writes_lock_vehicles(vehicle, user, monkeypatch):
+    Vehicle = apps.get_model("forge", "Vehicle")
+    other = Vehicle.objects.create(name="Ford Focus", initial_odometer=5000, user=user)
+    locked = []
+    monkeypatch.setattr(Vehicle, "lock", staticmethod(lambda vehicle_ids: locked.append(set(vehicle_ids) - {None})))
+    refueling = _create_refueling(vehicle, timezone.now().date(), 100)
+
+    # Перенос блокирует и старое, и новое ТС
+    refueling.vehicle = other
+    refueling.save()
+    refueling.delete()
+
+    assert locked[0] == {vehicle.pk}
+    assert locked[1] == {vehicle.pk, other.pk}
+    assert {other.pk} in locked[2:]
+
+
+def test_first_refueling_reads_initial_odometer_from_database(vehicle):
+    Vehicle = apps.get_model("forge", "Vehicle")
+    # Начальный пробег изменен через другой экземпляр: у vehicle он устарел
+    fresh = Vehicle.objects.get(pk=vehicle.pk)
+    fresh.initial_odometer = 1613
+    fresh.save()
+
+    refueling = _create_refueling(vehicle, timezone.now().date(), 100)
+
+    assert refueling.odometer == 1713
+
+
+def test_refueling_odometer_follows_vehicle_initial_odometer(vehicle):
+    today = timezone.now().date()
+    _create_refueling(vehicle, today, 100)
+    _create_refueling(vehicle, today + timedelta(days=1), 200)
+
+    vehicle.initial_odometer = 2000
+    vehicle.save()
+
+    assert _odometers(vehicle) == [2100, 2300]
+
+
+def test_recalculate_odometers_command_repairs_column(vehicle):
+    Refueling = apps.get_model("forge", "Refueling")
+    today = timezone.now().date()
+    _create_refueling(vehicle, today, 100)
+    _create_refueling(vehicle, today + timedelta(days=1), 200)
+    Refueling.objects.update(odometer=0)
+
+    call_command("recalculate_odometers", stdout=StringIO())
+
+    assert _odometers(vehicle) == [1100, 1300]
+
+
+def test_refueling_changes_update_current_odometer_incrementally(vehicle, user):
+    Vehicle = apps.get_model("forge", "Vehicle")
+    other_vehicle = Vehicle.objects.create(name="Second car", initial_odometer=500, user=user)
+    today = timezone.now().date()
+    first = _create_refueling(vehicle, today, 100)
+    second = _create_refueling(vehicle, today + timedelta(days=1), 200)
+
+    first.mileage = 150
+    first.save()
+    second.vehicle = other_vehicle
+    second.save()
+
+    vehicle.refresh_from_db()
+    other_vehicle.refresh_from_db()
+    assert vehicle.current_odometer == 1150
+    assert other_vehicle.current_odometer == 700
+
+    second.delete()
+
+    other_vehicle.refresh_from_db()
+    assert other_vehicle.current_odometer == 500
+
+
+def test_refueling_save_cost_does_not_grow_with_history(vehicle):
+    today = timezone.now().date()
+
+    def insert_queries(day):
+        with CaptureQueriesContext(connection) as context:
+            _create_refueling(vehicle, today + timedelta(days=day), 100)
+        return context.captured_queries
+
+    short_history = insert_queries(0)
+    for day in range(1, 30):
+        _create_refueling(vehicle, today + timedelta(days=day), 100)
+    long_history = insert_queries(40)
+
+    assert len(long_history) == len(short_history)
+    # Агрегаты считаются только по затронутому периоду, а не по всей истории
+    assert all('"date" >=' in query["sql"] for query in long_history if "SUM(" in query["sql"])
+
+
+def test_recalculate_odometers_command_repairs_current_odometer(vehicle):
+    Vehicle = apps.get_model("forge", "Vehicle")
+    today = timezone.now().date()
+    _create_refueling(vehicle, today, 100)
+    _create_refueling(vehicle, today + timedelta(days=1), 200)
+    Vehicle.objects.update(current_odometer=0)
+
+    call_command("recalculate_odometers", stdout=StringIO())
+
+    vehicle.refresh_from_db()
+    assert vehicle.current_odometer == 1300
+
+
+def test_refueling_list_odometer_needs_no_extra_queries(api_client, vehicle, django_assert_max_num_queries):
+    today = timezone.now().date()
+    for day in range(20):
+        _create_refueling(vehicle, today + timedelta(days=day), 100)
+
+    with django_assert_max_num_queries(2):
+        response = api_client.get(reverse("refueling-list"), format="json")
+
+    assert response.status_code == 200
+    assert sorted(row["odometer"] for row in response.data["results"]) == [1000 + 100 * i for i in range(1, 21)]
+
+
 def test_refueling_calculated_cost_fields(refueling):
     assert refueling.total_cost == Decimal("2516.1500")
     assert refueling.effective_cost == Decimal("2516.1500")
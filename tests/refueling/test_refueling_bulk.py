@@ -0,0 +1,144 @@
+import datetime
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIRequestFactory
+
+import forge.models
+import forge.serializers
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def vehicles(user):
+    return [
+        forge.models.Vehicle.objects.create(name=name, initial_odometer=1000, user=user)
+        for name in ("Toyota Camry", "Ford Focus")
+    ]
+
+
+def item(vehicle, day, mileage=100):
+    return {
+        "vehicle": vehicle.id,
+        "date": (datetime.date(2024, 1, 1) + datetime.timedelta(days=day)).isoformat(),
+        "mileage": mileage,
+        "fuel_quantity": "40.00",
+        "price_per_liter": "50.00",
+    }
+
+
+def test_bulk_create_refuelings(
+    api_client, vehicles, django_assert_max_num_queries, django_capture_on_commit_callbacks
+):
+    camry, focus = vehicles
+    payload = [item(camry, day) for day in range(30, 0, -1)] + [item(focus, day, 200) for day in range(20)]
+
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        with django_assert_max_num_queries(12):
+            response = api_client.post(reverse("refueling-bulk"), data=payload, format="json")
+
+    # Статистика пересчитывается после коммита, по одной задаче на ТС и год
+    assert len(callbacks) == 2
+
+    assert response.status_code == 201
+    assert len(response.data) == 50
+    camry.refresh_from_db()
+    focus.refresh_from_db()
+    assert camry.current_odometer == 1000 + 30 * 100
+    assert focus.current_odometer == 1000 + 20 * 200
+    odometers = forge.models.Refueling.objects.filter(vehicle=camry).order_by("date", "pk").values_list(
+        "odometer", flat=True
+    )
+    assert list(odometers) == [1000 + 100 * i for i in range(1, 31)]
+    assert forge.models.Refueling.objects.get(vehicle=camry, date=datetime.date(2024, 1, 2)).total_cost == 2000
+    assert forge.models.Refueling.objects.filter(vehicle=camry, date__month=1).exclude(
+        year=2024, month=1, quarter=1
+    ).count() == 0
+    assert forge.models.FuelStatistics.objects.get(
+        vehicle=focus, period_type="year", period=datetime.date(2024, 1, 1)
+    ).total_distance == 20 * 200
+
+
+def test_bulk_create_appends_after_existing_refuelings(api_client, vehicles):
+    camry = vehicles[0]
+    api_client.post(reverse("refueling-bulk"), data=[item(camry, 5)], format="json")
+
+    response = api_client.post(reverse("refueling-bulk"), data=[item(camry, 5), item(camry, 6)], format="json")
+
+    assert response.status_code == 201
+    assert [row["odometer"] for row in response.data] == [1200, 1300]
+
+
+def test_bulk_create_rejects_whole_batch(api_client, vehicles, django_user_model):
+    camry = vehicles[0]
+    other_user = django_user_model.objects.create_user(username="otheruser", password="pass11111111")
+    other_vehicle = forge.models.Vehicle.objects.create(name="Other car", user=other_user)
+    api_client.post(reverse("refueling-bulk"), data=[item(camry, 10)], format="json")
+
+    response = api_client.post(
+        reverse("refueling-bulk"),
+        data=[item(camry, 11), item(other_vehicle, 1), item(camry, 1)],
+        format="json",
+    )
+
+    assert response.status_code == 400
+    assert response.data[0] == {}
+    assert "vehicle" in response.data[1]
+    assert "date" in response.data[2]
+    assert forge.models.Refueling.objects.count() == 1
+
+
+def test_bulk_create_validates_mileage_per_row(api_client, vehicles):
+    camry = vehicles[0]
+
+    response = api_client.post(
+        reverse("refueling-bulk"), data=[item(camry, 1), item(camry, 2, mileage=0)], format="json"
+    )
+
+    assert response.status_code == 400
+    assert "mileage" in response.data[1]
+    assert forge.models.Refueling.objects.count() == 0
+
+
+def test_bulk_create_rejects_empty_batch(api_client):
+    response = api_client.post(reverse("refueling-bulk"), data=[], format="json")
+
+    assert response.status_code == 400
+
+
+def test_bulk_create_rereads_vehicle_state_on_write(api_client, user, vehicles):
+    camry = vehicles[0]
+    request = APIRequestFactory().post("/")
+    request.user = user
+    serializer = forge.serializers.RefuelingBulk(
+        data=[item(camry, 5), item(camry, 6)], many=True, context={"request": request}
+    )
+    assert serializer.is_valid(), serializer.errors
+
+    # Одиночная заправка между проверкой и записью: одометр пачки считается от нее
+    forge.models.Refueling.objects.create(
+        vehicle=camry, date=datetime.date(2024, 1, 5), mileage=500, fuel_quantity=Decimal("40.00"), price_per_liter=Decimal("50.00")
+    )
+    refuelings = serializer.save()
+
+    assert [refueling.odometer for refueling in refuelings] == [1600, 1700]
+
+
+def test_bulk_create_rechecks_dates_on_write(user, vehicles):
+    camry = vehicles[0]
+    request = APIRequestFactory().post("/")
+    request.user = user
+    serializer = forge.serializers.RefuelingBulk(data=[item(camry, 5)], many=True, context={"request": request})
+    assert serializer.is_valid(), serializer.errors
+
+    forge.models.Refueling.objects.create(
+        vehicle=camry, date=datetime.date(2024, 1, 20), mileage=500, fuel_quantity=Decimal("40.00"), price_per_liter=Decimal("50.00")
+    )
+    with pytest.raises(ValidationError) as error:
+        serializer.save()
+
+    assert "date" in error.value.detail[0]
+    assert forge.models.Refueling.objects.count() == 1
@@ -0,0 +1,96 @@
+import datetime
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+
+import forge.models
+import forge.serializers
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def refuelings(user):
+    vehicle = forge.models.Vehicle.objects.create(name="Toyota Camry", initial_odometer=1000, user=user)
+    return [
+        forge.models.Refueling.objects.create(
+            vehicle=vehicle,
+            date=datetime.date(2024, 1, 1) + datetime.timedelta(days=day),
+            mileage=100 * (day + 1),
+            fuel_quantity=Decimal("40.00"),
+            price_per_liter=Decimal("50.00"),
+            discount=Decimal("100.00"),
+        )
+        for day in range(5)
+    ]
+
+
+def test_fields_limits_payload(api_client, refuelings):
+    response = api_client.get(reverse("refueling-list"), {"fields": "date,mileage,effective_cost,unknown"})
+
+    assert response.status_code == 200
+    assert response.data["results"][0] == {
+        "id": refuelings[-1].id, "date": "2024-01-05", "mileage": 500, "effective_cost": Decimal("1900.00"),
+    }
+
+
+def test_omit_skips_computed_fields(api_client, refuelings, monkeypatch):
+    def fail(*args):
+        raise AssertionError("вычисляемое поле не должно считаться")
+
+    monkeypatch.setattr(forge.serializers.Refueling, "get_fuel_consumption", fail)
+    monkeypatch.setattr(forge.serializers.Refueling, "get_effective_cost", fail)
+
+    response = api_client.get(reverse("refueling-list"), {"omit": "fuel_consumption,effective_cost,comment"})
+
+    row = response.data["results"][0]
+    assert "fuel_consumption" not in row and "comment" not in row
+    assert row["odometer"] == 1000 + 100 + 200 + 300 + 400 + 500
+
+
+def test_sparse_list_narrows_query_and_keeps_pagination(api_client, refuelings, django_assert_max_num_queries):
+    url = reverse("refueling-list")
+    params = {"fields": "fuel_consumption", "ordering": "-fuel_consumption", "page_size": 2}
+
+    # Без дозагрузки отложенных полей на каждую строку
+    with django_assert_max_num_queries(2) as captured:
+        first = api_client.get(url, params).data
+    page_sql = captured.captured_queries[-1]["sql"]
+    assert '"comment"' not in page_sql and '"price_per_liter"' not in page_sql
+
+    second = api_client.get(first["next"]).data
+    values = [row["fuel_consumption"] for row in first["results"] + second["results"]]
+    assert values == sorted(values, reverse=True)
+    assert len(set(row["id"] for row in first["results"] + second["results"])) == 4
+
+
+def test_fields_are_ignored_on_write(api_client, refuelings):
+    response = api_client.post(
+        reverse("refueling-list") + "?fields=id",
+        {"vehicle": refuelings[0].vehicle_id, "date": "2024-02-01", "mileage": 100,
+         "fuel_quantity": "10.00", "price_per_liter": "50.00"},
+        format="json",
+    )
+
+    assert response.status_code == 201
+    assert "odometer" in response.data
+
+
+@pytest.mark.parametrize("detail", [False, True])
+def test_sparse_instances_are_narrowed_without_values_list(
+    api_client, refuelings, settings, detail, django_assert_max_num_queries
+):
+    # Экземпляры модели читаются для retrieve и при выключенном REFUELING_LIST_VALUES
+    settings.REFUELING_LIST_VALUES = False
+    url = reverse("refueling-detail", args=[refuelings[0].pk]) if detail else reverse("refueling-list")
+    params = {"fields": "fuel_consumption", "page_size": 2}
+
+    with django_assert_max_num_queries(2) as captured:
+        response = api_client.get(url, params)
+
+    assert response.status_code == 200
+    page_sql = captured.captured_queries[-1]["sql"]
+    assert '"comment"' not in page_sql and '"price_per_liter"' not in page_sql
+    if not detail:
+        assert api_client.get(response.data["next"]).status_code == 200
@@ -0,0 +1,114 @@
+import datetime
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+
+import forge.models
+from forge.consts import FuelType
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def refuelings(user):
+    vehicle = forge.models.Vehicle.objects.create(name="Toyota Camry", initial_odometer=1000, user=user)
+    fuel_types = [FuelType.AI92, FuelType.AI95, FuelType.DIESEL]
+    return [
+        forge.models.Refueling.objects.create(
+            vehicle=vehicle,
+            date=datetime.date(2024, 1, 1) + datetime.timedelta(days=30 * number),
+            mileage=100 * (number + 1),
+            fuel_quantity=Decimal("10.00") * (number + 1),
+            price_per_liter=Decimal("50.00"),
+            fuel_type=fuel_types[number % 3],
+        )
+        for number in range(6)
+    ]
+
+
+def filtered(api_client, **params):
+    response = api_client.get(reverse("refueling-list"), params)
+    assert response.status_code == 200
+    return sorted(row["mileage"] for row in response.data["results"])
+
+
+def test_mileage_range_filter(api_client, refuelings):
+    assert filtered(api_client, mileage_min=200, mileage_max=400) == [200, 300, 400]
+    assert filtered(api_client, mileage=10) == []
+
+
+def test_odometer_range_filter_uses_stored_column(api_client, refuelings):
+    # Одометры: 1100, 1300, 1600, 2000, 2500, 3100
+    assert filtered(api_client, odometer_min=1300, odometer_max=2000) == [200, 300, 400]
+
+
+def test_date_and_fuel_quantity_range_filters(api_client, refuelings):
+    assert filtered(api_client, date_from="2024-01-31", date_to="2024-03-31") == [200, 300, 400]
+    assert filtered(api_client, fuel_quantity_min="50") == [500, 600]
+
+
+def test_fuel_type_in_list_filter(api_client, refuelings):
+    assert filtered(api_client, fuel_type=f"{FuelType.AI92},{FuelType.DIESEL}") == [100, 300, 400, 600]
+
+
+def test_quarter_filter_is_exact(api_client, refuelings):
+    # Квартал выводится из даты: 2024-03-31 - еще первый квартал
+    assert filtered(api_client, quarter=1) == [100, 200, 300, 400]
+    assert filtered(api_client, year=2024, quarter=2) == [500, 600]
+
+
+@pytest.fixture
+def varied_refuelings(user):
+    vehicle = forge.models.Vehicle.objects.create(name="Ford Focus", user=user)
+    # Расход: 40/400=10, 33/300=11, 24.5/350=7, 60/500=12, 19/200=9.5
+    rows = [("40.00", 400, "0"), ("33.00", 300, "150.00"), ("24.50", 350, "0"), ("60.00", 500, "99.99"),
+            ("19.00", 200, "0")]
+    return [
+        forge.models.Refueling.objects.create(
+            vehicle=vehicle,
+            date=datetime.date(2024, 1, 1) + datetime.timedelta(days=number),
+            mileage=mileage,
+            fuel_quantity=Decimal(fuel_quantity),
+            price_per_liter=Decimal("51.30"),
+            discount=Decimal(discount),
+        )
+        for number, (fuel_quantity, mileage, discount) in enumerate(rows)
+    ]
+
+
+def test_computed_columns_match_model_properties(varied_refuelings):
+    for refueling in forge.models.Refueling.objects.filter(pk__in=[row.pk for row in varied_refuelings]):
+        assert refueling.effective_cost_value == refueling.effective_cost
+        assert refueling.fuel_consumption_value == refueling.fuel_consumption.quantize(Decimal("0.0001"))
+
+
+def test_ordering_by_consumption_with_keyset_pages(api_client, varied_refuelings):
+    url = reverse("refueling-list")
+
+    first = api_client.get(url, {"ordering": "-fuel_consumption", "page_size": 3}).data
+    second = api_client.get(first["next"]).data
+
+    consumption = [row["fuel_consumption"] for row in first["results"] + second["results"]]
+    assert consumption == [12, 11, 10, 9.5, 7]
+    assert second["next"] is None
+    assert "fuel_consumption_value" not in first["results"][0]
+
+
+def test_ordering_and_filter_by_effective_cost(api_client, varied_refuelings):
+    response = api_client.get(reverse("refueling-list"), {"ordering": "effective_cost", "effective_cost_min": 1000})
+
+    costs = [Decimal(str(row["effective_cost"])) for row in response.data["results"]]
+    assert costs == sorted(costs)
+    assert min(costs) >= 1000
+    assert len(costs) == 4
+
+
+def test_ordering_by_nullable_total_cost_is_rejected(api_client, varied_refuelings):
+    response = api_client.get(reverse("refueling-list"), {"ordering": "total_cost"})
+
+    assert response.status_code == 400
+
+
+def test_consumption_range_filter(api_client, varied_refuelings):
+    assert filtered(api_client, fuel_consumption_min="9.5", fuel_consumption_max="11") == [200, 300, 400]
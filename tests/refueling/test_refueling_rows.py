@@ -0,0 +1,85 @@
+import datetime
+import json
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+
+import forge.models
+import forge.serializers
+from forge import rows
+from forge.consts import FuelType
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def refuelings(user):
+    vehicle = forge.models.Vehicle.objects.create(name="Toyota Camry", initial_odometer=1000, user=user)
+    station = forge.models.GasStation.objects.create(name="Лукойл", company="Лукойл")
+    result = []
+    for number in range(7):
+        result.append(forge.models.Refueling.objects.create(
+            vehicle=vehicle,
+            date=datetime.date(2024, 1, 1) + datetime.timedelta(days=17 * number),
+            # Нулевой пробег, пустые скидка и тип топлива, дробные количества
+            mileage=0 if number == 3 else 137 * (number + 1),
+            fuel_quantity=Decimal("33.33") + number,
+            price_per_liter=Decimal("51.07"),
+            discount=None if number % 2 else Decimal("12.50"),
+            fuel_type=None if number == 5 else FuelType.AI95,
+            gas_station=station if number % 3 == 0 else None,
+            is_full_tank=number % 2 == 0,
+            comment="полный бак" if number == 1 else "",
+        ))
+    return result
+
+
+def list_json(api_client, settings, enabled, params):
+    settings.REFUELING_LIST_VALUES = enabled
+    response = api_client.get(reverse("refueling-list"), params)
+    assert response.status_code == 200
+    return json.loads(response.content)
+
+
+@pytest.mark.parametrize("params", [
+    {},
+    {"page_size": 3},
+    {"ordering": "-fuel_consumption", "page_size": 2},
+    {"fields": "date,effective_cost,vehicle"},
+    {"omit": "fuel_consumption,comment,created_at"},
+])
+def test_values_list_matches_serializer(api_client, settings, refuelings, params):
+    assert list_json(api_client, settings, True, params) == list_json(api_client, settings, False, params)
+
+
+def test_values_list_cursor_matches_serializer(api_client, settings, refuelings):
+    params = {"ordering": "-fuel_consumption", "page_size": 3}
+    fast = list_json(api_client, settings, True, params)
+    plain = list_json(api_client, settings, False, params)
+
+    # Курсор строится из тех же колонок сортировки
+    assert fast["next"] == plain["next"]
+    assert api_client.get(fast["next"]).data["results"] == api_client.get(plain["next"]).data["results"]
+
+
+def test_row_builder_matches_serializer(refuelings):
+    queryset = forge.models.Refueling.objects.order_by("pk")
+    serializer = forge.serializers.Refueling()
+    builder = rows.RowBuilder(serializer)
+
+    built = builder.build(queryset.values(*builder.columns))
+
+    assert built == forge.serializers.Refueling(queryset, many=True).data
+    assert list(built[0]) == list(serializer.fields)
+
+
+def test_values_list_skips_model_instances(api_client, refuelings, monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("список не должен создавать экземпляры модели")
+
+    monkeypatch.setattr(forge.models.Refueling, "from_db", classmethod(fail))
+
+    response = api_client.get(reverse("refueling-list"))
+
+    assert len(response.data["results"]) == len(refuelings)
@@ -0,0 +1,85 @@
+import datetime
+from decimal import Decimal
+
+import pytest
+
+import forge.consumption
+import forge.models
+import forge.rollups
+
+pytestmark = pytest.mark.django_db
+
+
+def create_refueling(vehicle, date, mileage, fuel_quantity, is_full_tank=True):
+    return forge.models.Refueling.objects.create(
+        vehicle=vehicle,
+        date=date,
+        mileage=mileage,
+        fuel_quantity=Decimal(fuel_quantity),
+        price_per_liter=Decimal("50.00"),
+        is_full_tank=is_full_tank,
+    )
+
+
+def full_tank(vehicle):
+    return list(
+        forge.models.Refueling.objects.filter(vehicle=vehicle).order_by("date", "pk").values_list(
+            "full_tank_consumption", "full_tank_distance"
+        )
+    )
+
+
+def test_partial_fills_are_counted_up_to_next_full_tank(vehicle, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        create_refueling(vehicle, datetime.date(2024, 1, 1), 100, "40.00")
+        create_refueling(vehicle, datetime.date(2024, 1, 5), 200, "10.00", is_full_tank=False)
+        create_refueling(vehicle, datetime.date(2024, 1, 9), 300, "30.00")
+        create_refueling(vehicle, datetime.date(2024, 1, 20), 400, "28.00", is_full_tank=False)
+
+    assert full_tank(vehicle) == [(None, None), (None, None), (Decimal("8.00"), 500), (None, None)]
+    month = forge.models.FuelStatistics.objects.get(vehicle=vehicle, period_type="month")
+    assert month.avg_consumption == Decimal("8.00")
+
+
+def test_inserted_refueling_recomputes_segment(vehicle, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        create_refueling(vehicle, datetime.date(2023, 12, 1), 100, "40.00")
+        create_refueling(vehicle, datetime.date(2024, 2, 1), 500, "40.00")
+
+    assert full_tank(vehicle)[1] == (Decimal("8.00"), 500)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        create_refueling(vehicle, datetime.date(2024, 1, 10), 0, "10.00", is_full_tank=False)
+
+    assert full_tank(vehicle)[2] == (Decimal("10.00"), 500)
+
+
+def test_change_in_previous_year_updates_next_year_statistics(vehicle, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        create_refueling(vehicle, datetime.date(2023, 12, 1), 100, "40.00")
+        partial = create_refueling(vehicle, datetime.date(2023, 12, 20), 200, "20.00", is_full_tank=False)
+        create_refueling(vehicle, datetime.date(2024, 1, 10), 300, "20.00")
+
+    year = forge.models.FuelStatistics.objects.get(vehicle=vehicle, period_type="year", period=datetime.date(2024, 1, 1))
+    assert year.avg_consumption == Decimal("8.00")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        partial.delete()
+
+    year.refresh_from_db()
+    assert year.avg_consumption == Decimal("6.67")
+
+
+def test_rebuild_is_one_read_for_many_vehicles(user, vehicle, django_assert_num_queries):
+    other = forge.models.Vehicle.objects.create(name="Lada", initial_odometer=0, user=user)
+    for car in (vehicle, other):
+        create_refueling(car, datetime.date(2024, 1, 1), 100, "40.00")
+        create_refueling(car, datetime.date(2024, 1, 9), 400, "30.00")
+    forge.models.Refueling.objects.update(full_tank_consumption=None, full_tank_distance=None)
+
+    # Чтение окном и одна пачка bulk_update
+    with django_assert_num_queries(2):
+        assert forge.consumption.rebuild([vehicle.pk, other.pk]) == 2
+
+    assert full_tank(vehicle)[1] == (Decimal("7.50"), 400)
+    assert full_tank(other)[1] == (Decimal("7.50"), 400)
@@ -0,0 +1,156 @@
+import datetime
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+import forge.models
+import forge.tasks
+
+pytestmark = pytest.mark.django_db
+
+
+def create_refueling(vehicle, date, mileage=100, fuel_quantity="10.00", price_per_liter="50.00"):
+    return forge.models.Refueling.objects.create(
+        vehicle=vehicle,
+        date=date,
+        mileage=mileage,
+        fuel_quantity=Decimal(fuel_quantity),
+        price_per_liter=Decimal(price_per_liter),
+    )
+
+
+def statistics(vehicle, period_type):
+    return {
+        row.period: row
+        for row in forge.models.FuelStatistics.objects.filter(vehicle=vehicle, period_type=period_type)
+    }
+
+
+def test_refueling_creates_month_quarter_and_year_statistics(vehicle, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        create_refueling(vehicle, datetime.date(2024, 1, 10), mileage=100, fuel_quantity="10.00", price_per_liter="50.00")
+        create_refueling(vehicle, datetime.date(2024, 2, 10), mileage=300, fuel_quantity="20.00", price_per_liter="56.00")
+
+    months = statistics(vehicle, "month")
+    quarter = statistics(vehicle, "quarter")[datetime.date(2024, 1, 1)]
+    year = statistics(vehicle, "year")[datetime.date(2024, 1, 1)]
+
+    assert set(months) == {datetime.date(2024, 1, 1), datetime.date(2024, 2, 1)}
+    assert months[datetime.date(2024, 1, 1)].total_distance == 100
+    assert quarter.total_distance == 400
+    assert quarter.total_fuel == Decimal("30.00")
+    assert quarter.total_cost == Decimal("1620.00")
+    assert quarter.avg_consumption == Decimal("7.50")
+    assert quarter.avg_price == Decimal("54.00")
+    assert year.total_distance == 400
+
+
+def test_moved_refueling_updates_old_and_new_periods(vehicle, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        refueling = create_refueling(vehicle, datetime.date(2024, 1, 10))
+
+        refueling.date = datetime.date(2024, 5, 10)
+        refueling.save()
+
+    assert set(statistics(vehicle, "month")) == {datetime.date(2024, 5, 1)}
+    assert set(statistics(vehicle, "quarter")) == {datetime.date(2024, 4, 1)}
+
+
+def test_deleted_refueling_removes_empty_periods(vehicle, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        first = create_refueling(vehicle, datetime.date(2024, 1, 10))
+        create_refueling(vehicle, datetime.date(2024, 3, 10), mileage=200)
+
+        first.delete()
+
+    assert set(statistics(vehicle, "month")) == {datetime.date(2024, 3, 1)}
+    assert statistics(vehicle, "quarter")[datetime.date(2024, 1, 1)].total_distance == 200
+
+
+def test_rebuild_fuel_statistics_command(vehicle):
+    create_refueling(vehicle, datetime.date(2023, 12, 31))
+    create_refueling(vehicle, datetime.date(2024, 1, 1))
+    forge.models.FuelStatistics.objects.all().delete()
+
+    call_command("rebuild_fuel_statistics", stdout=StringIO())
+
+    assert len(statistics(vehicle, "month")) == 2
+    assert len(statistics(vehicle, "quarter")) == 2
+    assert len(statistics(vehicle, "year")) == 2
+
+
+def test_fuel_statistics_list_returns_vehicle_totals(
+    api_client, vehicle, django_assert_max_num_queries, django_capture_on_commit_callbacks
+):
+    with django_capture_on_commit_callbacks(execute=True):
+        create_refueling(vehicle, datetime.date(2024, 1, 10), fuel_quantity="10.00", price_per_liter="50.00")
+        create_refueling(vehicle, datetime.date(2024, 2, 10), fuel_quantity="30.00", price_per_liter="60.00")
+
+    with django_assert_max_num_queries(2):
+        response = api_client.get(reverse("fuelstatistics-list"), {"vehicle": vehicle.id})
+
+    assert response.status_code == 200
+    assert response.data["vehicle_info"] == {"id": str(vehicle.id), "name": vehicle.name}
+    assert response.data["refueling_totals"] == {
+        "total_cost": 2300.0,
+        "total_fuel_liters": 40.0,
+        "average_price_per_liter": 57.5,
+    }
+    assert len(response.data["results"]) == 4
+
+
+def test_fuel_statistics_list_hides_other_users_vehicle(vehicle, django_user_model):
+    create_refueling(vehicle, datetime.date(2024, 1, 10))
+    other_user = django_user_model.objects.create_user(username="otheruser", password="pass11111111")
+    client = APIClient()
+    client.force_authenticate(user=other_user)
+
+    response = client.get(reverse("fuelstatistics-list"), {"vehicle": vehicle.id})
+
+    assert response.status_code == 200
+    assert response.data == {"next": None, "previous": None, "results": []}
+
+
+def test_cached_vehicle_summary_is_invalidated_by_refueling(api_client, vehicle, settings):
+    settings.FUEL_STATISTICS_SUMMARY_CACHE_TIMEOUT = 60
+    cache.clear()
+    create_refueling(vehicle, datetime.date(2024, 1, 10), fuel_quantity="10.00")
+    url = reverse("fuelstatistics-list")
+
+    api_client.get(url, {"vehicle": vehicle.id})
+    create_refueling(vehicle, datetime.date(2024, 1, 11), fuel_quantity="15.00")
+    response = api_client.get(url, {"vehicle": vehicle.id})
+
+    assert response.data["refueling_totals"]["total_fuel_liters"] == 25.0
+
+
+def test_statistics_refresh_is_deferred_and_coalesced(vehicle, django_capture_on_commit_callbacks, monkeypatch):
+    cache.clear()
+    scheduled = []
+    monkeypatch.setattr(forge.tasks.refresh_statistics, "apply_async", lambda args, **kwargs: scheduled.append(args))
+
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        for day in range(1, 6):
+            create_refueling(vehicle, datetime.date(2024, 1, day))
+        create_refueling(vehicle, datetime.date(2023, 12, 31))
+        # До коммита статистика не считается
+        assert not forge.models.FuelStatistics.objects.exists()
+
+    assert len(callbacks) == 6
+    assert sorted(scheduled) == [(vehicle.id, 2023), (vehicle.id, 2024)]
+
+    # Пока пересчет не выполнен, новые изменения не ставят задачу повторно
+    with django_capture_on_commit_callbacks(execute=True):
+        create_refueling(vehicle, datetime.date(2024, 1, 10))
+    assert len(scheduled) == 2
+
+    forge.tasks.refresh_statistics(vehicle.id, 2024)
+    assert statistics(vehicle, "year")[datetime.date(2024, 1, 1)].total_distance == 600
+    with django_capture_on_commit_callbacks(execute=True):
+        create_refueling(vehicle, datetime.date(2024, 1, 11))
+    assert len(scheduled) == 3
@@ -0,0 +1,174 @@
+import datetime
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+import forge.models
+import forge.sync
+
+pytestmark = pytest.mark.django_db
+
+
+def create_refueling(vehicle, day, gas_station=None):
+    return forge.models.Refueling.objects.create(
+        vehicle=vehicle,
+        date=datetime.date(2024, 1, 1) + datetime.timedelta(days=day),
+        mileage=100,
+        fuel_quantity=Decimal("40.00"),
+        price_per_liter=Decimal("50.00"),
+        gas_station=gas_station,
+    )
+
+
+def sync(api_client, watermark=None):
+    response = api_client.get(reverse("sync"), {"since": watermark} if watermark else {})
+    assert response.status_code == 200
+    return response.data
+
+
+def sync_page(api_client, cursor):
+    response = api_client.get(reverse("sync"), {"cursor": cursor})
+    assert response.status_code == 200
+    return response.data
+
+
+def age(*models, seconds=3600):
+    """Сдвигает updated_at всех строк в прошлое, за пределы запаса метки"""
+    for model in models:
+        model.objects.update(updated_at=timezone.now() - datetime.timedelta(seconds=seconds))
+
+
+def test_full_snapshot_without_watermark(api_client, vehicle):
+    create_refueling(vehicle, 0)
+
+    data = sync(api_client)
+
+    assert data["reset"] is True
+    assert [row["id"] for row in data["vehicles"]] == [vehicle.id]
+    assert len(data["refuelings"]) == 1
+    assert data["watermark"]
+
+
+def test_resync_moves_only_changed_rows(api_client, vehicle, django_assert_max_num_queries, settings):
+    settings.SYNC_WATERMARK_LAG = 60
+    old = [create_refueling(vehicle, day) for day in range(20)]
+    watermark = sync(api_client)["watermark"]
+    age(forge.models.Vehicle, forge.models.Refueling)
+    forge.models.Tombstone.objects.all().delete()
+
+    # Удаление последней заправки не сдвигает одометры других: изменений ровно три
+    deleted_id = old[-1].id
+    old[-1].delete()
+    new = create_refueling(vehicle, 30)
+    old[0].comment = "правка"
+    old[0].save(update_fields=["comment"])
+
+    with django_assert_max_num_queries(4):
+        data = sync(api_client, watermark)
+
+    assert data["reset"] is False
+    # Заправки сдвинули текущий пробег ТС - ТС тоже изменено
+    assert [row["id"] for row in data["vehicles"]] == [vehicle.id]
+    assert {row["id"] for row in data["refuelings"]} == {old[0].id, new.id}
+    assert data["deleted"] == {"vehicles": [], "refuelings": [deleted_id], "gas_stations": []}
+
+
+def test_deleted_vehicle_and_gas_station_leave_tombstones(api_client, vehicle):
+    station = forge.models.GasStation.objects.create(name="Лукойл", company="Лукойл")
+    refueling = create_refueling(vehicle, 0, gas_station=station)
+    watermark = sync(api_client)["watermark"]
+    age(forge.models.Refueling)
+
+    station_id, vehicle_id = station.id, vehicle.id
+    station.delete()
+    data = sync(api_client, watermark)
+    assert data["deleted"]["gas_stations"] == [station_id]
+    # Заправка потеряла АЗС без save - она все равно попадает в изменения
+    assert [row["gas_station"] for row in data["refuelings"] if row["id"] == refueling.id] == [None]
+
+    vehicle.delete()
+    data = sync(api_client, watermark)
+    assert data["deleted"]["vehicles"] == [vehicle_id]
+
+
+def test_other_users_changes_are_not_synced(api_client, vehicle, django_user_model):
+    watermark = sync(api_client)["watermark"]
+    age(forge.models.Vehicle)
+    other = django_user_model.objects.create_user(username="other", password="pass11111111")
+    other_vehicle = forge.models.Vehicle.objects.create(name="Lada", user=other)
+    create_refueling(other_vehicle, 0).delete()
+
+    data = sync(api_client, watermark)
+
+    assert data["vehicles"] == []
+    assert data["refuelings"] == []
+    assert data["deleted"]["refuelings"] == []
+
+
+def test_forged_or_expired_watermark(api_client, vehicle, settings):
+    response = api_client.get(reverse("sync"), {"since": "1700000000"})
+    assert response.status_code == 400
+
+    expired = forge.sync.issue_watermark(
+        timezone.now() - datetime.timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS + 1)
+    )
+    assert sync(api_client, expired)["reset"] is True
+
+
+def test_purge_tombstones_command(vehicle, settings):
+    create_refueling(vehicle, 0).delete()
+    forge.models.Tombstone.objects.update(
+        deleted_at=timezone.now() - datetime.timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS + 1)
+    )
+    create_refueling(vehicle, 1).delete()
+
+    call_command("purge_tombstones", stdout=StringIO())
+
+    assert forge.models.Tombstone.objects.count() == 1
+
+
+def test_snapshot_is_paged_with_final_watermark(api_client, vehicle, settings, django_assert_max_num_queries):
+    settings.SYNC_PAGE_SIZE = 3
+    station = forge.models.GasStation.objects.create(name="Лукойл", company="Лукойл")
+    refuelings = [create_refueling(vehicle, day) for day in range(6)]
+
+    pages = [sync(api_client)]
+    while pages[-1]["next"]:
+        with django_assert_max_num_queries(4):
+            pages.append(sync_page(api_client, pages[-1]["next"]))
+
+    assert len(pages) == 3
+    assert all(page["reset"] for page in pages)
+    assert [page["watermark"] is None for page in pages] == [True, True, False]
+    assert all(len(page["vehicles"] + page["gas_stations"] + page["refuelings"]) <= 3 for page in pages)
+    assert [row["id"] for page in pages for row in page["vehicles"]] == [vehicle.id]
+    assert [row["id"] for page in pages for row in page["gas_stations"]] == [station.id]
+    assert [row["id"] for page in pages for row in page["refuelings"]] == [row.id for row in refuelings]
+
+
+def test_changes_during_paging_come_with_next_sync(api_client, vehicle, settings):
+    settings.SYNC_PAGE_SIZE = 1
+    create_refueling(vehicle, 0)
+    first = sync(api_client)
+
+    # Правка после начала обхода: метка последней страницы ее не пропускает
+    age(forge.models.Vehicle, forge.models.Refueling)
+    changed = create_refueling(vehicle, 1)
+    page = first
+    while page["next"]:
+        page = sync_page(api_client, page["next"])
+    settings.SYNC_PAGE_SIZE = 100
+
+    data = sync(api_client, page["watermark"])
+    assert changed.id in [row["id"] for row in data["refuelings"]]
+
+
+def test_forged_cursor_is_rejected(api_client, vehicle):
+    response = api_client.get(reverse("sync"), {"cursor": "1700000000"})
+
+    assert response.status_code == 400
+    assert "cursor" in response.data
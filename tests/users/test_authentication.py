@@ -0,0 +1,105 @@
+import pytest
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from users import authentication
+from users.authentication import LocalTokenCache, SharedTokenCache
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def token(user):
+    return Token.objects.create(user=user)
+
+
+@pytest.fixture
+def token_client(token):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+    return client
+
+
+def test_cached_token_skips_token_query(token_client, django_assert_num_queries):
+    url = reverse("vehicle-list")
+    assert token_client.get(url).status_code == 200
+
+    # Метка ETag и страница ТС, без запроса токена
+    with django_assert_num_queries(2) as captured:
+        response = token_client.get(url)
+
+    assert response.status_code == 200
+    assert not any("authtoken_token" in query["sql"] for query in captured.captured_queries)
+
+
+def test_cached_entry_holds_no_secrets(token_client, token, user, token_cache):
+    url = reverse("vehicle-list")
+    token_client.get(url)
+
+    cached = token_cache.get(token.key)
+
+    assert cached == {"id": user.pk, "username": "testuser", "is_active": True, "is_staff": False,
+                      "is_superuser": False}
+    response = token_client.get(url)
+    assert response.status_code == 200
+    assert response.wsgi_request.user.pk == user.pk
+
+
+def test_token_cache_is_off_without_shared_backend(token_client, settings, monkeypatch,
+                                                   django_assert_num_queries):
+    settings.TOKEN_AUTH_CACHE = {**settings.TOKEN_AUTH_CACHE, "MODE": "off"}
+    monkeypatch.setattr(authentication, "token_cache", authentication.build_token_cache())
+    url = reverse("vehicle-list")
+    token_client.get(url)
+
+    # Токен с пользователем, метка ETag и страница ТС
+    with django_assert_num_queries(3):
+        assert token_client.get(url).status_code == 200
+
+
+def test_deleted_token_is_rejected(token_client, token):
+    url = reverse("vehicle-list")
+    token_client.get(url)
+
+    token.delete()
+
+    assert token_client.get(url).status_code == 401
+
+
+def test_deactivated_user_is_rejected(token_client, user):
+    url = reverse("vehicle-list")
+    token_client.get(url)
+
+    user.is_active = False
+    user.save()
+
+    assert token_client.get(url).status_code == 401
+
+
+def test_local_token_cache_evicts_least_recently_used_and_expired():
+    cache = LocalTokenCache(max_size=2, timeout=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    expired = LocalTokenCache(max_size=2, timeout=-1)
+    expired.set("a", 1)
+    assert expired.get("a") is None
+
+
+def test_shared_token_cache_keys_hide_token(token, settings):
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    shared = SharedTokenCache("default", 60)
+
+    shared.set(token.key, "cached")
+
+    assert token.key not in SharedTokenCache.make_key(token.key)
+    assert shared.get(token.key) == "cached"
+    shared.delete(token.key)
+    assert shared.get(token.key) is None
+    assert not hasattr(shared, "clear")
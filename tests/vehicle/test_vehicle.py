@@ -76,7 +76,7 @@ def test_access_vehicle(api_client, user, api_client2, user2):
 
     other_cars_response = api_client2.get(url, format="json")
     assert other_cars_response.status_code == 200
-    assert other_cars_response.data == []
+    assert other_cars_response.data["results"] == []
 
 
 def test_anonymous_user_cannot_access_vehicles(api_client, user, client):
@@ -0,0 +1,97 @@
+import datetime
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+import forge.deletion
+import forge.models
+import forge.rollups
+
+pytestmark = pytest.mark.django_db
+
+REFUELINGS = 250
+
+
+def create_vehicle(user, name="Toyota Camry"):
+    vehicle = forge.models.Vehicle.objects.create(name=name, initial_odometer=1000, user=user)
+    refuelings = []
+    for day in range(REFUELINGS):
+        refueling = forge.models.Refueling(
+            vehicle=vehicle,
+            user=user,
+            date=datetime.date(2020, 1, 1) + datetime.timedelta(days=day),
+            mileage=100,
+            odometer=1000 + 100 * (day + 1),
+            fuel_quantity=Decimal("40.00"),
+            price_per_liter=Decimal("50.00"),
+        )
+        refueling.fill_period()
+        refuelings.append(refueling)
+    forge.models.Refueling.objects.bulk_create(refuelings)
+    forge.models.Vehicle.objects.filter(pk=vehicle.pk).update(current_odometer=1000 + 100 * REFUELINGS)
+    forge.rollups.rebuild_statistics([vehicle.pk])
+    return vehicle
+
+
+@pytest.fixture
+def vehicle(user):
+    return create_vehicle(user)
+
+
+def test_vehicle_delete_does_not_depend_on_history_size(
+    api_client, vehicle, settings, django_assert_max_num_queries, django_capture_on_commit_callbacks
+):
+    settings.FORGE_DELETE_BATCH_SIZE = 100
+    other = create_vehicle(vehicle.user, "Ford Focus")
+
+    # Пачки заправок (выборка id, выборка строк, DELETE) вместо нескольких запросов на каждую заправку
+    with django_capture_on_commit_callbacks() as callbacks:
+        with django_assert_max_num_queries(30):
+            response = api_client.delete(reverse("vehicle-detail", args=[vehicle.pk]))
+
+    assert response.status_code == 204
+    assert callbacks == []
+    assert not forge.models.Refueling.objects.filter(vehicle_id=vehicle.pk).exists()
+    assert not forge.models.FuelStatistics.objects.filter(vehicle_id=vehicle.pk).exists()
+    # Заправки удаляются вместе с ТС: след только у самого ТС
+    assert list(forge.models.Tombstone.objects.values_list("model", "object_id")) == [("vehicle", vehicle.pk)]
+    # Соседнее ТС не затронуто
+    assert forge.models.Refueling.objects.filter(vehicle=other).count() == REFUELINGS
+    other.refresh_from_db()
+    assert other.current_odometer == 1000 + 100 * REFUELINGS
+
+
+def test_vehicle_queryset_delete_skips_refueling_handlers(vehicle, django_assert_max_num_queries):
+    with django_assert_max_num_queries(30):
+        forge.deletion.delete_vehicles(forge.models.Vehicle.objects.filter(pk=vehicle.pk), batch_size=100)
+
+    assert forge.models.Refueling.objects.count() == 0
+
+
+def test_user_cascade_skips_refueling_handlers(user, vehicle, django_assert_max_num_queries):
+    # Каскад Collector-а от пользователя: без запросов на каждую заправку
+    with django_assert_max_num_queries(40):
+        user.delete()
+
+    assert forge.models.Refueling.objects.count() == 0
+    assert forge.models.Tombstone.objects.count() == 0
+
+
+def test_delete_users_command(user, vehicle):
+    call_command("delete_users", user.username, "--batch-size", "50", stdout=StringIO())
+
+    assert not forge.models.Vehicle.objects.exists()
+    assert forge.models.Refueling.objects.count() == 0
+
+
+def test_single_refueling_delete_still_maintains_derived_data(vehicle):
+    refueling = forge.models.Refueling.objects.filter(vehicle=vehicle).order_by("date").first()
+
+    refueling.delete()
+
+    vehicle.refresh_from_db()
+    assert vehicle.current_odometer == 1000 + 100 * (REFUELINGS - 1)
+    assert forge.models.Tombstone.objects.filter(model="refueling").count() == 1
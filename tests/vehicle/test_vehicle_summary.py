@@ -0,0 +1,72 @@
+import datetime
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+
+import forge.models
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def vehicles(user):
+    camry = forge.models.Vehicle.objects.create(name="Camry", initial_odometer=1000, user=user)
+    focus = forge.models.Vehicle.objects.create(name="Focus", user=user)
+    forge.models.Vehicle.objects.create(name="Lada", user=user)
+    for vehicle, rows in ((camry, [("10.00", "50.00"), ("30.00", "54.00")]), (focus, [("20.00", "60.00")])):
+        for day, (fuel_quantity, price_per_liter) in enumerate(rows):
+            forge.models.Refueling.objects.create(
+                vehicle=vehicle,
+                date=datetime.date(2024, 1, 1) + datetime.timedelta(days=day),
+                mileage=100,
+                fuel_quantity=Decimal(fuel_quantity),
+                price_per_liter=Decimal(price_per_liter),
+            )
+    return camry, focus
+
+
+def test_vehicle_list_with_summary_is_one_query(api_client, vehicles, django_assert_num_queries):
+    # Метка ETag (ТС и заправки) и одна выборка страницы с агрегатами
+    with django_assert_num_queries(3):
+        response = api_client.get(reverse("vehicle-list"), {"summary": "1"})
+
+    assert response.status_code == 200
+    rows = {row["name"]: row for row in response.data["results"]}
+    assert rows["Camry"]["refuel_count"] == 2
+    assert rows["Camry"]["last_refuel_date"] == "2024-01-02"
+    assert rows["Camry"]["total_fuel"] == "40.00"
+    assert rows["Camry"]["total_cost"] == "2120.00"
+    assert rows["Camry"]["avg_price"] == "53.00"
+    assert rows["Focus"]["refuel_count"] == 1
+    assert rows["Lada"]["refuel_count"] == 0
+    assert rows["Lada"]["total_fuel"] is None
+    assert rows["Lada"]["avg_price"] is None
+
+
+def test_plain_vehicle_list_has_no_summary(api_client, vehicles):
+    row = api_client.get(reverse("vehicle-list")).data["results"][0]
+
+    assert "refuel_count" not in row
+
+
+def test_summary_follows_keyset_pagination(api_client, vehicles):
+    first = api_client.get(reverse("vehicle-list"), {"summary": "1", "page_size": 2}).data
+    second = api_client.get(first["next"]).data
+
+    assert [row["name"] for row in first["results"] + second["results"]] == ["Camry", "Focus", "Lada"]
+    assert second["results"][0]["refuel_count"] == 0
+
+
+def test_summary_etag_follows_refueling_edits(api_client, vehicles):
+    url = reverse("vehicle-list")
+    etag = api_client.get(url, {"summary": "1"})["ETag"]
+    refueling = forge.models.Refueling.objects.filter(vehicle=vehicles[1]).get()
+
+    # Цена не сдвигает пробег ТС, но меняет итоги
+    refueling.price_per_liter = Decimal("70.00")
+    refueling.save()
+
+    response = api_client.get(url, {"summary": "1"}, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert [row["avg_price"] for row in response.data["results"] if row["name"] == "Focus"] == ["70.00"]
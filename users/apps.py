@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class UsersConfig(AppConfig):
     name = 'users'
+
+    def ready(self):
+        # Сброс кеша токенов по сигналам
+        from users import authentication  # noqa: F401
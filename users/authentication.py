@@ -0,0 +1,135 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+class LocalTokenCache:
+    """LRU-кеш в памяти процесса с временем жизни записей.
+
+    Только для тестов: сброс виден лишь в своем процессе, другие воркеры
+    продолжали бы пускать удаленный токен до истечения записи.
+    """
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self.items[key]
+                return None
+            self.items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.items[key] = (time.monotonic() + self.timeout, value)
+            self.items.move_to_end(key)
+            while len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.items.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+class SharedTokenCache:
+    """Кеш токенов в общем бэкенде Django (Redis), общий для всех воркеров.
+
+    Очистки целиком нет: cache.clear() в общем Redis - это FLUSHDB вместе с
+    очередью Celery. В имени ключа только хеш токена, сам токен в Redis не виден.
+    """
+
+    def __init__(self, alias, timeout):
+        self.cache = caches[alias]
+        self.timeout = timeout
+
+    @staticmethod
+    def make_key(key):
+        return f'auth:token:{hashlib.sha256(key.encode()).hexdigest()}'
+
+    def get(self, key):
+        return self.cache.get(self.make_key(key))
+
+    def set(self, key, value):
+        self.cache.set(self.make_key(key), value, self.timeout)
+
+    def delete(self, key):
+        self.cache.delete(self.make_key(key))
+
+
+def build_token_cache():
+    """Без общего бэкенда (MODE "off") кеша нет: токен проверяется по БД"""
+    options = settings.TOKEN_AUTH_CACHE
+    if options['MODE'] == 'off':
+        return None
+    return SharedTokenCache(options['CACHE_ALIAS'], options['TIMEOUT'])
+
+
+token_cache = build_token_cache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication, который не ходит в БД за токеном и пользователем на каждый запрос.
+
+    По ключу токена кешируются только id и флаги пользователя (см.
+    settings.TOKEN_AUTH_CACHE): хеш пароля и сам токен в кеш не попадают.
+    Запись сбрасывается при удалении токена и изменении пользователя.
+    """
+    cached_user_fields = ('id', 'username', 'is_active', 'is_staff', 'is_superuser')
+
+    def authenticate_credentials(self, key):
+        if token_cache is None:
+            return super().authenticate_credentials(key)
+
+        cached = token_cache.get(key)
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, {name: getattr(user, name) for name in self.cached_user_fields})
+            return user, token
+
+        if not cached['is_active']:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        # Остальные поля пользователя отложены и при обращении дочитываются из БД
+        User = get_user_model()
+        user = User.from_db(User.objects.db, list(cached), list(cached.values()))
+        token = Token.from_db(Token.objects.db, ['key', 'user_id'], [key, user.pk])
+        token.user = user
+        return user, token
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    if token_cache is not None:
+        token_cache.delete(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_user_tokens(sender, instance, created, **kwargs):
+    """Деактивация и любые изменения пользователя сбрасывают его токен из кеша"""
+    if created or token_cache is None:
+        return
+    for key in Token.objects.filter(user=instance).values_list('key', flat=True):
+        token_cache.delete(key)
@@ -0,0 +1,172 @@
+"""Метрики запросов: число и время SQL, время приложения без SQL и полное время ответа по view.
+
+Гистограммы хранятся в памяти процесса и отдаются в формате Prometheus на /metrics
+сотрудникам (is_staff) или по заголовку Authorization: Bearer METRICS_TOKEN.
+Каждый процесс (воркер gunicorn/granian) считает свои запросы, поэтому
+Prometheus должен опрашивать воркеры по отдельности или суммировать их.
+
+Учет SQL идет через connection.execute_wrapper: на запрос - вызов функции
+и два perf_counter, сами SQL не сохраняются. Только при
+METRICS_DUPLICATE_QUERIES (по умолчанию = DEBUG) запоминаются тексты запросов,
+чтобы найти повторы (N+1).
+"""
+import bisect
+import contextlib
+import hmac
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger(__name__)
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+
+class Histogram:
+    """Гистограмма Prometheus с метками (потокобезопасная, без внешних зависимостей)"""
+
+    def __init__(self, name, documentation, labels, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def clear(self):
+        with self.lock:
+            self.series.clear()
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self.series.items()}
+        for label_values, (counts, total, count) in sorted(series.items()):
+            labels = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.labels, label_values))
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{labels}}} {total}')
+            lines.append(f'{self.name}_count{{{labels}}} {count}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+LABELS = ('view', 'method')
+REQUEST_DURATION = Histogram('brooks_request_duration_seconds', 'Полное время ответа', LABELS, SECONDS_BUCKETS)
+DB_DURATION = Histogram('brooks_db_duration_seconds', 'Время SQL-запросов за запрос', LABELS, SECONDS_BUCKETS)
+DB_QUERIES = Histogram('brooks_db_queries', 'Число SQL-запросов за запрос', LABELS, QUERY_BUCKETS)
+# Не только сериализация: все время от входа во view до готового ответа, кроме SQL
+APP_DURATION = Histogram(
+    'brooks_view_non_db_duration_seconds',
+    'Время view и рендеринга ответа без учета SQL (сериализация, проверки, JSON)',
+    LABELS, SECONDS_BUCKETS,
+)
+HISTOGRAMS = (REQUEST_DURATION, DB_DURATION, DB_QUERIES, APP_DURATION)
+
+
+class QueryRecorder:
+    """execute_wrapper: считает запросы и их время, при необходимости - повторы"""
+
+    def __init__(self, track_duplicates):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter() if track_duplicates else None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            if self.statements is not None:
+                self.statements[sql] += 1
+
+    def duplicates(self, threshold):
+        if self.statements is None:
+            return []
+        return [(sql, count) for sql, count in self.statements.most_common() if count >= threshold]
+
+
+class QueryMetricsMiddleware:
+    """Записывает метрики по каждому запросу; в режиме разработки предупреждает о N+1"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLED or request.path == settings.METRICS_PATH:
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        recorder = QueryRecorder(track_duplicates=settings.METRICS_DUPLICATE_QUERIES)
+        request._metrics_view_started = None
+        with contextlib.ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(recorder))
+            response = self.get_response(request)
+        finished = time.perf_counter()
+
+        match = request.resolver_match
+        labels = (match.view_name if match else '<unresolved>', request.method)
+        REQUEST_DURATION.observe(labels, finished - started)
+        DB_DURATION.observe(labels, recorder.duration)
+        DB_QUERIES.observe(labels, recorder.count)
+        if request._metrics_view_started is not None:
+            APP_DURATION.observe(
+                labels, max(finished - request._metrics_view_started - recorder.duration, 0)
+            )
+
+        duplicates = recorder.duplicates(settings.METRICS_DUPLICATE_QUERY_THRESHOLD)
+        if duplicates:
+            response['X-Duplicate-Queries'] = str(sum(count for _, count in duplicates))
+            for sql, count in duplicates:
+                logger.warning('Повторяющийся запрос (%s раз) в %s %s: %s', count, request.method, labels[0], sql)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics_view_started = time.perf_counter()
+
+
+def is_authorized(request):
+    """Сотрудник в сессии или Prometheus с токеном из METRICS_TOKEN"""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_active and user.is_staff:
+        return True
+    token = settings.METRICS_TOKEN
+    authorization = request.headers.get('Authorization', '')
+    return bool(token) and hmac.compare_digest(authorization.encode(), f'Bearer {token}'.encode())
+
+
+def metrics(request):
+    """Гистограммы в текстовом формате Prometheus"""
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    # Время и число запросов по view раскрывают устройство API: наружу не отдаются
+    if not is_authorized(request):
+        return HttpResponseForbidden()
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.expose())
+    return HttpResponse('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4; charset=utf-8')